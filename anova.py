@@ -0,0 +1,284 @@
+"""
+Ajuste de modelos ANOVA.
+
+- `ServicioANOVA`: Streamlit vuelve a ejecutar todo el script con cada
+  interacción (incluidos los sliders del modelo de ML), así que el ajuste OLS
+  y su matriz de diseño de patsy se rehacían en cada rerun. El servicio guarda
+  los modelos ajustados por (fórmula, huella de los datos) y las tablas por
+  (fórmula, huella, typ), con desalojo LRU.
+- `anova_multirespuesta`: ANOVA factorial de muchas respuestas a la vez. La
+  matriz de diseño se construye una sola vez y cada submodelo necesario se
+  factoriza (QR por bloques de términos) una sola vez para todas las
+  respuestas, que se proyectan juntas como columnas de una matriz.
+"""
+import threading
+from collections import OrderedDict
+from itertools import combinations
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from scipy.linalg import qr
+from scipy.stats import f as dist_f
+from statsmodels.stats.anova import anova_lm
+
+from datos import huella_df
+
+
+class AjusteANOVA(NamedTuple):
+    """Tabla ANOVA, valores ajustados y residuos de un modelo (solo lectura)."""
+    tabla: pd.DataFrame
+    ajustados: pd.Series
+    residuos: pd.Series
+
+
+class _LRU:
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+
+    def get(self, clave):
+        if clave not in self._entradas:
+            return None
+        self._entradas.move_to_end(clave)
+        return self._entradas[clave]
+
+    def put(self, clave, valor):
+        self._entradas[clave] = valor
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class ServicioANOVA:
+    """
+    Ajustes OLS + `anova_lm` memoizados, seguros entre hilos (una instancia
+    puede compartirse entre sesiones de Streamlit). Los resultados se comparten
+    entre llamadas: no deben modificarse en el lugar.
+    """
+
+    def __init__(self, max_entradas=32):
+        self._modelos = _LRU(max_entradas)
+        self._tablas = _LRU(max_entradas)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def ajustar(self, formula, datos, typ=2, huella=None):
+        """
+        AjusteANOVA de `formula` sobre `datos`. `huella` identifica el contenido
+        de los datos (p. ej. `df.attrs['huella']`); si no se da, se calcula con
+        `datos.huella_df`.
+        """
+        huella = huella or huella_df(datos)
+        clave = (formula, huella, typ)
+        with self._lock:
+            ajuste = self._tablas.get(clave)
+            if ajuste is not None:
+                self._modelos.get((formula, huella))     # su modelo también es reciente
+                self.aciertos += 1
+                return ajuste
+            modelo = self._modelos.get((formula, huella))
+
+        if modelo is None:
+            modelo = smf.ols(formula, data=datos).fit()
+        ajuste = AjusteANOVA(anova_lm(modelo, typ=typ), modelo.fittedvalues, modelo.resid)
+
+        with self._lock:
+            self.fallos += 1
+            self._modelos.put((formula, huella), modelo)
+            self._tablas.put(clave, ajuste)
+        return ajuste
+
+    def ajustar_lote(self, datos, respuestas, factores, orden=1, typ=2, huella=None):
+        """`anova_multirespuesta` memoizado por (respuestas, factores, orden, typ, huella)."""
+        huella = huella or huella_df(datos)
+        clave = ('lote', tuple(respuestas), tuple(factores), orden, typ, huella)
+        with self._lock:
+            tablas = self._tablas.get(clave)
+            if tablas is not None:
+                self.aciertos += 1
+                return tablas
+
+        tablas = anova_multirespuesta(datos, respuestas, factores, orden=orden, typ=typ)
+
+        with self._lock:
+            self.fallos += 1
+            self._tablas.put(clave, tablas)
+        return tablas
+
+    def info(self):
+        """Aciertos, fallos y entradas en caché, al estilo de `lru_cache.cache_info`."""
+        with self._lock:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos,
+                    'modelos': len(self._modelos), 'tablas': len(self._tablas)}
+
+
+# ── ANOVA multirespuesta ──────────────────────────────────────────────────────
+
+def _termino(factores):
+    return ':'.join(f'C({f})' for f in factores) if factores else 'Intercept'
+
+
+def _columnas_factor(serie, suma):
+    # Codificación de tratamiento (referencia = primer nivel) o de suma a cero
+    codigos, niveles = pd.factorize(serie, sort=True)
+    k = len(niveles)
+    if suma:
+        base = np.vstack([np.eye(k - 1), -np.ones((1, k - 1))])
+    else:
+        base = np.vstack([np.zeros((1, k - 1)), np.eye(k - 1)])
+    return base[codigos]
+
+
+def disenar_factorial(df, factores, orden=1, suma=False):
+    """
+    Bloques de columnas de la matriz de diseño, uno por término, en el orden
+    de statsmodels (intercepto, efectos principales e interacciones por
+    orden creciente). Retorna {nombre del término: (factores, columnas)}.
+    """
+    principales = {f: _columnas_factor(df[f], suma) for f in factores}
+    bloques = {'Intercept': ((), np.ones((len(df), 1)))}
+    for k in range(1, orden + 1):
+        for grupo in combinations(factores, k):
+            columnas = principales[grupo[0]]
+            for f in grupo[1:]:
+                otro = principales[f]
+                columnas = (columnas[:, :, None] * otro[:, None, :]).reshape(len(df), -1)
+            bloques[_termino(grupo)] = (grupo, columnas)
+    return bloques
+
+
+def bases_ortonormales(bloques, terminos):
+    """
+    Ortogonaliza en secuencia los bloques de `terminos` (Gram–Schmidt por
+    bloques con QR pivotado). Retorna una base ortonormal por término, con
+    tantas columnas como su aporte al rango (0 si no es estimable).
+    """
+    n = len(next(iter(bloques.values()))[1])
+    tolerancia = 1e-9 * np.sqrt(n)
+    Q = np.empty((n, 0))
+    bases = []
+    for t in terminos:
+        B = bloques[t][1]
+        for _ in range(2):                        # reortogonalización
+            B = B - Q @ (Q.T @ B)
+        q, r, _ = qr(B, mode='economic', pivoting=True)
+        q = q[:, :int(np.sum(np.abs(np.diag(r)) > tolerancia))]
+        Q = np.hstack([Q, q])
+        bases.append(q)
+    return bases
+
+
+def terminos_reducidos(bloques, typ):
+    """
+    Pares (término, términos del modelo reducido) que definen la prueba de
+    cada término según `typ`: los anteriores (I), los que no lo contienen (II)
+    o todos los demás (III, incluye el intercepto).
+    """
+    terminos = list(bloques)
+    if typ not in (1, 2, 3):
+        raise ValueError(f"typ debe ser 1, 2 o 3, no {typ!r}")
+    pares = []
+    for i, t in enumerate(terminos):
+        if typ == 1:
+            base = terminos[:i]
+        elif typ == 2:
+            contenidos = set(bloques[t][0])
+            base = [s for s in terminos if s != t and not contenidos < set(bloques[s][0])]
+        else:
+            base = [s for s in terminos if s != t]
+        if t != 'Intercept' or typ == 3:
+            pares.append((t, base))
+    return pares
+
+
+class _Proyector:
+    """
+    Suma de cuadrados explicada por cada submodelo (conjunto de términos),
+    para todas las respuestas a la vez. Cada submodelo se ortogonaliza una
+    sola vez, bloque por bloque, y se guarda.
+    """
+
+    def __init__(self, bloques, Y):
+        self.bloques = bloques
+        self.Y = Y
+        self._modelos = {}
+
+    def ortogonalizar(self, terminos):
+        """Rango y SS explicada (por respuesta) de cada término, en secuencia."""
+        bases = bases_ortonormales(self.bloques, terminos)
+        return ([q.shape[1] for q in bases],
+                [((q.T @ self.Y) ** 2).sum(axis=0) for q in bases])
+
+    def modelo(self, terminos):
+        """(rango, SS explicada por respuesta) del submodelo con `terminos`."""
+        clave = frozenset(terminos)
+        if clave not in self._modelos:
+            rangos, ss = self.ortogonalizar(terminos)
+            self._modelos[clave] = (sum(rangos), np.sum(ss, axis=0) if ss else 0.0)
+        return self._modelos[clave]
+
+
+def anova_multirespuesta(df, respuestas, factores, orden=1, typ=2):
+    """
+    ANOVA factorial de cada respuesta con los mismos factores.
+
+    Retorna {respuesta: tabla} con el formato de `statsmodels.anova_lm` para
+    `typ` (1: secuencial, 2: ajustada por los términos que no contienen al
+    término, 3: ajustada por todos los demás, con codificación de suma a cero
+    como exige el tipo III). `orden` es el máximo orden de interacción. Los
+    términos no estimables (diseños desbalanceados o incompletos) aportan 0
+    grados de libertad. Las filas con faltantes en alguna respuesta se omiten.
+    """
+    respuestas = list(respuestas)
+    completos = df[respuestas].notna().all(axis=1)
+    datos = df[completos]
+    Y = datos[respuestas].to_numpy(dtype=float)
+    bloques = disenar_factorial(datos, factores, orden=orden, suma=(typ == 3))
+    terminos = list(bloques)
+    proy = _Proyector(bloques, Y)
+
+    # Modelo completo: rango y residuo compartidos por todas las respuestas
+    rango_total, ss_total = proy.modelo(terminos)
+    gl_resid = len(Y) - rango_total
+    ss_resid = np.maximum((Y ** 2).sum(axis=0) - ss_total, 0.0) if gl_resid > 0 else np.zeros(len(respuestas))
+
+    if typ == 1:
+        rangos, ss = proy.ortogonalizar(terminos)
+        filas = list(zip(terminos, rangos, ss))[1:]
+    else:
+        filas = []
+        for t, base in terminos_reducidos(bloques, typ):
+            rango_base, ss_base = proy.modelo(base)
+            rango_con, ss_con = proy.modelo(base + [t])
+            filas.append((t, rango_con - rango_base, ss_con - ss_base))
+
+    nombres = [t for t, _, _ in filas] + ['Residual']
+    gl = np.array([g for _, g, _ in filas] + [gl_resid], dtype=float)
+    tablas = {}
+    for j, respuesta in enumerate(respuestas):
+        ss = np.array([np.maximum(s[j], 0.0) for _, _, s in filas] + [ss_resid[j]])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cuadrado_medio = ss / gl
+            F = cuadrado_medio / cuadrado_medio[-1]
+        F[-1] = np.nan
+        F[gl == 0] = np.nan
+        if gl_resid <= 0:
+            F[:] = np.nan
+        p = dist_f.sf(F, gl, gl_resid)
+        tabla = pd.DataFrame({'df': gl, 'sum_sq': ss, 'mean_sq': cuadrado_medio,
+                              'F': F, 'PR(>F)': p}, index=nombres)
+        if typ != 1:
+            tabla = tabla[['sum_sq', 'df', 'F', 'PR(>F)']]
+        tablas[respuesta] = tabla
+    return tablas
+
+
+def eta_cuadrado(tablas):
+    """η² (SS del término / SS total de la tabla) por respuesta × término."""
+    return pd.DataFrame({r: t['sum_sq'] / t['sum_sq'].sum() for r, t in tablas.items()}).T
@@ -1,221 +1,487 @@
+import logging
+import threading
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
 import statsmodels.api as sm
-import statsmodels.formula.api as smf
-from statsmodels.stats.anova import anova_lm
 from statsmodels.nonparametric.smoothers_lowess import lowess
-import pingouin as pg
 from scipy.stats import norm
 
-# ── ML imports ─────────────────────────────────────────────────────────────────
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import (
-    cross_val_score, GridSearchCV, KFold, learning_curve
+from anova import ServicioANOVA, eta_cuadrado
+from bootstrap import (
+    TAMANO_BLOQUE, TrabajoBootstrap, bootstrap_rf, codigos_estrato, correlacion_ponderada, indices_bootstrap,
+    intervalo, kpis_anova, preparar_anova,
+)
+from datos import (
+    ENV_CLOROFILA, ENV_NUTRIENTES, cargar_fuentes, huella_fuente,
 )
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-from sklearn.inspection import permutation_importance
+from explicaciones import ExplicadorSHAP, resumen_global
+from grafo import GrafoCalculo
+from importancia import GRUPO_NUTRIENTES, importancia_permutacion
+from permutaciones import anova_permutaciones
+from supuestos import pruebas_supuestos
+from trabajos import ColaLlena, Planificador
+
+# ── ML ─────────────────────────────────────────────────────────────────────────
+import registro
+from barrido import cubo_predicciones
+from bosque import BosquePlano
+from comparacion import MODELOS, comparar_modelos, tabla_posiciones
+from cuantiles import BosqueCuantil
+from entrenar import entrenar_y_registrar
+from modelo import calcular_curva, calcular_importancia, preparar_features
+from modelo import predicciones_oob as calcular_oob
+from superficie import VARIABLES_SUPERFICIE, refinar_superficie
 import warnings
 warnings.filterwarnings("ignore")
 
+# Niveles de PAR del ensayo (µmol·m⁻²·s⁻¹)
+RADIACIONES_PAR = [168, 278, 440]
+
+# Modelo ANOVA trifactorial (efectos principales) de los tabs 4 y 5
+FACTORES_ANOVA = ['Radiacion', 'Bioestimulante', 'Variedad']
+FORMULA_ANOVA = 'Clorofila_total ~ ' + ' + '.join(f'C({f})' for f in FACTORES_ANOVA)
+
+# Semilla de las pruebas por permutaciones (resultados reproducibles)
+SEMILLA_PERMUTACIONES = 2024
+
+# Intervalos bootstrap de los KPIs: réplicas, semilla y bosque reducido del RF.
+# El diseño no tiene réplicas por tratamiento, así que se estratifica por radiación.
+ESTRATOS_BOOTSTRAP = ['Radiacion']
+REPLICAS_BOOTSTRAP = 2000
+REPLICAS_BOOTSTRAP_RF = 200
+ARBOLES_BOOTSTRAP_RF = 25
+SEMILLA_BOOTSTRAP = 2024
+
+# Variables de respuesta fisiológicas y nutricionales
+VARIABLES_RESPUESTA = ['Clorofila_a', 'Clorofila_b', 'Clorofila_total',
+                       'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']
+
 st.set_page_config(page_title="Bioestimulación Coffea arabica", layout="wide")
 st.title("🌱 Análisis Experimental: Bioestimulación y Radiación Solar en Coffea arabica L.")
 st.caption("Universidad Santo Tomás - Juan Pablo Vargas")
 
-@st.cache_data
+# ── Carga de datos ─────────────────────────────────────────────────────────────
+# La clave de caché es la huella de cada archivo (ruta + mtime + tamaño), no el
+# contenido: cache_resource devuelve los mismos DataFrames sin re-serializarlos.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cargar_datos(huella_chl, huella_nut):
+    return cargar_fuentes(huella_chl, huella_nut)
+
+
 def cargar_datos():
-    data = {
-        'Tratamiento': [
-            'Co.T.278', 'Co.T.440', 'Co.M.278', 'Co.M.440', 'Co.A.168', 'Co.A.278', 'Co.A.440', 'Co.P.278', 'Co.P.440',
-            'Ma.T.278', 'Ma.T.440', 'Ma.M.168', 'Ma.M.440', 'Ma.A.168', 'Ma.A.440', 'Ma.P.440',
-            'Ca.T.278', 'Ca.M.440', 'Ca.A.278', 'Ca.A.440', 'Ca.P.278', 'Ca.P.440',
-            'Ga.T.278', 'Ga.T.440', 'Ga.M.278', 'Ga.M.440', 'Ga.A.278', 'Ga.P.168', 'Ga.P.278', 'Ga.P.440'
-        ],
-        'Clorofila_a': [
-            1.72, 1.83, 1.72, 1.90, 1.63, 1.80, 1.90, 1.81, 2.00,
-            1.71, 1.83, 1.60, 1.92, 1.68, 1.94, 2.05,
-            1.73, 1.92, 1.80, 1.92, 1.81, 2.01,
-            1.71, 1.83, 1.75, 1.92, 1.80, 1.71, 1.83, 2.02
-        ],
-        'Clorofila_b': [
-            0.83, 0.97, 0.83, 0.95, 0.83, 0.98, 0.95, 0.91, 1.08,
-            0.88, 0.90, 0.84, 0.91, 0.83, 0.85, 1.05,
-            0.84, 0.96, 0.83, 0.90, 0.89, 1.02,
-            0.84, 0.91, 0.89, 0.77, 0.88, 0.82, 0.91, 1.01
-        ],
-        'Clorofila_total': [
-            2.55, 2.80, 2.55, 2.85, 2.46, 2.78, 2.85, 2.71, 3.08,
-            2.59, 2.73, 2.44, 2.83, 2.51, 2.79, 3.08,
-            2.57, 2.88, 2.63, 2.82, 2.70, 3.03,
-            2.55, 2.74, 2.74, 2.69, 2.68, 2.53, 2.74, 3.03
-        ]
-    }
+    """
+    Tablas de clorofila, nutrientes y su intersección. Las rutas se toman de
+    DASHBOARD_CLOROFILA / DASHBOARD_NUTRIENTES (Parquet, Arrow o CSV); sin
+    ellas se usan los datos publicados del experimento.
+    """
+    return _cargar_datos(huella_fuente(ENV_CLOROFILA), huella_fuente(ENV_NUTRIENTES))
 
-    df = pd.DataFrame(data)
-    df[['Variedad', 'Bioestimulante', 'Radiacion']] = df['Tratamiento'].str.split('.', expand=True)
-    df['Radiacion'] = df['Radiacion'].astype(int)
-
-    data2 = {
-        'Tratamiento': [
-            'Co.M.168', 'Co.A.168', 'Co.A.278', 'Co.P.168', 'Co.P.278',
-            'Ma.M.168', 'Ma.M.278', 'Ma.A.168', 'Ma.A.278', 'Ma.P.168', 'Ma.P.278',
-            'Ca.M.168', 'Ca.M.278', 'Ca.A.168', 'Ca.A.278', 'Ca.P.168', 'Ca.P.278',
-            'Ga.M.168', 'Ga.A.168', 'Ga.A.278', 'Ga.P.168', 'Ga.P.278'
-        ],
-        'Nitrogeno': [
-            25.13, 25.87, 25.58, 26.53, 26.22,
-            25.35, 25.07, 26.12, 25.77, 26.85, 26.41,
-            25.34, 24.90, 26.19, 25.77, 26.57, 26.44,
-            25.28, 25.55, 26.51, 26.51, 26.28
-        ],
-        'Fosforo': [
-            14.35, 15.62, 15.11, 16.25, 16.08,
-            14.51, 14.23, 15.91, 15.60, 16.74, 16.21,
-            14.55, 14.98, 15.80, 15.33, 16.62, 16.14,
-            14.33, 15.20, 16.55, 16.55, 16.48
-        ],
-        'Potasio': [
-            16.53, 18.31, 17.77, 19.33, 18.64,
-            17.43, 16.40, 18.55, 17.92, 19.19, 19.11,
-            17.38, 18.44, 18.55, 17.90, 19.55, 19.09,
-            16.66, 17.79, 19.52, 18.74, 18.74
-        ],
-        'Calcio': [
-            13.05, 13.56, 13.53, 13.81, 13.70,
-            13.55, 13.75, 13.53, 13.60, 13.96, 13.96,
-            13.69, 12.81, 13.75, 13.67, 13.94, 13.91,
-            13.20, 13.45, 13.83, 13.78, 13.78
-        ],
-        'Magnesio': [
-            4.03, 4.30, 4.13, 4.45, 4.29,
-            4.10, 3.94, 4.28, 4.19, 4.66, 4.40,
-            4.09, 3.90, 4.17, 4.17, 4.54, 4.37,
-            4.07, 4.30, 4.50, 4.31, 4.31
-        ]
-    }
+df, df_nut, df_full = cargar_datos()
 
-    df_nut = pd.DataFrame(data2)
-    df_nut[['Variedad', 'Bioestimulante', 'Radiacion']] = df_nut['Tratamiento'].str.split('.', expand=True)
-    df_nut['Radiacion'] = df_nut['Radiacion'].astype(int)
+# ── Trabajos en segundo plano ─────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def planificador():
+    """Pool de procesos compartido por todas las sesiones (ver trabajos.py)."""
+    return Planificador()
+
+
+def estado_trabajo(trabajo, descripcion):
+    """Marcador de posición de un trabajo que aún no termina."""
+    if trabajo.estado == 'en_cola':
+        st.info(f"⏳ {descripcion}: en cola ({trabajo.segundos():.0f} s)…")
+    elif trabajo.estado == 'corriendo':
+        avance = trabajo.avance()
+        if avance is None:
+            st.info(f"⚙️ {descripcion}: calculando en segundo plano ({trabajo.segundos():.0f} s)…")
+        else:
+            hechas, total = avance
+            st.progress(hechas / total, text=f"⚙️ {descripcion}: {hechas:,} / {total:,} "
+                                             f"({trabajo.segundos():.0f} s)")
+    elif trabajo.estado == 'cancelando':
+        st.info(f"⏹ {descripcion}: deteniendo ({trabajo.segundos():.0f} s)…")
+    elif trabajo.estado == 'error':
+        st.error(f"{descripcion}: falló ({trabajo.error!r}).")
 
-    df_full = pd.merge(
-        df, df_nut,
-        on=['Variedad', 'Bioestimulante', 'Radiacion'],
-        how='inner', suffixes=('_chl', '_nut')
-    )
 
-    return df, df_nut, df_full
+def esperar_trabajo(trabajo, descripcion):
+    """
+    Dibuja el estado del trabajo y lo consulta cada segundo con un fragmento;
+    cuando termina, vuelve a ejecutar la app para mostrar el resultado. Un
+    error queda a la vista: se reintenta en la siguiente interacción, no en
+    un ciclo de reruns.
+    """
+    if trabajo.terminado:
+        estado_trabajo(trabajo, descripcion)
+        return
 
-df, df_nut, df_full = cargar_datos()
+    @st.fragment(run_every=1)
+    def sondear():
+        if trabajo.terminado and trabajo.estado != 'error':
+            st.rerun()
+        estado_trabajo(trabajo, descripcion)
+
+    sondear()
+
+
+# ── Modelo ML: registro en disco, entrenamiento solo si no hay artefacto ───────
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _modelo_registrado(nombre, _manifiesto):
+    # Por nombre de versión: una versión nueva del registro se carga aparte
+    return registro.cargar(_manifiesto)
 
-# ── Cache para el modelo ML (solo se entrena una vez) ──────────────────────────
-@st.cache_resource
-def entrenar_modelo_rf(df_full):
+
+def obtener_modelo_rf(df_full):
     """
-    Pipeline ML completo:
-    1. Feature engineering con codificación ordinal/one-hot.
-    2. GridSearchCV (5-fold) para encontrar hiperparámetros óptimos.
-    3. Evaluación final con CV anidada para métricas no sesgadas.
-    Retorna: modelo final, X, y, métricas, importancias, predicciones OOF.
+    Artefacto más reciente del registro para estos datos, o None mientras se
+    entrena. Si no existe (p. ej. no se corrió `python entrenar.py` o los datos
+    cambiaron), el entrenamiento se envía al planificador (un solo trabajo por
+    huella aunque lo pidan varias sesiones) y queda registrado para los
+    siguientes arranques. Si los datos solo agregan filas al último modelo
+    registrado, se actualiza ese modelo en lugar de repetir la búsqueda.
     """
-    X_raw = df_full[['Variedad', 'Bioestimulante', 'Radiacion',
-                      'Clorofila_a', 'Clorofila_b',
-                      'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']].copy()
-    y = df_full['Clorofila_total'].values
-
-    # Codificación ordinal de categóricas (suficiente para árboles)
-    le_var  = LabelEncoder()
-    le_bio  = LabelEncoder()
-    X_raw['Variedad_enc']       = le_var.fit_transform(X_raw['Variedad'])
-    X_raw['Bioestimulante_enc'] = le_bio.fit_transform(X_raw['Bioestimulante'])
-    X_raw['Radiacion_norm']     = X_raw['Radiacion'] / 440.0
-
-    feature_cols = ['Variedad_enc', 'Bioestimulante_enc', 'Radiacion_norm',
-                    'Clorofila_a', 'Clorofila_b',
-                    'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']
-    feature_names = ['Variedad', 'Bioestimulante', 'Radiación (norm)',
-                     'Clorofila a', 'Clorofila b',
-                     'Nitrógeno', 'Fósforo', 'Potasio', 'Calcio', 'Magnesio']
-    X = X_raw[feature_cols].values
-
-    # ── GridSearchCV con KFold estratificado ──────────────────────────────────
-    # Espacio de búsqueda reducido para ~22 obs — evitar sobreajuste
-    param_grid = {
-        'n_estimators':  [100, 200, 300],
-        'max_depth':     [2, 3, 4],      # profundidad baja = regularización
-        'min_samples_leaf': [2, 3],      # hoja mínima = 2 obs → no sobre-ajusta
-        'max_features':  ['sqrt', 0.7],
-    }
+    huella = df_full.attrs['huella']
+    manifiesto = registro.ultimo_manifiesto(huella)
+    if manifiesto is None:
+        # `enviar` devuelve el trabajo en curso o terminado y reenvía uno que falló
+        trabajo = planificador().enviar(('modelo_rf', huella), entrenar_y_registrar, df_full, huella,
+                                        incremental=True)
+        if trabajo.estado != 'listo':
+            return None
+        manifiesto = trabajo.resultado   # el manifiesto que acaba de registrar
+    return _modelo_registrado(manifiesto['nombre'], manifiesto)
+
+
+def version_modelo(entradas):
+    """
+    Versión registrada más reciente para `df_full` (fuente del grafo), o ''
+    si aún no hay ninguna: None dejaría 'modelo' pendiente sin llegar a
+    enviar el entrenamiento.
+    """
+    manifiesto = registro.ultimo_manifiesto(entradas['df_full'].attrs['huella'])
+    return manifiesto['nombre'] if manifiesto else ''
 
-    kf = KFold(n_splits=5, shuffle=True, random_state=42)
-    rf_base = RandomForestRegressor(random_state=42, n_jobs=-1)
 
-    grid_search = GridSearchCV(
-        rf_base, param_grid, cv=kf,
-        scoring='neg_mean_squared_error',
-        n_jobs=-1, refit=True
-    )
-    grid_search.fit(X, y)
-    best_model = grid_search.best_estimator_
-
-    # ── Métricas no sesgadas con CV en modelo óptimo ──────────────────────────
-    r2_scores  = cross_val_score(best_model, X, y, cv=kf, scoring='r2')
-    mse_scores = -cross_val_score(best_model, X, y, cv=kf,
-                                  scoring='neg_mean_squared_error')
-    mae_scores = -cross_val_score(best_model, X, y, cv=kf,
-                                  scoring='neg_mean_absolute_error')
-
-    # ── Predicciones train (para comparar observed vs fitted) ─────────────────
-    best_model.fit(X, y)
-    y_pred_train = best_model.predict(X)
-
-    # ── Importancia de variables por permutación (más robusta que Gini) ───────
-    perm_imp = permutation_importance(
-        best_model, X, y, n_repeats=30, random_state=42, n_jobs=-1
-    )
-    imp_df = pd.DataFrame({
-        'Feature': feature_names,
-        'Importancia_media': perm_imp.importances_mean,
-        'Importancia_std':   perm_imp.importances_std
-    }).sort_values('Importancia_media', ascending=False).reset_index(drop=True)
-
-    # ── Curva de aprendizaje ───────────────────────────────────────────────────
-    train_sizes, train_scores, val_scores = learning_curve(
-        best_model, X, y, cv=kf, n_jobs=-1,
-        train_sizes=np.linspace(0.4, 1.0, 6),
-        scoring='r2'
-    )
-    lc_df = pd.DataFrame({
-        'train_size':   train_sizes,
-        'train_mean':   train_scores.mean(axis=1),
-        'train_std':    train_scores.std(axis=1),
-        'val_mean':     val_scores.mean(axis=1),
-        'val_std':      val_scores.std(axis=1),
-    })
+def seccion_pendiente(seccion, anterior, meta, df_full, funcion, *args):
+    """
+    Resultado de una sección que la actualización incremental dejó pendiente
+    (ver modelo.actualizar_modelo_rf): se muestra el del modelo anterior y
+    solo se recalcula, en el planificador, si el usuario lo pide.
+    """
+    if seccion not in meta.get('pendientes', ()):
+        return anterior
+    clave = (seccion, df_full.attrs['huella'])
+    trabajo = planificador().trabajo(clave)
+    if trabajo is None or trabajo.estado != 'listo':
+        st.caption(f"Calculada con las {meta['filas_importancia']} observaciones del modelo anterior; "
+                   f"el modelo se actualizó con {len(df_full)}.")
+        if st.toggle("Recalcular con los datos actuales", key=f"recalcular_{seccion}"):
+            try:
+                trabajo = planificador().enviar(clave, funcion, *args)
+            except ColaLlena:
+                st.warning("El servidor está ocupado con otros cálculos; vuelve a intentarlo en unos minutos.")
+                return anterior
+            if trabajo.estado != 'listo':
+                esperar_trabajo(trabajo, "Recalculando")
+                return anterior
+        else:
+            return anterior
+    return trabajo.resultado
 
-    metricas = {
-        'r2_mean':  r2_scores.mean(),
-        'r2_std':   r2_scores.std(),
-        'mse_mean': mse_scores.mean(),
-        'mae_mean': mae_scores.mean(),
-        'best_params': grid_search.best_params_,
-    }
 
-    meta = {
-        'le_var': le_var,
-        'le_bio': le_bio,
-        'feature_cols': feature_cols,
-    }
+@st.cache_resource(show_spinner=False)
+def servicio_anova():
+    """Servicio ANOVA memoizado, compartido por todas las sesiones (ver anova.py)."""
+    return ServicioANOVA(max_entradas=32)
+
+
+def obtener_anova(df, formula=FORMULA_ANOVA, typ=2):
+    """Tabla ANOVA, ajustados y residuos de `formula` sobre la tabla de clorofila."""
+    return servicio_anova().ajustar(formula, df, typ=typ, huella=df.attrs['huella'])
+
+
+def obtener_anova_lote(datos, respuestas, orden=1, typ=2):
+    """ANOVA de FACTORES_ANOVA para varias respuestas con un solo diseño (ver anova.py)."""
+    return servicio_anova().ajustar_lote(datos, respuestas, FACTORES_ANOVA, orden=orden,
+                                         typ=typ, huella=datos.attrs['huella'])
+
+
+# ── Grafo de artefactos derivados ─────────────────────────────────────────────
+# datos → supuestos → Shapiro/Levene → KPIs; datos → ANOVA → KPIs;
+# datos → modelo → importancia, curva, bosque plano → barrido (ver grafo.py)
+@st.cache_resource(show_spinner=False)
+def grafo():
+    """
+    Grafo de cálculo compartido por todas las sesiones; fuentes: df, df_full y
+    la versión vigente del registro de modelos para df_full (se lee en cada
+    llamada: un modelo registrado después, p. ej. por `python entrenar.py`,
+    invalida 'modelo' y lo que depende de él sin reiniciar el proceso).
+    """
+    g = GrafoCalculo(max_entradas=64)
+    g.fuente('df')
+    g.fuente('df_full')
+    g.fuente('version_modelo', obtener=version_modelo)
+
+    @g.nodo(dependencias=('df_full',))
+    def supuestos(df_full):
+        return pruebas_supuestos(df_full, VARIABLES_RESPUESTA,
+                                 agrupaciones=(None, 'Radiacion', 'Variedad', 'Bioestimulante'))
+
+    @g.nodo(dependencias=('supuestos',))
+    def tabla_shapiro(supuestos):
+        shapiro = (supuestos[(supuestos['Prueba'] == 'shapiro') & (supuestos['Agrupacion'] == 'Todos')]
+                   .set_index('Variable').loc[VARIABLES_RESPUESTA])
+        return pd.DataFrame({
+            "Variable": VARIABLES_RESPUESTA,
+            "W": shapiro['Estadistico'].round(3).to_numpy(),
+            "p-valor": shapiro['p_valor'].round(4).to_numpy(),
+            "Conclusión": np.where(shapiro['p_valor'] > 0.05, "✔ Normal", "✖ No normal"),
+        })
+
+    @g.nodo(dependencias=('supuestos',))
+    def tabla_levene(supuestos):
+        # Levene centrado en la mediana (el de pingouin/scipy por defecto)
+        levene = (supuestos[(supuestos['Prueba'] == 'brown-forsythe')
+                            & (supuestos['Agrupacion'] == 'Radiacion')]
+                  .set_index('Variable').loc[VARIABLES_RESPUESTA])
+        return pd.DataFrame({
+            "Variable": VARIABLES_RESPUESTA,
+            "W": levene['Estadistico'].round(3).to_numpy(),
+            "p-valor": levene['p_valor'].round(4).to_numpy(),
+            "Conclusión": np.where(levene['p_valor'] > 0.05, "Homogéneas", "Diferentes"),
+        })
+
+    @g.nodo(dependencias=('df',))
+    def anova(df):
+        return obtener_anova(df)
+
+    @g.nodo(dependencias=('df',))
+    def anova_clorofila(df):
+        return obtener_anova_lote(df, ['Clorofila_total'])['Clorofila_total']
+
+    @g.nodo(dependencias=('df_full',), parametros=('orden', 'typ'))
+    def anova_respuestas(df_full, orden=1, typ=2):
+        return obtener_anova_lote(df_full, VARIABLES_RESPUESTA, orden=orden, typ=typ)
+
+    @g.nodo(dependencias=('df', 'df_full', 'anova_clorofila', 'tabla_shapiro', 'tabla_levene'))
+    def kpis(df, df_full, tabla_anova, df_shapiro, df_levene):
+        eta_sq = tabla_anova['sum_sq'] / tabla_anova['sum_sq'].sum()
+        error_pct = float(eta_sq.loc['Residual'] * 100)
+
+        best_row = df.loc[df['Clorofila_total'].idxmax()]
+        best_cl = float(best_row['Clorofila_total'])
+        mean_testigo = df[df['Bioestimulante'] == 'T']['Clorofila_total'].mean()
+
+        return {
+            'normales': int((df_shapiro['Conclusión'] == '✔ Normal').sum()),
+            'homogeneas': int((df_levene['Conclusión'] == 'Homogéneas').sum()),
+            'significativos': int((tabla_anova['PR(>F)'] < 0.05).sum()),
+            'factores_pct': 100 - error_pct,
+            'best_trat': f"{best_row['Variedad']}.{best_row['Bioestimulante']}.{best_row['Radiacion']}",
+            'best_cl': best_cl,
+            'mejora_pct': (best_cl - mean_testigo) / mean_testigo * 100,
+            'r_pk': float(df_full[['Potasio', 'Clorofila_total']].corr().iloc[0, 1]),
+        }
+
+    @g.nodo(dependencias=('df_full', 'version_modelo'))
+    def modelo(df_full, version):
+        return obtener_modelo_rf(df_full)        # None mientras se entrena: queda pendiente
+
+    # La curva viene en el artefacto (o queda pendiente tras una actualización
+    # incremental, ver seccion_pendiente)
+    @g.nodo(dependencias=('modelo',))
+    def curva(artefacto):
+        return artefacto[7]
+
+    @g.nodo(dependencias=('modelo',))
+    def bosque_plano(artefacto):
+        return BosquePlano(artefacto[0])         # nodos aplanados una sola vez (ver bosque.py)
+
+    @g.nodo(dependencias=('modelo', 'bosque_plano'))
+    def predicciones_oob(artefacto, bosque):
+        # Un modelo actualizado de forma incremental tiene árboles de otra
+        # muestra bootstrap: sin OOB válido
+        if artefacto[5].get('incremental'):
+            return np.full(len(artefacto[2]), np.nan)
+        return calcular_oob(artefacto[0], artefacto[1], bosque)
+
+    @g.nodo(dependencias=('bosque_plano',))
+    def explicador_shap(bosque):
+        return ExplicadorSHAP(bosque)            # caminos de las hojas para TreeSHAP (ver explicaciones.py)
+
+    @g.nodo(dependencias=('explicador_shap', 'modelo', 'df_full'))
+    def shap_global(explicador, artefacto, df_full):
+        return resumen_global(explicador, artefacto[1], preparar_features(df_full)[3])
+
+    # La importancia por variable viene en el artefacto (o queda pendiente tras
+    # una actualización incremental, ver seccion_pendiente); en bloque y
+    # condicional se calculan en lote sobre el bosque plano (ver importancia.py)
+    @g.nodo(dependencias=('modelo', 'bosque_plano', 'df_full'), parametros=('permutacion',))
+    def importancia(artefacto, bosque, df_full, permutacion='individual'):
+        if permutacion == 'individual':
+            return artefacto[6]
+        X, y, feature_cols, feature_names = preparar_features(df_full)[:4]
+        if permutacion == 'nutrientes':
+            opciones = {'grupos': {'Nutrientes (N, P, K, Ca, Mg)':
+                                   [feature_cols.index(c) for c in GRUPO_NUTRIENTES]}}
+        else:
+            opciones = {'condicionar': [feature_cols.index('Radiacion_norm')]}
+        return importancia_permutacion(bosque, X, y, feature_names, **opciones)
+
+    @g.nodo(dependencias=('modelo', 'bosque_plano'))
+    def bosque_cuantil(artefacto, bosque):
+        # Hojas de entrenamiento indexadas una sola vez (ver cuantiles.py)
+        return BosqueCuantil(bosque, artefacto[1], artefacto[2])
+
+    @g.nodo(dependencias=('bosque_plano', 'df_full', 'modelo', 'bosque_cuantil'),
+            parametros=('radiaciones',))
+    def barrido(bosque, df_full, artefacto, cuantil, radiaciones=tuple(RADIACIONES_PAR)):
+        # variedad × bioestimulante × radiación (ver barrido.py)
+        return cubo_predicciones(bosque, df_full, artefacto[-1], list(radiaciones), cuantil=cuantil)
+
+    return g
+
+
+def obtener_supuestos(df_full):
+    """Shapiro–Wilk, Levene, Brown–Forsythe y Bartlett de todas las respuestas (ver supuestos.py)."""
+    return grafo().valor('supuestos', df_full=df_full)
+
+
+def obtener_bosque_plano(df_full):
+    """Bosque del modelo registrado para estos datos, aplanado (ver bosque.py)."""
+    return grafo().valor('bosque_plano', df_full=df_full)
+
 
-    return best_model, X, y, y_pred_train, metricas, imp_df, lc_df, meta
+def obtener_cubo_barrido(df_full, radiaciones):
+    """Barrido variedad × bioestimulante × radiación en caché (ver barrido.py)."""
+    return grafo().valor('barrido', df_full=df_full, radiaciones=tuple(radiaciones))
+
+
+@st.cache_resource(show_spinner=False)
+def trabajos_bootstrap():
+    """Trabajos de bootstrap por (tipo, huella), compartidos entre sesiones."""
+    return threading.Lock(), {}
+
+
+def obtener_bootstrap(tipo, datos, calcular, n_replicas, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Trabajo de bootstrap `tipo` sobre `datos`; se lanza en segundo plano la
+    primera vez que se pide y se cancelan los de huellas anteriores.
+    """
+    huella = datos.attrs['huella']
+    lock, trabajos = trabajos_bootstrap()
+    with lock:
+        if (tipo, huella) not in trabajos:
+            for (t, h), viejo in list(trabajos.items()):
+                if t == tipo:
+                    viejo.cancelar()
+                    del trabajos[(t, h)]
+            indices = indices_bootstrap(codigos_estrato(datos, ESTRATOS_BOOTSTRAP),
+                                        n_replicas, SEMILLA_BOOTSTRAP)
+            trabajos[(tipo, huella)] = TrabajoBootstrap(calcular, indices, tamano_bloque).iniciar()
+        return trabajos[(tipo, huella)]
+
+
+def detener_bootstrap():
+    """Cancela todos los trabajos en curso (se conserva lo ya calculado)."""
+    lock, trabajos = trabajos_bootstrap()
+    with lock:
+        for trabajo in trabajos.values():
+            trabajo.cancelar()
+
+
+def texto_intervalo(trabajo, kpi, formato='{:.3f}'):
+    """Delta de una tarjeta de KPI: IC 95 % bootstrap y avance si sigue en curso."""
+    if trabajo.error is not None:
+        return "IC 95 %: no disponible"
+    resumen = trabajo.resumen()
+    if kpi not in resumen.index or resumen.loc[kpi, 'replicas'] == 0:
+        return f"IC 95 %: calculando… ({trabajo.hechas}/{trabajo.total})"
+    bajo, alto = resumen.loc[kpi, ['bajo', 'alto']]
+    texto = f"IC 95 %: {formato.format(bajo)} – {formato.format(alto)}"
+    if not trabajo.terminado:
+        texto += f" ({trabajo.hechas}/{trabajo.total})"
+    elif trabajo.cancelado and trabajo.hechas < trabajo.total:
+        texto += f" ({trabajo.hechas} réplicas)"
+    return texto
+
+
+def obtener_bootstrap_rf(df_full, X, y, params):
+    """
+    Bootstrap de las métricas del bosque como trabajo del planificador, por
+    huella de los datos e hiperparámetros. Uno detenido no se relanza; uno
+    que falló, sí. None si la cola está llena.
+    """
+    clave = ('bootstrap_rf', df_full.attrs['huella'], repr(sorted(params.items())))
+    trabajo = planificador().trabajo(clave)
+    if trabajo is None or trabajo.estado == 'error':
+        indices = indices_bootstrap(codigos_estrato(df_full, ESTRATOS_BOOTSTRAP),
+                                    REPLICAS_BOOTSTRAP_RF, SEMILLA_BOOTSTRAP)
+        try:
+            trabajo = planificador().enviar(clave, bootstrap_rf, X, y, indices, params,
+                                            n_arboles=ARBOLES_BOOTSTRAP_RF)
+        except ColaLlena:
+            return None
+    return trabajo
+
+
+def texto_intervalo_planificado(trabajo, kpi, formato='{:.3f}'):
+    """Como `texto_intervalo`, para un bootstrap que corre en el planificador."""
+    if trabajo is None or trabajo.estado in ('error', 'cancelado'):
+        return "IC 95 %: no disponible"
+    if trabajo.estado == 'cancelando':
+        return "IC 95 %: deteniendo…"
+    if trabajo.estado != 'listo':
+        avance = trabajo.avance()
+        return "IC 95 %: calculando…" + (f" ({avance[0]}/{avance[1]})" if avance else "")
+    bajo, alto = intervalo(trabajo.resultado[kpi])
+    return f"IC 95 %: {formato.format(bajo)} – {formato.format(alto)}"
+
+
+# ── Precarga en segundo plano ────────────────────────────────────────────────
+# Nodos del grafo de las demás pestañas que se calientan cuando la página ya se
+# dibujó, para que abrir otra pestaña encuentre la caché llena.
+NODOS_PRECARGA = ('tabla_shapiro', 'tabla_levene', 'anova', 'kpis', 'anova_respuestas',
+                  'modelo')          # sin artefacto, 'modelo' solo encola el entrenamiento
+ESPERA_PRECARGA = 2.0      # segundos tras el primer dibujo
+
+
+@st.cache_resource(show_spinner=False)
+def precargas():
+    """Huellas ya precargadas, compartidas entre sesiones."""
+    return threading.Lock(), set()
+
+
+def precargar(df, df_full, espera=ESPERA_PRECARGA):
+    """Evalúa NODOS_PRECARGA en un hilo de fondo, una vez por huella de los datos."""
+    huellas = (df.attrs['huella'], df_full.attrs['huella'])
+    lock, hechas = precargas()
+    with lock:
+        if huellas in hechas:
+            return
+        hechas.add(huellas)
+
+    def correr():
+        time.sleep(espera)
+        for nodo in NODOS_PRECARGA:
+            try:
+                grafo().valor(nodo, df=df, df_full=df_full)
+            except Exception:            # la pestaña lo recalcula y muestra el error
+                logging.getLogger(__name__).exception(
+                    'Falló la precarga del nodo %r (huellas %s)', nodo, huellas)
+
+    threading.Thread(target=correr, daemon=True).start()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  TABS
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Solo se ejecuta la pestaña abierta (on_change="rerun" + `.open`); las demás
+# se precalientan en segundo plano (ver `precargar`)
 tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "📘 Introducción y Objetivos",
     "📊 Exploración de Datos",
@@ -223,10 +489,11 @@ tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "🧪 ANOVA y Diagnóstico de Residuos",
     "📈 KPIs y Conclusiones",
     "🤖 Modelo de Machine Learning",
-])
+], key="pestana", on_change="rerun")
 
 # ──────────────────────────────────────────────────────────────────────────────
-with tab1:
+def pestana_introduccion():
+    """Introducción y objetivos del ensayo."""
     st.subheader("Introducción")
     st.markdown("""
     Este dashboard presenta un análisis interactivo del experimento desarrollado por  
@@ -274,7 +541,8 @@ with tab1:
     """)
 
 # ──────────────────────────────────────────────────────────────────────────────
-with tab2:
+def pestana_exploracion():
+    """Exploración de las tablas de clorofila y nutrientes."""
     st.subheader("Análisis Exploratorio de Datos (EDA)")
 
     st.markdown("""
@@ -292,6 +560,16 @@ with tab2:
     st.dataframe(df_nut, use_container_width=True, height=240)
     st.caption("Variables nutricionales: N, P, K, Ca y Mg para cada combinación experimental.")
 
+    sin_pareja = df_full.attrs['sin_pareja']
+    st.warning(
+        f"**Intersección clorofila–nutrientes:** {len(df_full)} observaciones "
+        f"(de {len(df)} de clorofila y {len(df_nut)} de nutrientes). "
+        f"Tratamientos sin pareja en clorofila ({len(sin_pareja['clorofila'])}): "
+        f"{', '.join(sin_pareja['clorofila']) or '—'}. "
+        f"Tratamientos sin pareja en nutrientes ({len(sin_pareja['nutrientes'])}): "
+        f"{', '.join(sin_pareja['nutrientes']) or '—'}."
+    )
+
     st.divider()
 
     st.markdown("## Distribución de variables fisiológicas y nutricionales")
@@ -395,8 +673,7 @@ with tab2:
 
     st.markdown("## Correlaciones entre variables fisiológicas y nutricionales")
 
-    num_cols = ['Clorofila_a','Clorofila_b','Clorofila_total',
-                'Nitrogeno','Fosforo','Potasio','Calcio','Magnesio']
+    num_cols = VARIABLES_RESPUESTA
 
     corr = df_full[num_cols].corr().reset_index().melt('index')
     corr.columns = ['Variable1','Variable2','Correlacion']
@@ -435,7 +712,8 @@ with tab2:
     )
 
 # ──────────────────────────────────────────────────────────────────────────────
-with tab3:
+def pestana_pruebas():
+    """Pruebas de normalidad y homogeneidad de varianzas."""
     st.subheader("📌 ¿Qué evalúa la prueba de Shapiro–Wilk?")
 
     st.markdown("""
@@ -469,11 +747,7 @@ with tab3:
     - Si **p < 0.05** → ❌ *Datos no normales*
     """)
 
-    resultados = []
-    for col in ['Clorofila_a','Clorofila_b','Clorofila_total','Nitrogeno','Fosforo','Potasio','Calcio','Magnesio']:
-        W, p = pg.normality(df_full[col], method='shapiro')[['W','pval']].values[0]
-        resultados.append([col, round(W,3), round(p,4), "✔ Normal" if p>0.05 else "✖ No normal"])
-    df_shapiro = pd.DataFrame(resultados, columns=["Variable","W","p-valor","Conclusión"])
+    df_shapiro = grafo().valor('tabla_shapiro', df_full=df_full)
 
     st.dataframe(df_shapiro, use_container_width=True)
 
@@ -519,21 +793,22 @@ with tab3:
     - Si **p < 0.05** → ❌ *Varianzas diferentes*
     """)
 
-    res_levene = []
-    for col in df_shapiro["Variable"]:
-        grupos = [df_full[df_full["Radiacion"] == r][col] for r in df_full["Radiacion"].unique()]
-        test = pg.homoscedasticity(data=df_full, dv=col, group='Radiacion')
-        W = test['W'].values[0]
-        p = test['pval'].values[0]
-        res_levene.append([col, round(W,3), round(p,4), "Homogéneas" if p>0.05 else "Diferentes"])
-
-    df_levene = pd.DataFrame(res_levene, columns=["Variable","W","p-valor","Conclusión"])
+    df_levene = grafo().valor('tabla_levene', df_full=df_full)
     st.dataframe(df_levene, use_container_width=True)
 
     homogeneas = (df_levene["Conclusión"]=="Homogéneas").sum()
     st.info(f" **Interpretación:** {homogeneas}/8 variables presentan varianzas homogéneas. "
             f"La única variable que presenta heterogeneidad significativa es **Clorofila_a**, "
-            f"lo cual coincide con su comportamiento atípico (también en Shapiro).")    
+            f"lo cual coincide con su comportamiento atípico (también en Shapiro).")
+
+    with st.expander("🔎 Detalle de supuestos por factor (Shapiro por grupo, Levene, Brown–Forsythe, Bartlett)"):
+        st.dataframe(
+            obtener_supuestos(df_full).round({'Estadistico': 4, 'p_valor': 4}),
+            use_container_width=True, height=320
+        )
+        st.caption("Levene centra en la media del grupo; Brown–Forsythe en la mediana "
+                   "(es la versión usada en la tabla anterior). Shapiro–Wilk por grupo "
+                   "solo para grupos con al menos 3 observaciones.")
 
     st.subheader("📌 ¿Qué implica el supuesto de independencia?")
 
@@ -572,7 +847,8 @@ with tab3:
 st.divider()
 
 # ──────────────────────────────────────────────────────────────────────────────
-with tab4:
+def pestana_anova():
+    """ANOVA trifactorial, permutaciones y diagnóstico de residuos."""
     st.subheader("Modelo ANOVA (formulación matemática)")
 
     st.latex(r"""
@@ -602,14 +878,50 @@ with tab4:
     st.markdown("---")
     st.subheader("ANOVA Trifactorial sobre Clorofila total")
 
-    modelo = smf.ols('Clorofila_total ~ C(Radiacion) + C(Bioestimulante) + C(Variedad)', data=df).fit()
-    tabla_anova = anova_lm(modelo, typ=2)
+    ajuste_anova = grafo().valor('anova', df=df)
+    tabla_anova = ajuste_anova.tabla
     st.dataframe(tabla_anova.round(4), use_container_width=True)
 
+    st.markdown("#### p-valores por permutaciones (Freedman–Lane)")
+    st.markdown("""
+    Cuando una respuesta no cumple normalidad u homogeneidad de varianzas (como **Clorofila_a**
+    en las pruebas de supuestos), el p-valor de la F paramétrica deja de ser confiable.
+    La prueba por permutaciones compara la F observada de cada factor con su distribución
+    al permutar los residuos del modelo reducido, sin suponer normalidad.
+    """)
+
+    col_p1, col_p2 = st.columns(2)
+    with col_p1:
+        respuesta_perm = st.selectbox("Respuesta", ['Clorofila_a', 'Clorofila_b', 'Clorofila_total'],
+                                      key="respuesta_perm")
+    with col_p2:
+        n_perm = st.select_slider("Número de permutaciones", [10_000, 20_000, 50_000, 100_000],
+                                  key="n_perm")
+
+    if st.toggle("Calcular p-valores por permutaciones", key="calcular_perm"):
+        clave_perm = ('permutaciones', df.attrs['huella'], respuesta_perm, n_perm)
+        try:
+            # Un proceso por trabajo: el tope de CPU lo pone el planificador
+            trabajo_perm = planificador().enviar(
+                clave_perm, anova_permutaciones, df, respuesta_perm, FACTORES_ANOVA,
+                n_permutaciones=n_perm, semilla=SEMILLA_PERMUTACIONES, n_procesos=1,
+            )
+        except ColaLlena:
+            trabajo_perm = None
+            st.warning("El servidor está ocupado con otros cálculos; vuelve a intentarlo en unos minutos.")
+        if trabajo_perm is not None and trabajo_perm.estado == 'listo':
+            tabla_perm = trabajo_perm.resultado
+            st.dataframe(tabla_perm[['sum_sq', 'df', 'F', 'PR(>F)', 'PR(perm)']].round(4),
+                         use_container_width=True)
+            st.caption(f"{n_perm:,} permutaciones (semilla {SEMILLA_PERMUTACIONES}). "
+                       f"El menor p-valor alcanzable es 1/({n_perm:,} + 1).")
+        elif trabajo_perm is not None:
+            esperar_trabajo(trabajo_perm, f"{n_perm:,} permutaciones de {respuesta_perm}")
+
     st.markdown("### Diagnóstico de residuos")
 
-    fitted = modelo.fittedvalues
-    resid = modelo.resid
+    fitted = ajuste_anova.ajustados
+    resid = ajuste_anova.residuos
     resid_std = (resid - resid.mean()) / resid.std(ddof=1)
 
     resid_df = pd.DataFrame({
@@ -701,48 +1013,65 @@ with tab4:
     """)
 
 # ──────────────────────────────────────────────────────────────────────────────
-with tab5:
+def pestana_kpis():
+    """KPIs con intervalos bootstrap y ANOVA multirespuesta."""
     st.subheader("Indicadores Clave del Modelo (KPIs)")
 
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Variables normales",
-                f"{(df_shapiro['Conclusión']=='✔ Normal').sum()}/8")
-    col2.metric("Varianzas homogéneas",
-                f"{(df_levene['Conclusión']=='Homogéneas').sum()}/8")
-    col3.metric("Factores significativos (p<0.05)",
-                f"{(tabla_anova['PR(>F)']<0.05).sum()}")
-
-    eta_sq = tabla_anova['sum_sq'] / tabla_anova['sum_sq'].sum()
-    error_pct = float(eta_sq.loc['Residual'] * 100)
-    factores_pct = 100 - error_pct
-
-    idx_best = df['Clorofila_total'].idxmax()
-    best_row = df.loc[idx_best]
-    best_trat = f"{best_row['Variedad']}.{best_row['Bioestimulante']}.{best_row['Radiacion']}"
-    best_cl = float(best_row['Clorofila_total'])
-
-    mean_testigo = df[df['Bioestimulante'] == 'T']['Clorofila_total'].mean()
-    mejora_pct = (best_cl - mean_testigo) / mean_testigo * 100
-
-    r_pk = float(df_full[['Potasio', 'Clorofila_total']].corr().iloc[0, 1])
-
-    st.markdown("### KPIs de desempeño agronómico y del modelo")
-
-    col4, col5, col6 = st.columns(3)
-    col4.metric("Varianza explicada por el modelo",
-                f"{factores_pct:0.1f} %",
-                help="1 − porcentaje explicado por el residuo en el ANOVA.")
-    col5.metric("Mejor tratamiento (Clorofila total)",
-                best_trat,
-                f"{best_cl:0.2f} mg·g⁻¹ PMF")
-    col6.metric("Mejora vs promedio testigo",
-                f"{mejora_pct:0.1f} %",
-                help="Comparado con el promedio de tratamientos sin bioestimulante (T).")
-
-    col7, _, _ = st.columns(3)
-    col7.metric("Correlación K–Clorofila total",
-                f"r = {r_pk:0.2f}",
-                help="Correlación de Pearson entre Potasio y Clorofila total.")
+    k = grafo().valor('kpis', df=df, df_full=df_full)
+
+    # Intervalos bootstrap: ANOVA vectorizado sobre la tabla de clorofila y
+    # correlación ponderada sobre la tabla combinada
+    problema_boot = preparar_anova(df, 'Clorofila_total', FACTORES_ANOVA)
+    boot_anova = obtener_bootstrap('anova', df, lambda idx: kpis_anova(problema_boot, idx),
+                                   REPLICAS_BOOTSTRAP)
+    x_k, y_cl = df_full['Potasio'].to_numpy(float), df_full['Clorofila_total'].to_numpy(float)
+    boot_r = obtener_bootstrap('correlacion', df_full,
+                               lambda idx: {'r': correlacion_ponderada(x_k, y_cl, idx)},
+                               REPLICAS_BOOTSTRAP)
+
+    boot_kpi_pendiente = not (boot_anova.terminado and boot_r.terminado)
+
+    @st.fragment(run_every=2 if boot_kpi_pendiente else None)
+    def tarjetas_kpi():
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Variables normales",
+                    f"{k['normales']}/8")
+        col2.metric("Varianzas homogéneas",
+                    f"{k['homogeneas']}/8")
+        col3.metric("Factores significativos (p<0.05)",
+                    f"{k['significativos']}",
+                    texto_intervalo(boot_anova, 'significativos', '{:.0f}'), delta_color="off",
+                    delta_arrow="off")
+
+        st.markdown("### KPIs de desempeño agronómico y del modelo")
+
+        col4, col5, col6 = st.columns(3)
+        col4.metric("Varianza explicada por el modelo",
+                    f"{k['factores_pct']:0.1f} %",
+                    texto_intervalo(boot_anova, 'factores_pct', '{:.1f} %'), delta_color="off",
+                    delta_arrow="off",
+                    help="1 − porcentaje explicado por el residuo en el ANOVA. "
+                         "IC bootstrap estratificado por radiación.")
+        col5.metric("Mejor tratamiento (Clorofila total)",
+                    k['best_trat'],
+                    f"{k['best_cl']:0.2f} mg·g⁻¹ PMF")
+        col6.metric("Mejora vs promedio testigo",
+                    f"{k['mejora_pct']:0.1f} %",
+                    help="Comparado con el promedio de tratamientos sin bioestimulante (T).")
+
+        col7, _, _ = st.columns(3)
+        col7.metric("Correlación K–Clorofila total",
+                    f"r = {k['r_pk']:0.2f}",
+                    texto_intervalo(boot_r, 'r', '{:.2f}'), delta_color="off", delta_arrow="off",
+                    help="Correlación de Pearson entre Potasio y Clorofila total.")
+
+        if not (boot_anova.terminado and boot_r.terminado):
+            if st.button("⏹ Detener bootstrap", key="detener_boot_kpi"):
+                detener_bootstrap()
+        elif boot_kpi_pendiente:
+            st.rerun()              # terminó mientras se sondeaba: el rerun completo detiene el sondeo
+
+    tarjetas_kpi()
 
     st.markdown("""
     **Lectura rápida de los KPIs:**
@@ -750,13 +1079,49 @@ with tab5:
     - El modelo explica una fracción importante de la variabilidad observada en clorofila, por encima del ruido experimental.  
     - Existe un **tratamiento óptimo** en clorofila total (*{trat}*), que mejora en alrededor de **{mejora:.1f}%** al testigo.  
     - La relación entre **Potasio** y **Clorofila total** es de magnitud `r ≈ {r:.2f}`, lo que respalda el uso de K como indicador fisiológico clave.
-    """.format(trat=best_trat, mejora=mejora_pct, r=r_pk))
+    """.format(trat=k['best_trat'], mejora=k['mejora_pct'], r=k['r_pk']))
+
+    st.divider()
+
+    # ── ANOVA de todas las respuestas ────────────────────────────────────────
+    st.markdown("### ANOVA multirespuesta (clorofilas y nutrientes)")
+
+    st.markdown("""
+    El mismo ANOVA trifactorial aplicado a las **ocho variables de respuesta** de la intersección
+    clorofila–nutrientes. La tabla muestra el **η²** (proporción de la suma de cuadrados) de cada
+    factor por respuesta; los asteriscos marcan efectos significativos (p < 0.05).
+    """)
+
+    col_t, col_o = st.columns(2)
+    with col_t:
+        tipo_ss = st.radio("Tipo de suma de cuadrados", [1, 2, 3], index=1, horizontal=True,
+                           format_func=lambda t: "I" * t, key="tipo_ss")
+    with col_o:
+        orden_anova = st.radio("Términos", [1, 2], horizontal=True, key="orden_anova",
+                               format_func=lambda o: "Efectos principales" if o == 1
+                               else "Con interacciones dobles")
+
+    tablas_resp = grafo().valor('anova_respuestas', df_full=df_full, orden=orden_anova, typ=tipo_ss)
+    eta_resp = eta_cuadrado(tablas_resp).drop(columns='Intercept', errors='ignore')
+    p_resp = pd.DataFrame({r: t['PR(>F)'] for r, t in tablas_resp.items()}).T[eta_resp.columns]
+    st.dataframe(
+        (eta_resp * 100).round(1).astype(str) + " %" + np.where(p_resp < 0.05, " *", ""),
+        use_container_width=True
+    )
+
+    gl_residual = int(next(iter(tablas_resp.values())).loc['Residual', 'df'])
+    st.caption(
+        f"n = {len(df_full)} observaciones, {gl_residual} g.l. residuales. "
+        "Los términos no estimables con este diseño (combinaciones sin observaciones) "
+        "aportan 0 g.l.; sin g.l. residuales no hay prueba F."
+    )
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  TAB 6 — MACHINE LEARNING
 # ══════════════════════════════════════════════════════════════════════════════
-with tab6:
+def pestana_modelo():
+    """Random Forest: métricas, importancia, curvas, predictor y barridos."""
 
     # ── Encabezado ──────────────────────────────────────────────────────────
     st.subheader("🤖 Modelo Predictivo: Random Forest con Validación Cruzada")
@@ -784,22 +1149,52 @@ with tab6:
 
     st.divider()
 
-    # ── Entrenamiento ────────────────────────────────────────────────────────
-    with st.spinner("⏳ Entrenando modelo con GridSearchCV (5-fold)…"):
-        best_model, X, y, y_pred_train, metricas, imp_df, lc_df, meta = entrenar_modelo_rf(df_full)
+    # ── Entrenamiento (en segundo plano si no hay modelo registrado) ─────────
+    try:
+        artefacto_rf = grafo().valor('modelo', df_full=df_full)
+    except ColaLlena:
+        st.warning("El servidor está ocupado con otros cálculos; vuelve a intentarlo en unos minutos.")
+        st.stop()
+    if artefacto_rf is None:
+        esperar_trabajo(planificador().trabajo(('modelo_rf', df_full.attrs['huella'])),
+                        "Entrenando modelo con GridSearchCV (5-fold)")
+        st.stop()                # el resto del tab necesita el modelo
+    best_model, X, y, y_pred_train, y_pred_oof, metricas, _, _, meta = artefacto_rf
 
     # ── KPIs del modelo ──────────────────────────────────────────────────────
     st.subheader("📊 Métricas de desempeño (5-fold Cross-Validation)")
 
-    c1, c2, c3, c4 = st.columns(4)
-    c1.metric("R² CV (media)",     f"{metricas['r2_mean']:.3f}",
-              help="Coeficiente de determinación promedio en validación cruzada. >0.85 es excelente para n≈22.")
-    c2.metric("R² CV (±std)",      f"± {metricas['r2_std']:.3f}",
-              help="Desviación estándar del R² entre folds. Bajo = modelo estable.")
-    c3.metric("RMSE CV",           f"{np.sqrt(metricas['mse_mean']):.4f}",
-              help="Raíz del error cuadrático medio en CV (mg·g⁻¹ PMF).")
-    c4.metric("MAE CV",            f"{metricas['mae_mean']:.4f}",
-              help="Error absoluto medio en CV (mg·g⁻¹ PMF).")
+    # IC bootstrap: se repite la CV con los mejores hiperparámetros y un bosque
+    # reducido sobre cada réplica, en el planificador (fuera de este proceso)
+    boot_rf = obtener_bootstrap_rf(df_full, X, y, metricas['best_params'])
+    boot_rf_pendiente = boot_rf is not None and not boot_rf.terminado
+
+    @st.fragment(run_every=2 if boot_rf_pendiente else None)
+    def tarjetas_rf():
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("R² CV (media)",     f"{metricas['r2_mean']:.3f}",
+                  texto_intervalo_planificado(boot_rf, 'r2_mean'), delta_color="off", delta_arrow="off",
+                  help="Coeficiente de determinación promedio en validación cruzada. >0.85 es excelente para n≈22.")
+        c2.metric("R² CV (±std)",      f"± {metricas['r2_std']:.3f}",
+                  texto_intervalo_planificado(boot_rf, 'r2_std'), delta_color="off", delta_arrow="off",
+                  help="Desviación estándar del R² entre folds. Bajo = modelo estable.")
+        c3.metric("RMSE CV",           f"{np.sqrt(metricas['mse_mean']):.4f}",
+                  texto_intervalo_planificado(boot_rf, 'rmse', '{:.4f}'), delta_color="off", delta_arrow="off",
+                  help="Raíz del error cuadrático medio en CV (mg·g⁻¹ PMF).")
+        c4.metric("MAE CV",            f"{metricas['mae_mean']:.4f}",
+                  texto_intervalo_planificado(boot_rf, 'mae_mean', '{:.4f}'), delta_color="off", delta_arrow="off",
+                  help="Error absoluto medio en CV (mg·g⁻¹ PMF).")
+        st.caption(f"IC 95 % bootstrap estratificado por radiación: {REPLICAS_BOOTSTRAP_RF} réplicas, "
+                   f"bosque reducido de {ARBOLES_BOOTSTRAP_RF} árboles y los mismos folds de prueba. Cada "
+                   "réplica entrena con ~63 % de filas distintas, así que el intervalo es algo pesimista.")
+
+        if boot_rf is not None and boot_rf.estado in ('en_cola', 'corriendo'):
+            if st.button("⏹ Detener bootstrap", key="detener_boot_rf"):
+                planificador().cancelar(boot_rf.clave)
+        elif boot_rf_pendiente and boot_rf.terminado:
+            st.rerun()
+
+    tarjetas_rf()
 
     st.markdown("**Hiperparámetros óptimos encontrados por GridSearchCV:**")
     params_df = pd.DataFrame([metricas['best_params']])
@@ -817,9 +1212,33 @@ with tab6:
     # ── Observed vs Predicted ────────────────────────────────────────────────
     st.subheader("🔵 Valores observados vs predichos (conjunto completo)")
 
+    # Predicciones honestas sin ajustes extra: OOF de la CV que ya se hizo u
+    # OOB de los árboles que no vieron cada fila; las de entrenamiento quedan
+    # como referencia optimista
+    y_pred_oob = grafo().valor('predicciones_oob', df_full=df_full)
+    fuentes_pred = {'oof': "Fuera de fold (CV 5-fold)", 'oob': "Fuera de bolsa (OOB)",
+                    'train': "Entrenamiento (optimista)"}
+    if np.isnan(y_pred_oob).all():
+        del fuentes_pred['oob']
+    fuente_pred = st.radio("Predicciones", list(fuentes_pred), format_func=fuentes_pred.get,
+                           horizontal=True, key="fuente_pred")
+    y_pred_sel = {'oof': y_pred_oof, 'oob': y_pred_oob, 'train': y_pred_train}[fuente_pred]
+
+    resid_sel = y - y_pred_sel
+    validas = np.isfinite(resid_sel)
+    r1, r2_, r3, r4 = st.columns(4)
+    r1.metric("R²", f"{1 - np.sum(resid_sel[validas] ** 2) / np.sum((y[validas] - y[validas].mean()) ** 2):.3f}")
+    r2_.metric("RMSE", f"{np.sqrt(np.mean(resid_sel[validas] ** 2)):.4f}")
+    r3.metric("MAE", f"{np.mean(np.abs(resid_sel[validas])):.4f}")
+    r4.metric("Sesgo medio", f"{np.mean(resid_sel[validas]):+.4f}",
+              help="Media de observado − predicho.")
+    if not validas.all():
+        st.caption(f"{(~validas).sum()} observaciones quedaron en la muestra de todos los árboles "
+                   "y no tienen predicción OOB.")
+
     obs_pred_df = pd.DataFrame({
         "Observado":  y,
-        "Predicho":   y_pred_train,
+        "Predicho":   y_pred_sel,
         "Variedad":   df_full['Variedad'].values,
         "Bioestimulante": df_full['Bioestimulante'].values,
         "Radiacion":  df_full['Radiacion'].values,
@@ -845,7 +1264,7 @@ with tab6:
             tooltip=["Observado", "Predicho", "Variedad", "Bioestimulante", "Radiacion"]
         )
         .properties(width=680, height=420,
-                    title="Observed vs Predicted — Random Forest (train)")
+                    title=f"Observed vs Predicted — Random Forest ({fuentes_pred[fuente_pred].lower()})")
         .interactive()
     )
 
@@ -855,7 +1274,8 @@ with tab6:
     **Interpretación:** Los puntos deben alinearse sobre la línea roja (y = x) para indicar  
     predicciones perfectas. La distribución cerca de la diagonal confirma que el modelo  
     aprendió correctamente las relaciones entre los factores experimentales y la clorofila total.  
-    Note que las métricas de generalización provienen de la **validación cruzada** (no del train).
+    Las predicciones **fuera de fold** y **fuera de bolsa** provienen de árboles que no vieron la  
+    observación; las de entrenamiento sobreestiman el ajuste.
     """)
 
     st.divider()
@@ -870,6 +1290,23 @@ with tab6:
     especialmente con variables categóricas como Variedad y Bioestimulante.
     """)
 
+    permutacion = st.radio(
+        "Permutación", ['individual', 'nutrientes', 'condicional'], horizontal=True,
+        key="permutacion_imp",
+        format_func={'individual': "Por variable",
+                     'nutrientes': "Nutrientes en bloque (N, P, K, Ca, Mg)",
+                     'condicional': "Condicional a la radiación"}.get,
+        help="En bloque: los cinco nutrientes, muy correlacionados, se barajan juntos y suman "
+             "una sola importancia. Condicional: cada variable se baraja solo entre plantas "
+             "del mismo nivel de radiación, sin premiar su correlación con la luz.",
+    )
+    if permutacion == 'individual':
+        imp_df = seccion_pendiente('importancia', grafo().valor('importancia', df_full=df_full), meta,
+                                   df_full, calcular_importancia, best_model, X, y,
+                                   preparar_features(df_full)[3])
+    else:
+        imp_df = grafo().valor('importancia', df_full=df_full, permutacion=permutacion)
+
     imp_chart = (
         alt.Chart(imp_df)
         .mark_bar()
@@ -913,6 +1350,51 @@ with tab6:
     Variables con importancia ≈ 0 o negativa pueden considerarse redundantes para la predicción.
     """)
 
+    # ── SHAP global ──────────────────────────────────────────────────────────
+    st.subheader("🧭 Contribuciones SHAP por observación")
+
+    st.markdown("""
+    Los **valores SHAP** (TreeSHAP exacto sobre los árboles del bosque) reparten cada predicción  
+    entre las variables: la predicción es el valor medio del modelo más la suma de las contribuciones.  
+    A diferencia de la importancia por permutación, indican también la **dirección** del efecto.
+    """)
+
+    shap_largo, shap_resumen = grafo().valor('shap_global', df_full=df_full)
+    orden_shap = list(shap_resumen['Feature'])
+
+    col_shap_l, col_shap_r = st.columns([1, 1.4])
+    with col_shap_l:
+        st.altair_chart(
+            alt.Chart(shap_resumen)
+            .mark_bar(color="#003399")
+            .encode(
+                x=alt.X("SHAP_abs_medio:Q", title="|SHAP| medio (mg·g⁻¹ PMF)"),
+                y=alt.Y("Feature:N", sort=orden_shap, title="Variable"),
+                tooltip=[alt.Tooltip("Feature:N", title="Variable"),
+                         alt.Tooltip("SHAP_abs_medio:Q", title="|SHAP| medio", format=".4f"),
+                         alt.Tooltip("SHAP_medio:Q", title="SHAP medio", format=".4f")],
+            )
+            .properties(height=340, title="Magnitud media de las contribuciones"),
+            use_container_width=True,
+        )
+    with col_shap_r:
+        st.altair_chart(
+            alt.Chart(shap_largo)
+            .mark_circle(size=60, opacity=0.8)
+            .encode(
+                x=alt.X("SHAP:Q", title="Contribución a la predicción (mg·g⁻¹ PMF)"),
+                y=alt.Y("Feature:N", sort=orden_shap, title=None),
+                color=alt.Color("Valor:Q", scale=alt.Scale(scheme="redblue", reverse=True),
+                                legend=None),
+                tooltip=[alt.Tooltip("Feature:N", title="Variable"),
+                         alt.Tooltip("Fila:Q", title="Observación"),
+                         alt.Tooltip("Valor:Q", title="Valor", format=".3f"),
+                         alt.Tooltip("SHAP:Q", title="SHAP", format=".4f")],
+            )
+            .properties(height=340, title="Contribución por observación (color: valor de la variable)"),
+            use_container_width=True,
+        )
+
     st.divider()
 
     # ── Curva de aprendizaje ─────────────────────────────────────────────────
@@ -927,6 +1409,9 @@ with tab6:
     - Si ambas están **altas** (error alto): el modelo subajusta (sesgo alto).
     """)
 
+    lc_df = seccion_pendiente('curva', grafo().valor('curva', df_full=df_full), meta,
+                              df_full, calcular_curva, best_model, X, y)
+
     lc_plot_df = pd.concat([
         lc_df[['train_size', 'train_mean']].rename(columns={'train_mean': 'R2'}).assign(Tipo='Entrenamiento'),
         lc_df[['train_size', 'val_mean']].rename(columns={'val_mean':   'R2'}).assign(Tipo='Validación CV'),
@@ -979,13 +1464,13 @@ with tab6:
         st.markdown("#### Parámetros del tratamiento")
 
         variedad_sel      = st.selectbox("Variedad",
-                                         sorted(df_full['Variedad'].unique()),
+                                         df_full.attrs['niveles']['Variedad'],
                                          help="Co=Coffea, Ma=Manabí, Ca=Castillo, Ga=Galán")
         bioest_sel        = st.selectbox("Bioestimulante",
-                                         sorted(df_full['Bioestimulante'].unique()),
+                                         df_full.attrs['niveles']['Bioestimulante'],
                                          help="T=Testigo, M=Micorrizas, A=Algas, P=Purín")
         radiacion_sel     = st.selectbox("Radiación PAR (µmol·m⁻²·s⁻¹)",
-                                         [168, 278, 440])
+                                         RADIACIONES_PAR)
 
         st.markdown("#### Variables nutricionales y fisiológicas")
         st.caption("Ajusta los valores según el perfil nutricional esperado del tratamiento.")
@@ -1025,12 +1510,12 @@ with tab6:
             nitro_in, fosf_in, potasio_in, calcio_in, magnesio_in
         ]])
 
-        # Predicciones individuales de cada árbol para intervalo de confianza
-        tree_preds = np.array([tree.predict(x_new)[0] for tree in best_model.estimators_])
-        pred_mean  = tree_preds.mean()
-        pred_std   = tree_preds.std()
-        pred_low   = pred_mean - 1.96 * pred_std
-        pred_high  = pred_mean + 1.96 * pred_std
+        # Predicciones individuales de cada árbol; el intervalo de predicción
+        # sale del bosque de cuantiles (ver cuantiles.py)
+        pred_arboles = obtener_bosque_plano(df_full).resumen(x_new, cuantiles=())
+        tree_preds = pred_arboles['arboles'][0]
+        pred_mean  = pred_arboles['media'][0]
+        (pred_low,), (pred_high,) = grafo().valor('bosque_cuantil', df_full=df_full).intervalo(x_new)
 
         # Semáforo de calidad
         if pred_mean >= 2.90:
@@ -1048,7 +1533,7 @@ with tab6:
             <h2 style="margin:0;font-size:2.4rem;color:#1a1a1a;">{pred_mean:.3f}</h2>
             <p style="margin:4px 0 0 0;color:#333;font-size:1rem;">mg·g⁻¹ PMF — Clorofila total predicha</p>
             <p style="margin:8px 0 0 0;font-size:0.9rem;color:#555;">
-                IC 95%: [{pred_low:.3f}, {pred_high:.3f}]
+                IP 95% (bosque de cuantiles): [{pred_low:.3f}, {pred_high:.3f}]
             </p>
             <hr style="border:1px solid #ccc;margin:12px 0;">
             <p style="font-size:1.1rem;font-weight:600;color:#333;">Clasificación: {calidad}</p>
@@ -1057,6 +1542,32 @@ with tab6:
 
         st.markdown(" ")
 
+        # Contribuciones SHAP de esta predicción (TreeSHAP, ~1 ms)
+        explicador = grafo().valor('explicador_shap', df_full=df_full)
+        shap_local = pd.DataFrame({
+            "Feature": preparar_features(df_full)[3],
+            "SHAP": explicador.valores(x_new)[0],
+        })
+        shap_local['Efecto'] = np.where(shap_local['SHAP'] >= 0, "Aumenta", "Disminuye")
+        st.altair_chart(
+            alt.Chart(shap_local)
+            .mark_bar()
+            .encode(
+                x=alt.X("SHAP:Q", title="Contribución SHAP (mg·g⁻¹ PMF)"),
+                y=alt.Y("Feature:N", sort=alt.EncodingSortField("SHAP", op="max", order="descending"),
+                        title=None),
+                color=alt.Color("Efecto:N", scale=alt.Scale(domain=["Aumenta", "Disminuye"],
+                                                           range=["#2ca02c", "#d62728"]),
+                                legend=None),
+                tooltip=[alt.Tooltip("Feature:N", title="Variable"),
+                         alt.Tooltip("SHAP:Q", title="SHAP", format=".4f")],
+            )
+            .properties(height=260, title="¿Por qué esta predicción? (SHAP local)"),
+            use_container_width=True,
+        )
+        st.caption(f"Valor medio del modelo {explicador.base:.3f} + suma de contribuciones "
+                   f"{shap_local['SHAP'].sum():+.3f} = {pred_mean:.3f} mg·g⁻¹ PMF.")
+
         # Distribución de predicciones de los árboles (histograma)
         hist_trees = pd.DataFrame({"Clorofila_pred": tree_preds})
         hist_chart = (
@@ -1093,78 +1604,59 @@ with tab6:
     st.markdown("""
     El siguiente heatmap muestra la clorofila total **predicha por el modelo** para todas las  
     combinaciones de Variedad × Bioestimulante a una radiación fija seleccionable.  
-    Permite identificar visualmente los tratamientos más prometedores bajo cada nivel de luz.
+    Permite identificar visualmente los tratamientos más prometedores bajo cada nivel de luz.  
+    El **ancho del IP 95 %** (bosque de cuantiles) señala dónde la predicción es menos precisa.
     """)
 
-    rad_heatmap = st.radio(
-        "Nivel de radiación para el barrido:",
-        [168, 278, 440],
-        index=1,
-        horizontal=True
+    col_h1, col_h2 = st.columns(2)
+    with col_h1:
+        rad_heatmap = st.radio(
+            "Nivel de radiación para el barrido:",
+            RADIACIONES_PAR,
+            index=1,
+            horizontal=True
+        )
+    with col_h2:
+        valores_mapa = {
+            'Clorofila_predicha': ("Clorofila total predicha", "blues"),
+            'Ancho_IP': ("Ancho del IP 95 %", "oranges"),
+        }
+        col_mapa = st.radio("Valor del mapa:", list(valores_mapa),
+                            format_func=lambda c: valores_mapa[c][0], horizontal=True,
+                            key="valor_mapa")
+    titulo_mapa, esquema_mapa = valores_mapa[col_mapa]
+
+    # Predicciones del barrido completo (todas las radiaciones, una sola pasada,
+    # con el intervalo del bosque de cuantiles en el mismo lote); cambiar de
+    # radiación solo filtra el cubo en caché
+    cubo = obtener_cubo_barrido(df_full, RADIACIONES_PAR)
+    df_grid = (
+        cubo.loc[cubo['Radiacion'] == rad_heatmap,
+                 ['Variedad', 'Bioestimulante', 'Clorofila_predicha', 'IP_bajo', 'IP_alto', 'Ancho_IP']]
+        .round(3)
+        .reset_index(drop=True)
     )
 
-    # Generar predicciones para el grid
-    variedades  = sorted(df_full['Variedad'].unique())
-    bioest_list = sorted(df_full['Bioestimulante'].unique())
-
-    rows_grid = []
-    for v in variedades:
-        for b in bioest_list:
-            # Promediar nutrientes observados para esta combinación v×b
-            sub = df_full[(df_full['Variedad'] == v) & (df_full['Bioestimulante'] == b)]
-            if len(sub) == 0:
-                # Usar medianas globales si no hay observación
-                chl_a_ = float(df_full['Clorofila_a'].median())
-                chl_b_ = float(df_full['Clorofila_b'].median())
-                nit_   = float(df_full['Nitrogeno'].median())
-                fos_   = float(df_full['Fosforo'].median())
-                pot_   = float(df_full['Potasio'].median())
-                cal_   = float(df_full['Calcio'].median())
-                mag_   = float(df_full['Magnesio'].median())
-            else:
-                chl_a_ = float(sub['Clorofila_a'].mean())
-                chl_b_ = float(sub['Clorofila_b'].mean())
-                nit_   = float(sub['Nitrogeno'].mean())
-                fos_   = float(sub['Fosforo'].mean())
-                pot_   = float(sub['Potasio'].mean())
-                cal_   = float(sub['Calcio'].mean())
-                mag_   = float(sub['Magnesio'].mean())
-
-            try:
-                v_enc = le_var.transform([v])[0]
-                b_enc = le_bio.transform([b])[0]
-            except ValueError:
-                v_enc, b_enc = 0, 0
-
-            x_g = np.array([[v_enc, b_enc, rad_heatmap/440.0,
-                              chl_a_, chl_b_, nit_, fos_, pot_, cal_, mag_]])
-            pred_ = best_model.predict(x_g)[0]
-            rows_grid.append({
-                "Variedad": v,
-                "Bioestimulante": b,
-                "Clorofila_predicha": round(pred_, 3)
-            })
-
-    df_grid = pd.DataFrame(rows_grid)
-
     heat_map_pred = (
         alt.Chart(df_grid)
         .mark_rect()
         .encode(
             x=alt.X("Bioestimulante:N", title="Bioestimulante"),
             y=alt.Y("Variedad:N",       title="Variedad"),
-            color=alt.Color("Clorofila_predicha:Q",
-                            scale=alt.Scale(scheme="blues",
-                                            domain=[df_grid['Clorofila_predicha'].min() - 0.02,
-                                                    df_grid['Clorofila_predicha'].max() + 0.02]),
-                            title="Clorofila total predicha"),
+            color=alt.Color(f"{col_mapa}:Q",
+                            scale=alt.Scale(scheme=esquema_mapa,
+                                            domain=[df_grid[col_mapa].min() - 0.02,
+                                                    df_grid[col_mapa].max() + 0.02]),
+                            title=titulo_mapa),
             tooltip=["Variedad", "Bioestimulante",
                      alt.Tooltip("Clorofila_predicha:Q", format=".3f",
-                                 title="Clorofila total predicha")]
+                                 title="Clorofila total predicha"),
+                     alt.Tooltip("IP_bajo:Q", format=".3f", title="IP 95 % inferior"),
+                     alt.Tooltip("IP_alto:Q", format=".3f", title="IP 95 % superior")]
         )
         .properties(
             width=500, height=280,
-            title=f"Clorofila total predicha — Radiación {rad_heatmap} µmol·m⁻²·s⁻¹"
+            title=f"{titulo_mapa} — Radiación {rad_heatmap} µmol·m⁻²·s⁻¹"
         )
     )
 
@@ -1174,9 +1666,9 @@ with tab6:
         .encode(
             x=alt.X("Bioestimulante:N"),
             y=alt.Y("Variedad:N"),
-            text=alt.Text("Clorofila_predicha:Q", format=".2f"),
+            text=alt.Text(f"{col_mapa}:Q", format=".2f"),
             color=alt.condition(
-                alt.datum.Clorofila_predicha > df_grid['Clorofila_predicha'].mean(),
+                alt.datum[col_mapa] > df_grid[col_mapa].mean(),
                 alt.value("white"), alt.value("#1a1a1a")
             )
         )
@@ -1189,11 +1681,178 @@ with tab6:
     st.success(
         f"✅ **Combinación óptima predicha** a {rad_heatmap} µmol·m⁻²·s⁻¹:  "
         f"**Variedad {best_grid['Variedad']}** + **Bioestimulante {best_grid['Bioestimulante']}**  "
-        f"→ Clorofila total = **{best_grid['Clorofila_predicha']:.3f} mg·g⁻¹ PMF**"
+        f"→ Clorofila total = **{best_grid['Clorofila_predicha']:.3f} mg·g⁻¹ PMF** "
+        f"(IP 95 %: {best_grid['IP_bajo']:.3f} – {best_grid['IP_alto']:.3f})"
+    )
+
+    st.divider()
+
+    # ── Superficie de respuesta continua ─────────────────────────────────────
+    st.subheader("🌄 Superficie de respuesta continua")
+
+    st.markdown("""
+    Predicción del modelo sobre **dos variables continuas** (radiación y/o nutrientes), con el resto
+    de variables fijas en el perfil medio del tratamiento elegido. La superficie se construye por
+    refinamiento adaptativo: se parte de una rejilla gruesa y solo se subdividen las zonas donde
+    la predicción cambia, de modo que el mapa aparece de inmediato y se afina progresivamente.
+    """)
+
+    etiquetas_superficie = {
+        'Radiacion': "Radiación PAR (µmol·m⁻²·s⁻¹)",
+        'Clorofila_a': "Clorofila a (mg·g⁻¹ PMF)",
+        'Clorofila_b': "Clorofila b (mg·g⁻¹ PMF)",
+        'Nitrogeno': "Nitrógeno (g·kg⁻¹ PMS)",
+        'Fosforo': "Fósforo (g·kg⁻¹ PMS)",
+        'Potasio': "Potasio (g·kg⁻¹ PMS)",
+        'Calcio': "Calcio (g·kg⁻¹ PMS)",
+        'Magnesio': "Magnesio (g·kg⁻¹ PMS)",
+    }
+    variables_sup = list(VARIABLES_SUPERFICIE)
+
+    col_s1, col_s2, col_s3, col_s4 = st.columns(4)
+    with col_s1:
+        var_sup = st.selectbox("Variedad", df_full.attrs['niveles']['Variedad'], key="var_sup")
+    with col_s2:
+        bio_sup = st.selectbox("Bioestimulante", df_full.attrs['niveles']['Bioestimulante'],
+                               key="bio_sup")
+    with col_s3:
+        eje_x = st.selectbox("Eje X", variables_sup, index=variables_sup.index('Radiacion'),
+                             format_func=etiquetas_superficie.get, key="eje_x_sup")
+    with col_s4:
+        opciones_y = [v for v in variables_sup if v != eje_x]
+        eje_y = st.selectbox("Eje Y", opciones_y, index=opciones_y.index('Potasio')
+                             if 'Potasio' in opciones_y else 0,
+                             format_func=etiquetas_superficie.get, key="eje_y_sup")
+
+    def limites_superficie(variable):
+        if variable == 'Radiacion':
+            return float(min(RADIACIONES_PAR)), float(max(RADIACIONES_PAR))
+        bajo, alto = float(df_full[variable].min()), float(df_full[variable].max())
+        return (bajo, alto) if alto > bajo else (bajo - 0.5, alto + 0.5)
+
+    limites_x, limites_y = limites_superficie(eje_x), limites_superficie(eje_y)
+
+    def grafico_superficie(teselas):
+        return (
+            alt.Chart(teselas)
+            .mark_rect()
+            .encode(
+                x=alt.X("x0:Q", title=etiquetas_superficie[eje_x],
+                        scale=alt.Scale(domain=list(limites_x), nice=False)),
+                x2="x1:Q",
+                y=alt.Y("y0:Q", title=etiquetas_superficie[eje_y],
+                        scale=alt.Scale(domain=list(limites_y), nice=False)),
+                y2="y1:Q",
+                color=alt.Color("Clorofila_predicha:Q", scale=alt.Scale(scheme="blues"),
+                                title="Clorofila total predicha"),
+                tooltip=[alt.Tooltip("Clorofila_predicha:Q", format=".3f",
+                                     title="Clorofila total predicha"),
+                         alt.Tooltip("x0:Q", format=".2f", title=f"{eje_x} desde"),
+                         alt.Tooltip("x1:Q", format=".2f", title=f"{eje_x} hasta"),
+                         alt.Tooltip("y0:Q", format=".2f", title=f"{eje_y} desde"),
+                         alt.Tooltip("y1:Q", format=".2f", title=f"{eje_y} hasta")]
+            )
+            .properties(height=420,
+                        title=f"Clorofila total predicha — Variedad {var_sup} + {bio_sup}")
+        )
+
+    # Las teselas finales se guardan por sesión; al volver a la misma
+    # combinación se dibujan directamente sin recalcular
+    superficies = st.session_state.setdefault('superficies', {})
+    clave_sup = (df_full.attrs['huella'], var_sup, bio_sup, eje_x, eje_y)
+    grafico_sup = st.empty()
+    if clave_sup not in superficies:
+        bosque_sup = obtener_bosque_plano(df_full)
+        for teselas in refinar_superficie(bosque_sup.predecir, df_full, meta, var_sup, bio_sup,
+                                          eje_x, eje_y, limites_x, limites_y):
+            grafico_sup.altair_chart(grafico_superficie(teselas), use_container_width=True)
+        superficies[clave_sup] = teselas
+    teselas = superficies[clave_sup]
+    grafico_sup.altair_chart(grafico_superficie(teselas), use_container_width=True)
+
+    mejor_tesela = teselas.loc[teselas['Clorofila_predicha'].idxmax()]
+    st.caption(
+        f"{len(teselas)} teselas (nivel máximo de refinamiento: {int(teselas['nivel'].max())}). "
+        f"Máximo predicho: **{mejor_tesela['Clorofila_predicha']:.3f} mg·g⁻¹ PMF** con "
+        f"{eje_x} ≈ {(mejor_tesela['x0'] + mejor_tesela['x1']) / 2:.2f} y "
+        f"{eje_y} ≈ {(mejor_tesela['y0'] + mejor_tesela['y1']) / 2:.2f}. "
+        f"Las zonas de color uniforme corresponden a regiones donde el bosque no cambia su predicción."
     )
 
     st.divider()
 
+    # ── Comparación de modelos ───────────────────────────────────────────────
+    st.subheader("🏁 Comparación de modelos — misma validación 5-fold")
+
+    st.markdown("""
+    Random Forest, Gradient Boosting, HistGradientBoosting, Ridge, un modelo lineal de efectos  
+    principales (tipo ANOVA) y kNN evaluados con **el mismo KFold** y las mismas variables. Además  
+    del R² de CV se reporta el costo de cada modelo: tiempo de ajuste, **latencia de una predicción**,  
+    costo por fila en lote y memoria, para elegir el modelo que cumple el SLO de latencia y no solo  
+    el más preciso. Los resultados quedan en caché por modelo, parámetros y datos.
+    """)
+
+    col_c1, col_c2 = st.columns([1, 3])
+    with col_c1:
+        slo_ms = st.number_input("SLO de latencia (ms por predicción)", min_value=0.1,
+                                 value=10.0, step=0.5, key="slo_latencia")
+    if st.toggle("Comparar modelos", key="comparar_modelos"):
+        # El bosque con los hiperparámetros elegidos por la búsqueda
+        modelos_zoo = {nombre: {} for nombre in MODELOS}
+        modelos_zoo['Random Forest'] = dict(metricas['best_params'])
+        try:
+            trabajo_zoo = planificador().enviar(
+                ('comparacion', df_full.attrs['huella'], repr(modelos_zoo)),
+                comparar_modelos, X, y, df_full.attrs['huella'], modelos_zoo,
+            )
+        except ColaLlena:
+            trabajo_zoo = None
+            st.warning("El servidor está ocupado con otros cálculos; vuelve a intentarlo en unos minutos.")
+        if trabajo_zoo is not None and trabajo_zoo.estado == 'listo':
+            posiciones = tabla_posiciones(trabajo_zoo.resultado, slo_ms)
+            st.dataframe(
+                posiciones[['modelo', 'r2_mean', 'r2_std', 'rmse_mean', 'mae_mean', 'ajuste_fold_s',
+                            'latencia_ms', 'lote_us_fila', 'memoria_kb', 'cumple_slo']]
+                .rename(columns={'modelo': 'Modelo', 'r2_mean': 'R² CV', 'r2_std': '± std',
+                                 'rmse_mean': 'RMSE CV', 'mae_mean': 'MAE CV',
+                                 'ajuste_fold_s': 'Ajuste/fold (s)', 'latencia_ms': 'Latencia (ms)',
+                                 'lote_us_fila': 'Lote (µs/fila)', 'memoria_kb': 'Memoria (KB)',
+                                 'cumple_slo': 'Cumple SLO'})
+                .round(4),
+                use_container_width=True,
+            )
+            dispersion_zoo = (
+                alt.Chart(posiciones)
+                .mark_circle(size=120)
+                .encode(
+                    x=alt.X("latencia_ms:Q", scale=alt.Scale(type="log"),
+                            title="Latencia de una predicción (ms, escala log)"),
+                    y=alt.Y("r2_mean:Q", title="R² CV (media)"),
+                    color=alt.Color("cumple_slo:N", title="Cumple SLO",
+                                    scale=alt.Scale(domain=[True, False], range=["#2ca02c", "#d62728"])),
+                    tooltip=["modelo", alt.Tooltip("r2_mean:Q", format=".3f", title="R² CV"),
+                             alt.Tooltip("latencia_ms:Q", format=".3f", title="Latencia (ms)"),
+                             alt.Tooltip("memoria_kb:Q", format=".1f", title="Memoria (KB)")],
+                )
+            )
+            etiquetas_zoo = dispersion_zoo.mark_text(dy=-12, fontSize=11).encode(
+                text="modelo:N", color=alt.value("#333"))
+            slo_zoo = alt.Chart(pd.DataFrame({"x": [slo_ms]})).mark_rule(
+                color="red", strokeDash=[4, 3]).encode(x="x:Q")
+            st.altair_chart((dispersion_zoo + etiquetas_zoo + slo_zoo)
+                            .properties(height=320, title="Precisión vs latencia"),
+                            use_container_width=True)
+            mejor_zoo = posiciones.iloc[0]
+            if mejor_zoo['cumple_slo']:
+                st.success(f"✅ Mejor modelo dentro del SLO de {slo_ms:g} ms: **{mejor_zoo['modelo']}** "
+                           f"(R² CV = {mejor_zoo['r2_mean']:.3f}, {mejor_zoo['latencia_ms']:.2f} ms).")
+            else:
+                st.warning(f"Ningún modelo predice una fila en menos de {slo_ms:g} ms.")
+        elif trabajo_zoo is not None:
+            esperar_trabajo(trabajo_zoo, "Comparando modelos (5-fold)")
+
+    st.divider()
+
     # ── Nota metodológica final ──────────────────────────────────────────────
     st.subheader("📝 Nota metodológica")
 
@@ -1205,7 +1864,7 @@ with tab6:
     | Selección de hiperparámetros | GridSearchCV 5-fold | Maximiza R² CV en el espacio de búsqueda |
     | Métricas reportadas | R², RMSE, MAE **en CV** | Estimadores insesgados (no de entrenamiento) |
     | Importancia de variables | Permutation Importance (30 repeats) | Más confiable que impurity-based con categóricas |
-    | Intervalo de predicción | Std entre árboles × 1.96 | Aproximación bayesiana del bosque |
+    | Intervalo de predicción | Bosque de cuantiles (percentiles 2.5–97.5) | Distribución condicional de y en las hojas, no solo la dispersión de los árboles |
     | Limitación principal | n ≈ 22 observaciones | Ampliar experimento mejorará la generalización |
     """)
 
@@ -1215,3 +1874,22 @@ with tab6:
     Los intervalos de confianza de las predicciones son amplios por el tamaño muestral.  
     Se recomienda recolectar al menos 60–80 observaciones para estabilizar los estimadores ML.
     """)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  EJECUCIÓN PEREZOSA DE PESTAÑAS
+# ══════════════════════════════════════════════════════════════════════════════
+
+precargar(df, df_full)
+
+for pestana, mostrar in [(tab1, pestana_introduccion), (tab2, pestana_exploracion),
+                         (tab3, pestana_pruebas), (tab4, pestana_anova),
+                         (tab5, pestana_kpis), (tab6, pestana_modelo)]:
+    with pestana:
+        if pestana.open:
+            mostrar()
+
+with st.expander("⏱ Tiempos de cálculo por artefacto"):
+    st.dataframe(grafo().tiempos().round({'ultimo_s': 3, 'total_s': 3}), use_container_width=True)
+    st.caption("Cada artefacto se guarda por el contenido de sus entradas: si cambian los datos, "
+               "solo se recalculan los que dependen de ellos (ver grafo.py).")
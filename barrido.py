@@ -0,0 +1,84 @@
+"""
+Barrido de tratamientos: predicción del modelo para todas las combinaciones
+variedad × bioestimulante × radiación en una sola llamada.
+
+Los perfiles fisiológicos/nutricionales de cada variedad × bioestimulante se
+obtienen con un único `groupby` (medianas globales para las combinaciones sin
+observaciones) y se replican para cada nivel de radiación, que puede ser
+cualquier conjunto de valores, no solo los tres niveles PAR del ensayo.
+"""
+import numpy as np
+import pandas as pd
+
+# Variables continuas del modelo, en el orden de meta['feature_cols']
+COLUMNAS_PERFIL = ['Clorofila_a', 'Clorofila_b',
+                   'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']
+
+
+def perfiles_tratamiento(df_full, variedades, bioestimulantes):
+    """Media de COLUMNAS_PERFIL por variedad × bioestimulante (producto completo)."""
+    medias = (
+        df_full.groupby(['Variedad', 'Bioestimulante'], observed=True)[COLUMNAS_PERFIL]
+        .mean()
+    )
+    completo = pd.MultiIndex.from_product([variedades, bioestimulantes],
+                                          names=['Variedad', 'Bioestimulante'])
+    medias.index = medias.index.set_levels(
+        [medias.index.levels[0].astype(str), medias.index.levels[1].astype(str)]
+    )
+    return medias.reindex(completo).fillna(df_full[COLUMNAS_PERFIL].median())
+
+
+def _codificar(niveles, codificador):
+    # Niveles no vistos por el codificador → 0, como en el predictor
+    codigos = {c: i for i, c in enumerate(codificador.classes_)}
+    return np.array([codigos.get(n, 0) for n in niveles], dtype=float)
+
+
+def disenar_barrido(df_full, meta, radiaciones, variedades=None, bioestimulantes=None):
+    """
+    Matriz de diseño del barrido. Retorna (tratamientos, X): un DataFrame con
+    Variedad, Bioestimulante y Radiacion por fila y la matriz X alineada con
+    meta['feature_cols'].
+    """
+    niveles = df_full.attrs['niveles']
+    variedades = list(variedades if variedades is not None else niveles['Variedad'])
+    bioestimulantes = list(bioestimulantes if bioestimulantes is not None
+                           else niveles['Bioestimulante'])
+    radiaciones = np.asarray(radiaciones, dtype=float)
+
+    perfiles = perfiles_tratamiento(df_full, variedades, bioestimulantes)
+    n_vb, n_rad = len(perfiles), len(radiaciones)
+
+    enc_var = _codificar(perfiles.index.get_level_values('Variedad'), meta['le_var'])
+    enc_bio = _codificar(perfiles.index.get_level_values('Bioestimulante'), meta['le_bio'])
+
+    X = np.column_stack([
+        np.repeat(enc_var, n_rad),
+        np.repeat(enc_bio, n_rad),
+        np.tile(radiaciones / 440.0, n_vb),
+        np.repeat(perfiles.to_numpy(), n_rad, axis=0),
+    ])
+    tratamientos = pd.DataFrame({
+        'Variedad': np.repeat(perfiles.index.get_level_values('Variedad'), n_rad),
+        'Bioestimulante': np.repeat(perfiles.index.get_level_values('Bioestimulante'), n_rad),
+        'Radiacion': np.tile(radiaciones, n_vb),
+    })
+    return tratamientos, X
+
+
+def cubo_predicciones(bosque, df_full, meta, radiaciones, cuantil=None, nivel=0.95, **kwargs):
+    """
+    Predicción (media y std entre árboles) para todo el barrido con una sola
+    pasada de `bosque` (BosquePlano). Con `cuantil` (BosqueCuantil) agrega el
+    intervalo de predicción de `nivel` y su ancho, consultados en un solo
+    lote. Cada nivel de radiación es luego un simple filtro sobre el resultado.
+    """
+    cubo, X = disenar_barrido(df_full, meta, radiaciones, **kwargs)
+    resumen = bosque.resumen(X, cuantiles=())
+    cubo['Clorofila_predicha'] = resumen['media']
+    cubo['Std_arboles'] = resumen['std']
+    if cuantil is not None:
+        cubo['IP_bajo'], cubo['IP_alto'] = cuantil.intervalo(X, nivel)
+        cubo['Ancho_IP'] = cubo['IP_alto'] - cubo['IP_bajo']
+    return cubo
@@ -0,0 +1,79 @@
+"""
+Benchmark del ANOVA multirespuesta frente a un ajuste de statsmodels por respuesta.
+
+    python benchmarks/bench_anova.py [--respuestas 8 100] [--n 2000] [--orden 2] [--typ 2]
+
+Genera `n` filas sintéticas con `--respuestas` variables de respuesta y corre
+el ANOVA trifactorial con interacciones hasta `--orden`, en lote
+(`anova.anova_multirespuesta`) y con `smf.ols` + `anova_lm` por respuesta.
+Reporta tiempos y la máxima diferencia relativa en las sumas de cuadrados.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from statsmodels.stats.anova import anova_lm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anova import anova_multirespuesta  # noqa: E402
+from bench_supuestos import generar  # noqa: E402
+
+FACTORES = ['Radiacion', 'Bioestimulante', 'Variedad']
+
+
+def formula(respuesta, orden, typ):
+    sufijo = ', Sum' if typ == 3 else ''
+    principales = [f'C({f}{sufijo})' for f in FACTORES]
+    if orden == 1:
+        return f'{respuesta} ~ ' + ' + '.join(principales)
+    return f'{respuesta} ~ (' + ' + '.join(principales) + f')**{orden}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--respuestas', type=int, nargs='+', default=[8, 100])
+    parser.add_argument('--n', type=int, default=2000)
+    parser.add_argument('--orden', type=int, default=2)
+    parser.add_argument('--typ', type=int, choices=[1, 2, 3], default=2)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    filas = []
+    for n_respuestas in args.respuestas:
+        df, respuestas = generar(args.n, n_respuestas, n_sitios=1)
+
+        inicio = time.perf_counter()
+        lote = anova_multirespuesta(df, respuestas, FACTORES, orden=args.orden, typ=args.typ)
+        t_lote = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        bucle = {r: anova_lm(smf.ols(formula(r, args.orden, args.typ), data=df).fit(), typ=args.typ)
+                 for r in respuestas}
+        t_bucle = time.perf_counter() - inicio
+
+        dif = max(
+            np.max(np.abs(lote[r]['sum_sq'].to_numpy() - bucle[r]['sum_sq'].to_numpy())
+                   / np.abs(bucle[r]['sum_sq'].to_numpy()))
+            for r in respuestas
+        )
+        filas.append({
+            'respuestas': n_respuestas,
+            'statsmodels_s': round(t_bucle, 3),
+            'lote_s': round(t_lote, 3),
+            'aceleracion': round(t_bucle / t_lote, 1),
+            'max_dif_rel_ss': dif,
+        })
+        print(pd.DataFrame(filas[-1:]).to_string(index=False, header=len(filas) == 1))
+
+    print()
+    print(pd.DataFrame(filas).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
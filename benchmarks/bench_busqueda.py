@@ -0,0 +1,67 @@
+"""
+Benchmark de motores de búsqueda de hiperparámetros.
+
+    python benchmarks/bench_busqueda.py [--escalas 10 100] [--motores grid smbo ...]
+
+Para cada escala (múltiplo del tamaño de `df_full`) genera datos sintéticos,
+corre cada motor con PARAM_GRID y el mismo KFold, y reporta el tiempo de
+pared y el mejor MSE de CV según la propia búsqueda.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from busqueda import MOTORES_BUSQUEDA, crear_busqueda  # noqa: E402
+from datos import cargar_fuentes  # noqa: E402
+from modelo import METRICAS_CV, PARAM_GRID, preparar_features  # noqa: E402
+from sinteticos import generar_df_full  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--motores', nargs='+', choices=MOTORES_BUSQUEDA,
+                        default=list(MOTORES_BUSQUEDA))
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    n_base = len(cargar_fuentes(None, None)[2])
+    filas = []
+    for escala in args.escalas:
+        X, y, *_ = preparar_features(generar_df_full(n_base * escala, semilla=escala))
+        kf = KFold(n_splits=5, shuffle=True, random_state=42)
+        for motor in args.motores:
+            busqueda = crear_busqueda(
+                motor, RandomForestRegressor(random_state=42, n_jobs=-1), PARAM_GRID,
+                cv=kf, scoring=METRICAS_CV, refit='mse', n_muestras=len(y),
+            )
+            inicio = time.perf_counter()
+            busqueda.fit(X, y)
+            segundos = time.perf_counter() - inicio
+            res = busqueda.cv_results_
+            clave = 'mean_test_mse' if 'mean_test_mse' in res else 'mean_test_score'
+            filas.append({
+                'escala': f'{escala}×',
+                'n': len(y),
+                'motor': motor,
+                'segundos': round(segundos, 2),
+                'mse_cv': -res[clave][busqueda.best_index_],
+                'candidatos': len(res['params']),
+                'best_params': busqueda.best_params_,
+            })
+            print(pd.DataFrame(filas[-1:]).to_string(index=False, header=len(filas) == 1))
+
+    print()
+    print(pd.DataFrame(filas).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
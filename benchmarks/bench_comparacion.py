@@ -0,0 +1,62 @@
+"""
+Benchmark de la comparación de modelos: evaluación en frío y desde la caché.
+
+    python benchmarks/bench_comparacion.py [--escalas 1 10] [--slo-ms 10] [--cpus N]
+
+Para cada escala (múltiplo del tamaño de `df_full`) evalúa todos los modelos
+de `comparacion.MODELOS` sobre datos sintéticos con el mismo KFold, en un
+directorio de caché temporal: primero en frío (ajustes repartidos según el
+presupuesto de CPU) y luego de nuevo, ya desde la caché. Imprime los tiempos
+y la tabla de posiciones con el SLO de latencia dado.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comparacion import comparar_modelos, tabla_posiciones  # noqa: E402
+from datos import cargar_fuentes, huella_df  # noqa: E402
+from modelo import preparar_features  # noqa: E402
+from recursos import PresupuestoCPU  # noqa: E402
+from sinteticos import generar_df_full  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--slo-ms', type=float, default=10.0)
+    parser.add_argument('--cpus', type=int, default=None)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+    pd.set_option('display.width', 200)
+
+    presupuesto = PresupuestoCPU(cpus=args.cpus)
+    n_base = len(cargar_fuentes(None, None)[2])
+    filas = []
+    for escala in args.escalas:
+        df_full = generar_df_full(n_base * escala, semilla=escala)
+        X, y = preparar_features(df_full)[:2]
+        with tempfile.TemporaryDirectory() as directorio:
+            tiempos = {}
+            for pasada in ('frío', 'caché'):
+                inicio = time.perf_counter()
+                resultados = comparar_modelos(X, y, huella_df(df_full), presupuesto=presupuesto,
+                                              directorio=directorio)
+                tiempos[pasada] = time.perf_counter() - inicio
+        filas.append({'escala': f'{escala}×', 'n': len(y), 'cpus': presupuesto.cpus,
+                      'frio_s': round(tiempos['frío'], 3), 'cache_s': round(tiempos['caché'], 4)})
+        print(pd.DataFrame(filas[-1:]).to_string(index=False))
+        print(tabla_posiciones(resultados, args.slo_ms).drop(columns='params').round(4).to_string())
+        print()
+
+    print(pd.DataFrame(filas).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark del presupuesto de CPU del entrenamiento frente al paralelismo anidado.
+
+    python benchmarks/bench_cpu.py [--cores 1 4 16 64] [--escala 10] [--motor warm-start]
+
+Para cada número de núcleos corre `modelo.entrenar_modelo_rf` sobre datos
+sintéticos (`--escala` × tamaño de `df_full`) en un proceso hijo fijado a esos
+núcleos (sched_setaffinity), de dos formas:
+
+- 'anidado': `n_jobs=-1` en el bosque y en cada etapa, sin fijar BLAS (como
+  antes de recursos.py).
+- 'presupuesto': `recursos.PresupuestoCPU` con los núcleos del proceso.
+
+Reporta el tiempo de pared de cada una. Los núcleos que la máquina no tiene
+se omiten.
+
+Medido solo en una máquina de 1 núcleo: 'anidado' 40.6 s frente a
+'presupuesto' 40.0 s (escala 10, warm-start), sin diferencia, como se espera
+sin paralelismo que repartir. Las filas de 4, 16 y 64 núcleos NO se midieron
+(el script las omite allí); la mejora frente a la sobresuscripción está por
+comprobar en una máquina con esos núcleos.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recursos import PresupuestoCPU  # noqa: E402
+
+MODOS = ('anidado', 'presupuesto')
+
+
+class PresupuestoAnidado(PresupuestoCPU):
+    """Comportamiento anterior: todos los niveles con n_jobs=-1 y BLAS libre."""
+
+    def reparto(self, etapa, n_tareas):
+        return -1, -1
+
+    @contextmanager
+    def etapa(self, etapa):
+        yield self.cpus
+
+
+def hijo(cores, modo, escala, motor):
+    # Se fija la afinidad antes de importar sklearn, para que joblib y BLAS
+    # dimensionen sus pools con los núcleos del experimento
+    os.sched_setaffinity(0, sorted(os.sched_getaffinity(0))[:cores])
+    from datos import cargar_fuentes
+    from modelo import entrenar_modelo_rf
+    from sinteticos import generar_df_full
+
+    warnings.filterwarnings('ignore')
+    n_base = len(cargar_fuentes(None, None)[2])
+    df_full = generar_df_full(n_base * escala, semilla=escala)
+    presupuesto = (PresupuestoAnidado if modo == 'anidado' else PresupuestoCPU)(cores)
+    inicio = time.perf_counter()
+    entrenar_modelo_rf(df_full, motor=motor, presupuesto=presupuesto)
+    print(json.dumps({'segundos': time.perf_counter() - inicio, 'n': len(df_full)}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cores', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--escala', type=int, default=10)
+    parser.add_argument('--motor', default='warm-start')
+    parser.add_argument('--hijo', nargs=2, metavar=('CORES', 'MODO'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        hijo(int(args.hijo[0]), args.hijo[1], args.escala, args.motor)
+        return
+
+    disponibles = len(os.sched_getaffinity(0))
+    filas = []
+    for cores in args.cores:
+        fila = {'cores': cores}
+        if cores > disponibles:
+            fila['nota'] = f'omitido: la máquina tiene {disponibles} núcleos'
+        else:
+            for modo in MODOS:
+                salida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--hijo', str(cores), modo,
+                     '--escala', str(args.escala), '--motor', args.motor],
+                    capture_output=True, text=True, check=True,
+                )
+                resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+                fila['n'] = resultado['n']
+                fila[f'{modo}_s'] = round(resultado['segundos'], 2)
+            fila['aceleracion'] = round(fila['anidado_s'] / fila['presupuesto_s'], 2)
+        filas.append(fila)
+        print(pd.DataFrame(filas[-1:]).to_string(index=False, header=len(filas) == 1))
+
+    print()
+    print(pd.DataFrame(filas).convert_dtypes().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
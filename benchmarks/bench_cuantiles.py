@@ -0,0 +1,81 @@
+"""
+Benchmark del intervalo de predicción: bosque de cuantiles por consulta y en lote.
+
+    python benchmarks/bench_cuantiles.py [--escalas 1 10 100] [--arboles 300] [--consultas 1000]
+
+Para cada escala (múltiplo del tamaño de `df_full`) entrena un bosque con
+`--arboles` árboles sobre datos sintéticos, construye el índice hoja →
+observaciones de `cuantiles.BosqueCuantil` y mide el intervalo 95 % de
+`--consultas` entradas consultadas una a una y en un solo lote, junto al
+resumen media ± 1.96·std de `BosquePlano`. Reporta además la cobertura de
+cada intervalo sobre datos sintéticos nuevos.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bosque import BosquePlano  # noqa: E402
+from cuantiles import BosqueCuantil  # noqa: E402
+from datos import cargar_fuentes  # noqa: E402
+from modelo import preparar_features  # noqa: E402
+from sinteticos import generar_df_full  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--arboles', type=int, default=300)
+    parser.add_argument('--consultas', type=int, default=1000)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    n_base = len(cargar_fuentes(None, None)[2])
+    filas = []
+    for escala in args.escalas:
+        X, y = preparar_features(generar_df_full(n_base * escala, semilla=escala))[:2]
+        X_nuevo, y_nuevo = preparar_features(
+            generar_df_full(args.consultas, semilla=10_000 + escala))[:2]
+        modelo = RandomForestRegressor(n_estimators=args.arboles, max_depth=4, min_samples_leaf=2,
+                                       random_state=42, n_jobs=-1).fit(X, y)
+        bosque = BosquePlano(modelo)
+
+        inicio = time.perf_counter()
+        cuantil = BosqueCuantil(bosque, X, y)
+        indice_s = time.perf_counter() - inicio
+
+        def medir(variante, calcular):
+            inicio = time.perf_counter()
+            bajo, alto = calcular()
+            fila = {'escala': f'{escala}×', 'n': len(y), 'variante': variante,
+                    'segundos': round(time.perf_counter() - inicio, 3),
+                    'cobertura': round(float(np.mean((y_nuevo >= bajo) & (y_nuevo <= alto))), 3),
+                    'ancho_medio': round(float(np.mean(alto - bajo)), 4)}
+            filas.append(fila)
+            print(pd.DataFrame([fila]).to_string(index=False, header=len(filas) == 1))
+
+        def std_arboles():
+            resumen = bosque.resumen(X_nuevo, cuantiles=())
+            return resumen['media'] - 1.96 * resumen['std'], resumen['media'] + 1.96 * resumen['std']
+
+        def una_a_una():
+            limites = np.array([np.concatenate(cuantil.intervalo(x[None])) for x in X_nuevo])
+            return limites[:, 0], limites[:, 1]
+
+        medir('media ± 1.96·std', std_arboles)
+        medir(f'cuantiles una a una (+{indice_s:.3f} s índice)', una_a_una)
+        medir('cuantiles en lote', lambda: cuantil.intervalo(X_nuevo))
+
+    print()
+    print(pd.DataFrame(filas).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
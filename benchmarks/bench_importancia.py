@@ -0,0 +1,71 @@
+"""
+Benchmark de la importancia por permutación: sklearn frente al lote.
+
+    python benchmarks/bench_importancia.py [--escalas 1 10 100] [--arboles 300]
+
+Para cada escala (múltiplo del tamaño de `df_full`) entrena un bosque con
+`--arboles` árboles sobre datos sintéticos y corre `modelo.calcular_importancia`
+con motor 'sklearn' (`permutation_importance`, n_jobs=-1) y 'lote'
+(importancia.py), además de las variantes en bloque y condicional del lote.
+Reporta el tiempo de pared y la diferencia máxima con sklearn.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import cargar_fuentes  # noqa: E402
+from importancia import GRUPO_NUTRIENTES  # noqa: E402
+from modelo import calcular_importancia, preparar_features  # noqa: E402
+from sinteticos import generar_df_full  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--arboles', type=int, default=300)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    n_base = len(cargar_fuentes(None, None)[2])
+    filas = []
+    for escala in args.escalas:
+        X, y, feature_cols, feature_names, *_ = preparar_features(
+            generar_df_full(n_base * escala, semilla=escala))
+        bosque = RandomForestRegressor(n_estimators=args.arboles, max_depth=4, min_samples_leaf=2,
+                                       random_state=42, n_jobs=-1).fit(X, y)
+        variantes = {
+            'sklearn': {'motor': 'sklearn'},
+            'lote': {},
+            'lote en bloque': {'grupos': {'Nutrientes': [feature_cols.index(c)
+                                                         for c in GRUPO_NUTRIENTES]}},
+            'lote condicional': {'condicionar': [feature_cols.index('Radiacion_norm')]},
+        }
+        referencia = None
+        for variante, opciones in variantes.items():
+            inicio = time.perf_counter()
+            imp = calcular_importancia(bosque, X, y, feature_names, **opciones)
+            segundos = time.perf_counter() - inicio
+            imp = imp.set_index('Feature')['Importancia_media']
+            if referencia is None:
+                referencia = imp
+            fila = {'escala': f'{escala}×', 'n': len(y), 'variante': variante,
+                    'segundos': round(segundos, 3)}
+            if variante == 'lote':
+                fila['dif_max'] = float(np.abs(imp - referencia.loc[imp.index]).max())
+            filas.append(fila)
+            print(pd.DataFrame(filas[-1:]).to_string(index=False, header=len(filas) == 1))
+
+    print()
+    print(pd.DataFrame(filas).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
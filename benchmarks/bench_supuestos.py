@@ -0,0 +1,104 @@
+"""
+Benchmark de las pruebas de supuestos en lote frente al bucle por columna.
+
+    python benchmarks/bench_supuestos.py [--variables 8 100 500] [--sitios 10] [--n 2000]
+
+Genera `n` filas sintéticas con `--variables` respuestas (las 8 del ensayo más
+réplicas con ruido) y una columna Sitio con `--sitios` niveles. Compara
+`supuestos.pruebas_supuestos` (muestra completa + Radiacion, Variedad y
+Bioestimulante, por sitio) con el bucle equivalente de llamadas a scipy, y
+reporta tiempos y la máxima diferencia en los p-valores.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sinteticos import generar_df_full  # noqa: E402
+from supuestos import pruebas_supuestos  # noqa: E402
+
+RESPUESTAS = ['Clorofila_a', 'Clorofila_b', 'Clorofila_total',
+              'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']
+AGRUPACIONES = (None, 'Radiacion', 'Variedad', 'Bioestimulante')
+
+
+def generar(n, n_variables, n_sitios, semilla=0):
+    df = generar_df_full(n, semilla=semilla)
+    rng = np.random.default_rng([semilla, 1])   # flujo independiente del de generar_df_full
+    extra = {
+        f'{RESPUESTAS[i % len(RESPUESTAS)]}_{i}':
+            df[RESPUESTAS[i % len(RESPUESTAS)]].to_numpy() * rng.lognormal(0, 0.05, n)
+        for i in range(len(RESPUESTAS), n_variables)
+    }
+    df = pd.concat([df, pd.DataFrame(extra, index=df.index)], axis=1)
+    df['Sitio'] = rng.integers(n_sitios, size=n).astype(str)
+    return df, RESPUESTAS[:n_variables] + list(extra)
+
+
+def en_bucle(df, variables):
+    filas = []
+    for sitio, d in df.groupby('Sitio', observed=True):
+        for agrupacion in AGRUPACIONES:
+            grupos = [('Todos', d)] if agrupacion is None else list(d.groupby(agrupacion, observed=True))
+            for var in variables:
+                for nivel, g in grupos:
+                    filas.append((sitio, agrupacion or 'Todos', str(nivel), var, 'shapiro',
+                                  stats.shapiro(g[var]).pvalue))
+                if agrupacion is None:
+                    continue
+                muestras = [g[var].to_numpy() for _, g in grupos]
+                filas.append((sitio, agrupacion, 'Todos', var, 'levene',
+                              stats.levene(*muestras, center='mean').pvalue))
+                filas.append((sitio, agrupacion, 'Todos', var, 'brown-forsythe',
+                              stats.levene(*muestras).pvalue))
+                filas.append((sitio, agrupacion, 'Todos', var, 'bartlett',
+                              stats.bartlett(*muestras).pvalue))
+    return pd.DataFrame(filas, columns=['Subconjunto', 'Agrupacion', 'Grupo', 'Variable',
+                                        'Prueba', 'p_valor'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--variables', type=int, nargs='+', default=[8, 100, 500])
+    parser.add_argument('--sitios', type=int, default=10)
+    parser.add_argument('--n', type=int, default=2000)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    filas = []
+    for n_variables in args.variables:
+        df, variables = generar(args.n, n_variables, args.sitios)
+
+        inicio = time.perf_counter()
+        lote = pruebas_supuestos(df, variables, agrupaciones=AGRUPACIONES, subconjunto='Sitio')
+        t_lote = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        bucle = en_bucle(df, variables)
+        t_bucle = time.perf_counter() - inicio
+
+        claves = ['Subconjunto', 'Agrupacion', 'Grupo', 'Variable', 'Prueba']
+        comparado = lote.merge(bucle, on=claves, suffixes=('', '_bucle'))
+        filas.append({
+            'variables': n_variables,
+            'pruebas': len(lote),
+            'bucle_s': round(t_bucle, 3),
+            'lote_s': round(t_lote, 3),
+            'aceleracion': round(t_bucle / t_lote, 1),
+            'max_dif_p': (comparado['p_valor'] - comparado['p_valor_bucle']).abs().max(),
+        })
+        print(pd.DataFrame(filas[-1:]).to_string(index=False, header=len(filas) == 1))
+
+    print()
+    print(pd.DataFrame(filas).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
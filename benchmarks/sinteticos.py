@@ -0,0 +1,48 @@
+"""
+Datos sintéticos con la estructura de `df_full` para los benchmarks.
+
+Reproduce el diseño factorial (variedad × bioestimulante × radiación), la
+colinealidad entre nutrientes y la dependencia de la clorofila con la luz y
+el potasio, a cualquier tamaño.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import decodificar_tratamientos  # noqa: E402
+
+VARIEDADES = ['Ca', 'Co', 'Ga', 'Ma']
+BIOESTIMULANTES = ['A', 'M', 'P', 'T']
+RADIACIONES = [168, 278, 440]
+
+
+def generar_df_full(n, semilla=0):
+    """DataFrame de `n` filas con las columnas y tipos de `df_full`."""
+    rng = np.random.default_rng(semilla)
+    var = rng.integers(len(VARIEDADES), size=n)
+    bio = rng.integers(len(BIOESTIMULANTES), size=n)
+    rad = np.asarray(RADIACIONES)[rng.integers(len(RADIACIONES), size=n)]
+
+    efecto_bio = np.array([1.2, 0.4, 1.8, 0.0])[bio]
+    efecto_var = np.array([0.02, 0.0, -0.01, 0.03])[var]
+    potasio = 17.0 + efecto_bio + rng.normal(0, 0.5, n)
+    clor_a = 1.45 + 0.0011 * rad + 0.03 * (potasio - 17) + efecto_var + rng.normal(0, 0.04, n)
+    clor_b = 0.70 + 0.0005 * rad + 0.01 * (potasio - 17) + rng.normal(0, 0.03, n)
+
+    trat = [f'{VARIEDADES[v]}.{BIOESTIMULANTES[b]}.{r}' for v, b, r in zip(var, bio, rad)]
+    df = pd.DataFrame({
+        'Tratamiento': trat,
+        'Clorofila_a': clor_a,
+        'Clorofila_b': clor_b,
+        'Clorofila_total': clor_a + clor_b + rng.normal(0, 0.01, n),
+        'Nitrogeno': 24.5 + 0.6 * (potasio - 17) + rng.normal(0, 0.2, n),
+        'Fosforo': 14.0 + 0.8 * (potasio - 17) + rng.normal(0, 0.2, n),
+        'Potasio': potasio,
+        'Calcio': 13.2 + 0.2 * (potasio - 17) + rng.normal(0, 0.2, n),
+        'Magnesio': 4.0 + 0.15 * (potasio - 17) + rng.normal(0, 0.05, n),
+    })
+    return decodificar_tratamientos(df)
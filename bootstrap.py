@@ -0,0 +1,283 @@
+"""
+Intervalos de confianza bootstrap para los KPIs del dashboard.
+
+- Remuestreo estratificado: dentro de cada estrato (p. ej. cada combinación de
+  niveles de los factores indicados) se sortean filas con reemplazo,
+  conservando el tamaño del estrato. Los índices se generan una sola vez por
+  (estratos, réplicas, semilla) y se guardan.
+- KPIs del ANOVA: cada réplica es un vector de pesos de frecuencia por fila.
+  Las ecuaciones normales X'WX de todo un bloque de réplicas salen de un solo
+  `einsum` y los submodelos del tipo II se resuelven apilados, sin reajustar
+  statsmodels.
+- Métricas del Random Forest: por réplica se repite la CV de 5 folds con los
+  mejores hiperparámetros y un bosque reducido (menos árboles). Los folds de
+  prueba son los de la CV original y el bosque se entrena con las copias de la
+  réplica que no están en el fold, así no hay fuga entre train y test (con
+  copias en prueba el R² de un fold de 4 filas repetidas no está definido).
+  Las réplicas de un bloque se reparten con joblib según el presupuesto de
+  CPU; `bootstrap_rf` corre todas las réplicas como un trabajo del
+  planificador (trabajos.py), fuera del proceso de Streamlit.
+
+El cálculo va por bloques de réplicas: `TrabajoBootstrap` los procesa en un
+hilo de fondo, publica los resultados parciales y se puede cancelar entre
+bloques, sin bloquear la ejecución del script de Streamlit.
+"""
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.stats import f as dist_f
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+from anova import disenar_factorial
+from recursos import PresupuestoCPU
+
+TAMANO_BLOQUE = 250
+
+
+# ── Remuestreo ────────────────────────────────────────────────────────────────
+
+def codigos_estrato(df, columnas):
+    """Código entero del estrato de cada fila (combinación de `columnas`)."""
+    if not columnas:
+        return np.zeros(len(df), dtype=np.int64)
+    return df.groupby(list(columnas), observed=True, sort=True).ngroup().to_numpy()
+
+
+def indices_bootstrap(estratos, n_replicas, semilla=0):
+    """
+    Índices (n_replicas × n) de remuestreo con reemplazo dentro de cada
+    estrato. Se guardan por (estratos, n_replicas, semilla).
+    """
+    return _indices_bootstrap(tuple(np.asarray(estratos).tolist()), n_replicas, semilla)
+
+
+@lru_cache(maxsize=16)
+def _indices_bootstrap(estratos, n_replicas, semilla):
+    estratos = np.asarray(estratos)
+    rng = np.random.default_rng(semilla)
+    indices = np.empty((n_replicas, len(estratos)), dtype=np.int64)
+    for e in np.unique(estratos):
+        filas = np.flatnonzero(estratos == e)
+        indices[:, filas] = filas[rng.integers(len(filas), size=(n_replicas, len(filas)))]
+    indices.flags.writeable = False
+    return indices
+
+
+def _pesos(indices, n):
+    # Frecuencia de cada fila en cada réplica: (réplicas × n)
+    W = np.zeros((len(indices), n))
+    np.add.at(W, (np.repeat(np.arange(len(indices)), indices.shape[1]), indices.ravel()), 1.0)
+    return W
+
+
+# ── KPIs del ANOVA (vectorizado) ─────────────────────────────────────────────
+
+def preparar_anova(df, respuesta, factores):
+    """Matriz de diseño de efectos principales y columnas de cada término."""
+    bloques = disenar_factorial(df, factores, orden=1)
+    columnas, inicio = {}, 0
+    for t, (_, B) in bloques.items():
+        columnas[t] = np.arange(inicio, inicio + B.shape[1])
+        inicio += B.shape[1]
+    X = np.hstack([B for _, B in bloques.values()])
+    return {'X': X, 'y': df[respuesta].to_numpy(dtype=float), 'columnas': columnas}
+
+
+def _ss_submodelo(G, c, columnas):
+    # SS explicada y rango de los submodelos apilados (réplicas × p × p)
+    Gs = G[:, columnas][:, :, columnas]
+    cs = c[:, columnas]
+    beta = np.einsum('bjk,bk->bj', np.linalg.pinv(Gs, rcond=1e-10, hermitian=True), cs)
+    return (cs * beta).sum(axis=1), np.linalg.matrix_rank(Gs, hermitian=True)
+
+
+def kpis_anova(problema, indices, alfa=0.05):
+    """
+    KPIs de la tabla ANOVA tipo II para cada réplica: porcentaje explicado por
+    los factores, porcentaje de error y número de factores significativos.
+    """
+    X, y, columnas = problema['X'], problema['y'], problema['columnas']
+    W = _pesos(indices, len(y))
+    G = np.einsum('bi,ij,ik->bjk', W, X, X)
+    c = np.einsum('bi,ij->bj', W, X * y[:, None])
+    yy = W @ y ** 2
+
+    todas = np.arange(X.shape[1])
+    ss_total_modelo, rango = _ss_submodelo(G, c, todas)
+    rss = np.maximum(yy - ss_total_modelo, 0.0)
+    gl_resid = indices.shape[1] - rango
+
+    ss_terminos, significativos = [], np.zeros(len(indices), dtype=int)
+    for t, cols in columnas.items():
+        if t == 'Intercept':
+            continue
+        ss_base, rango_base = _ss_submodelo(G, c, np.setdiff1d(todas, cols))
+        ss_t = np.maximum(ss_total_modelo - ss_base, 0.0)
+        gl_t = rango - rango_base
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F = (ss_t / gl_t) / (rss / gl_resid)
+        significativos += (dist_f.sf(F, gl_t, gl_resid) < alfa) & (gl_t > 0)
+        ss_terminos.append(ss_t)
+
+    error_pct = 100 * rss / (np.sum(ss_terminos, axis=0) + rss)
+    return {'factores_pct': 100 - error_pct, 'error_pct': error_pct,
+            'significativos': significativos}
+
+
+def correlacion_ponderada(x, y, indices):
+    """Correlación de Pearson de x e y en cada réplica."""
+    W = _pesos(indices, len(x))
+    n = W.sum(axis=1)
+    mx, my = W @ x / n, W @ y / n
+    cov = W @ (x * y) / n - mx * my
+    return cov / np.sqrt((W @ x ** 2 / n - mx ** 2) * (W @ y ** 2 / n - my ** 2))
+
+
+# ── Métricas del Random Forest (reajustes reducidos) ─────────────────────────
+
+def _metricas_replica(X, y, indices, params, n_arboles, cv, semilla):
+    # Folds de prueba fijos sobre las filas originales (los mismos de la CV del
+    # modelo); el bosque se entrena con las copias de la réplica que no caen
+    # en el fold de prueba, así no hay fuga entre train y test
+    r2, mse, mae = [], [], []
+    for _, prueba in cv.split(X):
+        entreno = indices[~np.isin(indices, prueba)]
+        if len(np.unique(entreno)) < 2:
+            continue
+        bosque = RandomForestRegressor(**{**params, 'n_estimators': n_arboles},
+                                       random_state=semilla, n_jobs=1)
+        pred = bosque.fit(X[entreno], y[entreno]).predict(X[prueba])
+        r2.append(r2_score(y[prueba], pred))
+        mse.append(mean_squared_error(y[prueba], pred))
+        mae.append(mean_absolute_error(y[prueba], pred))
+    if not r2:
+        return np.full(4, np.nan)
+    return np.array([np.mean(r2), np.std(r2), np.sqrt(np.mean(mse)), np.mean(mae)])
+
+
+def metricas_rf(X, y, indices, params, n_arboles=25, cv=None, semilla=42, presupuesto=None):
+    """
+    R² medio, std del R², RMSE y MAE de CV por réplica, con un bosque de
+    `n_arboles` árboles y los hiperparámetros `params`. `cv` son los folds de
+    la CV original (por defecto KFold de 5 con semilla 42, como en modelo.py).
+    Las réplicas se reparten entre las CPUs de la etapa 'bootstrap' de
+    `presupuesto` (recursos.PresupuestoCPU); cada bosque usa un solo hilo.
+    """
+    cv = cv or KFold(n_splits=5, shuffle=True, random_state=42)
+    presupuesto = presupuesto or PresupuestoCPU()
+    externos, _ = presupuesto.reparto('bootstrap', len(indices))
+    with presupuesto.etapa('bootstrap'):
+        filas = Parallel(n_jobs=externos)(
+            delayed(_metricas_replica)(X, y, idx, params, n_arboles, cv, semilla + i)
+            for i, idx in enumerate(indices)
+        )
+    filas = np.array(filas).reshape(-1, 4)
+    return {'r2_mean': filas[:, 0], 'r2_std': filas[:, 1],
+            'rmse': filas[:, 2], 'mae_mean': filas[:, 3]}
+
+
+def bootstrap_rf(X, y, indices, params, n_arboles=25, tamano_bloque=10, progreso=None,
+                 cancelado=None):
+    """
+    `metricas_rf` de todas las réplicas por bloques de `tamano_bloque`, para
+    el planificador: `progreso(hechas, total)` tras cada bloque y, si
+    `cancelado()` es verdadero, termina sin calcular los bloques restantes.
+    Retorna {kpi: arreglo con una entrada por réplica calculada}, o None si
+    se canceló antes del primer bloque.
+    """
+    bloques = []
+    for inicio in range(0, len(indices), tamano_bloque):
+        if cancelado is not None and cancelado():
+            break
+        bloque = indices[inicio:inicio + tamano_bloque]
+        # Semillas por réplica como si fuera una sola llamada
+        bloques.append(metricas_rf(X, y, bloque, params, n_arboles=n_arboles, semilla=42 + inicio))
+        if progreso:
+            progreso(inicio + len(bloque), len(indices))
+    if not bloques:
+        return None
+    return {k: np.concatenate([b[k] for b in bloques]) for k in bloques[0]}
+
+
+# ── Ejecución por bloques ─────────────────────────────────────────────────────
+
+def intervalo(valores, nivel=0.95):
+    """Intervalo percentil (bajo, alto) ignorando réplicas no evaluables."""
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[np.isfinite(valores)]
+    if len(valores) == 0:
+        return np.nan, np.nan
+    alfa = (1 - nivel) / 2
+    return tuple(np.quantile(valores, [alfa, 1 - alfa]))
+
+
+class TrabajoBootstrap:
+    """
+    Aplica `calcular(indices_bloque) -> {kpi: arreglo}` sobre `indices` por
+    bloques en un hilo de fondo. `muestras()` devuelve lo acumulado hasta el
+    momento; `cancelar()` detiene el trabajo al terminar el bloque en curso.
+    """
+
+    def __init__(self, calcular, indices, tamano_bloque=TAMANO_BLOQUE):
+        self.calcular = calcular
+        self.indices = indices
+        self.tamano_bloque = tamano_bloque
+        self.total = len(indices)
+        self.hechas = 0
+        self.error = None
+        self._bloques = []
+        self._lock = threading.Lock()
+        self._cancelar = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def _correr(self):
+        try:
+            for inicio in range(0, self.total, self.tamano_bloque):
+                if self._cancelar.is_set():
+                    return
+                bloque = self.indices[inicio:inicio + self.tamano_bloque]
+                resultado = self.calcular(bloque)
+                with self._lock:
+                    self._bloques.append(resultado)
+                    self.hechas += len(bloque)
+        except Exception as e:            # se muestra en la app en lugar de perderse en el hilo
+            self.error = e
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    @property
+    def terminado(self):
+        return not self._hilo.is_alive() and (self.hechas == self.total or self.error is not None
+                                               or self.cancelado)
+
+    def esperar(self, timeout=None):
+        self._hilo.join(timeout)
+        return self
+
+    def muestras(self):
+        """{kpi: arreglo con las réplicas terminadas}."""
+        with self._lock:
+            bloques = list(self._bloques)
+        if not bloques:
+            return {}
+        return {k: np.concatenate([b[k] for b in bloques]) for k in bloques[0]}
+
+    def resumen(self, nivel=0.95):
+        """DataFrame con el intervalo de cada KPI y el número de réplicas usadas."""
+        muestras = self.muestras()
+        filas = {k: (*intervalo(v, nivel), int(np.isfinite(v).sum())) for k, v in muestras.items()}
+        return pd.DataFrame.from_dict(filas, orient='index', columns=['bajo', 'alto', 'replicas'])
@@ -0,0 +1,74 @@
+"""
+Inferencia vectorizada sobre un Random Forest ya entrenado.
+
+`BosquePlano` copia una sola vez los nodos de todos los árboles (variable,
+umbral, hijos y valor) en arreglos planos y recorre todos los árboles para
+todo el lote de entradas a la vez, un nivel de profundidad por iteración.
+Evita las cientos de llamadas a `tree.predict` (con su validación) que
+requiere obtener la predicción de cada árbol por separado.
+"""
+import numpy as np
+
+
+class BosquePlano:
+    """
+    Arreglos de nodos de un `RandomForestRegressor` ajustado.
+
+    Los índices de nodo son globales (desplazados por árbol). En las hojas
+    ambos hijos apuntan a la propia hoja, de modo que el recorrido puede
+    avanzar siempre `profundidad` niveles sin ramas especiales.
+    """
+
+    def __init__(self, bosque):
+        arboles = [est.tree_ for est in bosque.estimators_]
+        tamanos = np.array([t.node_count for t in arboles])
+        self.n_arboles = len(arboles)
+        self.n_features = bosque.n_features_in_
+        self.raices = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+        self.profundidad = max(t.max_depth for t in arboles)
+
+        self.feature = np.concatenate([t.feature for t in arboles]).astype(np.intp)
+        self.threshold = np.concatenate([t.threshold for t in arboles])
+        self.valor = np.concatenate([t.value[:, 0, 0] for t in arboles])
+        self.cobertura = np.concatenate([t.weighted_n_node_samples for t in arboles])
+
+        izq = np.concatenate([t.children_left for t in arboles]).astype(np.intp)
+        der = np.concatenate([t.children_right for t in arboles]).astype(np.intp)
+        desplazamiento = np.repeat(self.raices, tamanos)
+        self.es_hoja = izq < 0
+        propio = np.arange(len(izq))
+        self.izq = np.where(self.es_hoja, propio, izq + desplazamiento)
+        self.der = np.where(self.es_hoja, propio, der + desplazamiento)
+        self.feature[self.es_hoja] = 0      # cualquier columna válida
+
+    def hojas(self, X):
+        """Índice global de la hoja alcanzada en cada árbol: (n_muestras, n_arboles)."""
+        # sklearn compara en float32, igual que DecisionTreeRegressor.predict
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        filas = np.arange(X.shape[0])[:, None]
+        nodo = np.broadcast_to(self.raices, (X.shape[0], self.n_arboles))
+        for _ in range(self.profundidad):
+            va_izq = X[filas, self.feature[nodo]] <= self.threshold[nodo]
+            nodo = np.where(va_izq, self.izq[nodo], self.der[nodo])
+        return nodo
+
+    def predecir_arboles(self, X):
+        """Predicción de cada árbol: (n_muestras, n_arboles)."""
+        return self.valor[self.hojas(X)]
+
+    def predecir(self, X):
+        """Predicción del bosque (media de los árboles), como `bosque.predict`."""
+        return self.predecir_arboles(X).mean(axis=1)
+
+    def resumen(self, X, cuantiles=(0.025, 0.5, 0.975)):
+        """
+        Predicciones por árbol y su resumen para un lote de entradas:
+        `arboles` (n, n_arboles), `media`, `std` y `cuantiles` (n, len(cuantiles)).
+        """
+        por_arbol = self.predecir_arboles(X)
+        return {
+            'arboles': por_arbol,
+            'media': por_arbol.mean(axis=1),
+            'std': por_arbol.std(axis=1),
+            'cuantiles': np.quantile(por_arbol, cuantiles, axis=1).T,
+        }
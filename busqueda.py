@@ -0,0 +1,243 @@
+"""
+Motores de búsqueda de hiperparámetros para el Random Forest.
+
+- 'grid': GridSearchCV exhaustivo (comportamiento original).
+- 'halving-grid' / 'halving-random': successive halving de sklearn. El
+  recurso que se reparte es `n_estimators` con pocos datos y el número de
+  muestras cuando el conjunto es grande; la variante aleatoria parte de la
+  mitad de los candidatos de la rejilla.
+- 'warm-start': misma rejilla y mismo ganador que 'grid', pero por cada
+  combinación y fold se hace crecer un único bosque con `warm_start=True` y
+  se evalúan sus prefijos de 100/200/300 árboles, en lugar de ajustar un
+  bosque independiente por cada `n_estimators`. Guarda además las
+  predicciones out-of-fold del ganador (`predicciones_oof_`), para no repetir
+  la CV solo para obtenerlas.
+- 'smbo': optimización secuencial basada en modelo (un bosque sustituto con
+  criterio UCB) sobre la misma rejilla discreta, con un presupuesto fijo de
+  candidatos evaluados.
+
+Todos exponen la interfaz de las búsquedas de sklearn (`fit`, `best_params_`,
+`best_estimator_`, `best_index_`, `cv_results_`, `n_splits_`).
+"""
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    GridSearchCV, HalvingGridSearchCV, HalvingRandomSearchCV, ParameterGrid,
+    check_cv, cross_validate,
+)
+from sklearn.metrics import check_scoring
+
+MOTORES_BUSQUEDA = ('grid', 'warm-start', 'halving-grid', 'halving-random', 'smbo')
+
+# A partir de este tamaño el halving reparte muestras en lugar de árboles; por
+# debajo, el costo de ajustar un bosque depende sobre todo del número de árboles
+MIN_MUESTRAS_HALVING = 10_000
+
+
+def crear_busqueda(motor, estimador, param_grid, cv, scoring, refit, n_muestras,
+                   random_state=42, n_jobs=-1):
+    """
+    Búsqueda sin ajustar para `motor`. `scoring`/`refit` siguen la convención de
+    GridSearchCV; los motores de halving solo admiten una métrica, así que
+    usan la de `refit`. `n_jobs` es el paralelismo entre candidatos y folds.
+    """
+    if motor == 'grid':
+        return GridSearchCV(estimador, param_grid, cv=cv, scoring=scoring,
+                            n_jobs=n_jobs, refit=refit)
+
+    if motor in ('halving-grid', 'halving-random'):
+        metrica = scoring[refit] if isinstance(scoring, dict) else scoring
+        params = dict(param_grid)
+        kwargs = dict(cv=cv, scoring=metrica, factor=3, n_jobs=n_jobs,
+                      refit=True, random_state=random_state)
+        if n_muestras >= MIN_MUESTRAS_HALVING or 'n_estimators' not in params:
+            kwargs.update(resource='n_samples', min_resources='exhaust')
+        else:
+            arboles = params.pop('n_estimators')
+            kwargs.update(resource='n_estimators',
+                          min_resources=min(arboles), max_resources=max(arboles))
+        if motor == 'halving-grid':
+            return HalvingGridSearchCV(estimador, params, **kwargs)
+        n_candidatos = max(2, len(ParameterGrid(params)) // 2)
+        return HalvingRandomSearchCV(estimador, params, n_candidates=n_candidatos, **kwargs)
+
+    if motor == 'warm-start':
+        return BusquedaWarmStart(estimador, param_grid, cv=cv, scoring=scoring,
+                                 refit=refit, n_jobs=n_jobs)
+
+    if motor == 'smbo':
+        return BusquedaSMBO(estimador, param_grid, cv=cv, scoring=scoring,
+                            refit=refit, n_jobs=n_jobs, random_state=random_state)
+
+    raise ValueError(f"Motor de búsqueda desconocido: {motor!r}. Opciones: {MOTORES_BUSQUEDA}")
+
+
+class BusquedaSMBO:
+    """
+    Optimización secuencial basada en modelo sobre una rejilla discreta.
+
+    Evalúa `n_iniciales` candidatos al azar y, en adelante, ajusta un bosque
+    sustituto (parámetros codificados por posición → puntaje medio de CV) y
+    evalúa el candidato pendiente con mayor media + `kappa`·std entre árboles,
+    hasta completar `n_iter` candidatos.
+    """
+
+    def __init__(self, estimator, param_grid, *, n_iter=12, n_iniciales=5, kappa=1.0,
+                 cv=5, scoring=None, refit=True, n_jobs=-1, random_state=None):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.n_iter = n_iter
+        self.n_iniciales = n_iniciales
+        self.kappa = kappa
+        self.cv = cv
+        self.scoring = scoring
+        self.refit = refit
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        candidatos = list(ParameterGrid(self.param_grid))
+        nombres = sorted(self.param_grid)
+        codigos = np.array([[list(self.param_grid[p]).index(c[p]) for p in nombres]
+                            for c in candidatos], dtype=float)
+        cv = check_cv(self.cv)
+        self.n_splits_ = cv.get_n_splits(X, y)
+
+        multi = isinstance(self.scoring, dict)
+        metricas = list(self.scoring) if multi else ['score']
+        principal = self.refit if multi else 'score'
+
+        rng = np.random.default_rng(self.random_state)
+        presupuesto = min(self.n_iter, len(candidatos))
+        orden = list(rng.permutation(len(candidatos))[:min(self.n_iniciales, presupuesto)])
+        evaluados, puntajes = [], []
+
+        while len(evaluados) < presupuesto:
+            if orden:
+                i = int(orden.pop(0))
+            else:
+                i = self._proximo(codigos, evaluados, puntajes)
+            res = cross_validate(clone(self.estimator).set_params(**candidatos[i]),
+                                 X, y, cv=cv, scoring=self.scoring, n_jobs=self.n_jobs)
+            evaluados.append(i)
+            puntajes.append({m: res[f'test_{m}'] for m in metricas})
+
+        self.cv_results_ = {'params': [candidatos[i] for i in evaluados]}
+        for m in metricas:
+            folds = np.array([p[m] for p in puntajes])
+            self.cv_results_[f'mean_test_{m}'] = folds.mean(axis=1)
+            self.cv_results_[f'std_test_{m}'] = folds.std(axis=1)
+            for k in range(self.n_splits_):
+                self.cv_results_[f'split{k}_test_{m}'] = folds[:, k]
+            self.cv_results_[f'rank_test_{m}'] = _rango(folds.mean(axis=1))
+
+        self.best_index_ = int(np.argmax(self.cv_results_[f'mean_test_{principal}']))
+        self.best_params_ = self.cv_results_['params'][self.best_index_]
+        self.best_score_ = float(self.cv_results_[f'mean_test_{principal}'][self.best_index_])
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+    def _proximo(self, codigos, evaluados, puntajes):
+        principal = self.refit if isinstance(self.scoring, dict) else 'score'
+        objetivo = np.array([p[principal].mean() for p in puntajes])
+        sustituto = RandomForestRegressor(n_estimators=100, random_state=self.random_state)
+        sustituto.fit(codigos[evaluados], objetivo)
+
+        pendientes = np.setdiff1d(np.arange(len(codigos)), evaluados)
+        por_arbol = np.stack([t.predict(codigos[pendientes]) for t in sustituto.estimators_])
+        ucb = por_arbol.mean(axis=0) + self.kappa * por_arbol.std(axis=0)
+        return int(pendientes[np.argmax(ucb)])
+
+
+class BusquedaWarmStart:
+    """
+    Búsqueda exhaustiva que reutiliza árboles entre valores de `n_estimators`.
+
+    Para cada combinación del resto de parámetros y cada fold se ajusta un solo
+    bosque con `warm_start=True`, agregando árboles hasta cada valor de
+    `n_estimators` y puntuando el prefijo. Con la misma `random_state`, sklearn
+    genera exactamente los mismos árboles que un ajuste desde cero, así que
+    `cv_results_` (en el orden de ParameterGrid) y el modelo elegido coinciden
+    con GridSearchCV, con la mitad de árboles ajustados para 100/200/300.
+    `predicciones_oof_` son las predicciones de cada fold de prueba del
+    candidato ganador (las mismas de `cross_val_predict`).
+    """
+
+    def __init__(self, estimator, param_grid, *, cv=5, scoring=None, refit=True, n_jobs=-1):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.refit = refit
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        cv = check_cv(self.cv)
+        splits = list(cv.split(X, y))
+        self.n_splits_ = len(splits)
+
+        multi = isinstance(self.scoring, dict)
+        scorers = ({m: check_scoring(self.estimator, s) for m, s in self.scoring.items()}
+                   if multi else {'score': check_scoring(self.estimator, self.scoring)})
+        principal = self.refit if multi else 'score'
+
+        resto = {p: v for p, v in self.param_grid.items() if p != 'n_estimators'}
+        arboles = sorted(self.param_grid.get('n_estimators', [self.estimator.n_estimators]))
+        combinaciones = list(ParameterGrid(resto))
+
+        tareas = Parallel(n_jobs=self.n_jobs)(
+            delayed(_puntuar_prefijos)(clone(self.estimator).set_params(**params),
+                                       X, y, train, test, arboles, scorers)
+            for params in combinaciones for train, test in splits
+        )
+
+        # tareas[c * n_splits + k] = ({n_arboles: {métrica: puntaje}}, {n_arboles: predicción})
+        puntajes, predicciones = {}, {}
+        for c, params in enumerate(combinaciones):
+            for n in arboles:
+                clave = tuple(sorted({**params, 'n_estimators': n}.items()))
+                puntajes[clave] = [tareas[c * self.n_splits_ + k][0][n] for k in range(self.n_splits_)]
+                predicciones[clave] = [tareas[c * self.n_splits_ + k][1][n] for k in range(self.n_splits_)]
+
+        candidatos = list(ParameterGrid(self.param_grid))
+        self.cv_results_ = {'params': candidatos}
+        for m in scorers:
+            folds = np.array([[f[m] for f in puntajes[tuple(sorted(c.items()))]]
+                              for c in candidatos])
+            self.cv_results_[f'mean_test_{m}'] = folds.mean(axis=1)
+            self.cv_results_[f'std_test_{m}'] = folds.std(axis=1)
+            for k in range(self.n_splits_):
+                self.cv_results_[f'split{k}_test_{m}'] = folds[:, k]
+            self.cv_results_[f'rank_test_{m}'] = _rango(folds.mean(axis=1))
+
+        self.best_index_ = int(np.argmax(self.cv_results_[f'mean_test_{principal}']))
+        self.best_params_ = self.cv_results_['params'][self.best_index_]
+        self.best_score_ = float(self.cv_results_[f'mean_test_{principal}'][self.best_index_])
+
+        self.predicciones_oof_ = np.empty(len(y), dtype=float)
+        for (_, test), pred in zip(splits, predicciones[tuple(sorted(self.best_params_.items()))]):
+            self.predicciones_oof_[test] = pred
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+
+def _rango(medias):
+    # Misma convención que GridSearchCV: empates comparten el menor rango
+    return rankdata(-medias, method='min').astype(np.int32)
+
+
+def _puntuar_prefijos(bosque, X, y, train, test, arboles, scorers):
+    bosque.set_params(warm_start=True)
+    puntajes, predicciones = {}, {}
+    for n in arboles:
+        bosque.set_params(n_estimators=n).fit(X[train], y[train])
+        puntajes[n] = {m: s(bosque, X[test], y[test]) for m, s in scorers.items()}
+        predicciones[n] = bosque.predict(X[test])
+    return puntajes, predicciones
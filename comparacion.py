@@ -0,0 +1,248 @@
+"""
+Comparación de modelos bajo la misma validación cruzada.
+
+La pestaña del modelo solo evalúa el Random Forest. Aquí cada modelo de
+`MODELOS` (bosque, gradient boosting, HistGradientBoosting, lineales tipo
+ANOVA/ridge y kNN) se evalúa con el mismo `KFold` de `modelo._validacion`
+y la misma matriz de `modelo.preparar_features`, y se reporta junto a su
+puntaje el costo de usarlo:
+
+- R², RMSE y MAE de CV (media y std del R² por fold; RMSE = √MSE medio,
+  como las tarjetas de la pestaña).
+- Tiempo de ajuste medio por fold y del ajuste final sobre todos los datos.
+- Latencia de predicción de una fila (mediana de `REPETICIONES_LATENCIA`
+  llamadas) y costo por fila en lote, medidas en un solo proceso después de
+  los ajustes para que no compitan con ellos.
+- Memoria del modelo final (tamaño serializado con pickle).
+
+Los ajustes (modelos × folds, más el final) son tareas independientes que se
+reparten con joblib según `recursos.PresupuestoCPU` (etapa 'comparacion').
+Cada resultado se guarda en DIR_CACHE/comparacion/ con una clave por
+(modelo, parámetros, huella de los datos, validación, versión de sklearn):
+cambiar los parámetros de un modelo solo reevalúa ese modelo.
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import (
+    GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor,
+)
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from datos import DIR_CACHE
+from modelo import _validacion
+from recursos import PresupuestoCPU
+
+DIR_COMPARACION = os.path.join(DIR_CACHE, 'comparacion')
+
+# Subir cuando cambie la forma de medir: invalida los resultados guardados
+VERSION_COMPARACION = 1
+
+REPETICIONES_LATENCIA = 30
+FILAS_LOTE = 1000
+
+# Columnas de modelo.preparar_features: factores codificados y continuas
+_FACTORES = [0, 1, 2]                      # Variedad, Bioestimulante, Radiación (3 niveles)
+_CONTINUAS = list(range(3, 10))
+
+
+def _random_forest(**params):
+    return RandomForestRegressor(**params)
+
+
+def _gradient_boosting(**params):
+    return GradientBoostingRegressor(**params)
+
+
+def _hist_gradient_boosting(**params):
+    return HistGradientBoostingRegressor(categorical_features=[0, 1], **params)
+
+
+def _ridge(**params):
+    # Factores en dummies + continuas estandarizadas, con penalización L2
+    columnas = ColumnTransformer([
+        ('factores', OneHotEncoder(handle_unknown='ignore'), _FACTORES),
+        ('continuas', StandardScaler(), _CONTINUAS),
+    ])
+    return make_pipeline(columnas, Ridge(**params))
+
+
+def _lineal_anova(**params):
+    # Efectos principales de los tres factores, como el ANOVA de la pestaña 4
+    columnas = ColumnTransformer([('factores', OneHotEncoder(handle_unknown='ignore'), _FACTORES)])
+    return make_pipeline(columnas, LinearRegression(**params))
+
+
+def _knn(**params):
+    return make_pipeline(StandardScaler(), KNeighborsRegressor(**params))
+
+
+# nombre -> (constructor, parámetros por defecto). El bosque usa la
+# regularización de la rejilla de modelo.PARAM_GRID.
+MODELOS = {
+    'Random Forest': (_random_forest, {'n_estimators': 300, 'max_depth': 4,
+                                       'min_samples_leaf': 2, 'random_state': 42}),
+    'Gradient Boosting': (_gradient_boosting, {'n_estimators': 200, 'learning_rate': 0.05,
+                                               'max_depth': 2, 'subsample': 0.8,
+                                               'random_state': 42}),
+    'HistGradientBoosting': (_hist_gradient_boosting, {'max_iter': 200, 'learning_rate': 0.05,
+                                                       'max_depth': 3, 'min_samples_leaf': 3,
+                                                       'random_state': 42}),
+    'Ridge': (_ridge, {'alpha': 1.0}),
+    'Lineal ANOVA': (_lineal_anova, {}),
+    'kNN': (_knn, {'n_neighbors': 5, 'weights': 'distance'}),
+}
+
+
+def construir_modelo(nombre, params=None):
+    """Estimador sin ajustar de `nombre` con sus parámetros por defecto y `params` encima."""
+    if nombre not in MODELOS:
+        raise ValueError(f"Modelo desconocido: {nombre!r}. Opciones: {tuple(MODELOS)}")
+    constructor, por_defecto = MODELOS[nombre]
+    return constructor(**{**por_defecto, **(params or {})})
+
+
+def clave_resultado(nombre, params, huella, cv):
+    """Clave del resultado de un modelo para estos datos y esta validación."""
+    contenido = (VERSION_COMPARACION, nombre, sorted((params or {}).items()), huella,
+                 repr(cv), sklearn.__version__)
+    return hashlib.sha1(repr(contenido).encode()).hexdigest()
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar(resultado, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f'{ruta}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        # Parámetros con escalares de NumPy (p. ej. de best_params_) → Python
+        json.dump(resultado, f, indent=2, default=lambda v: v.item())
+    os.replace(tmp, ruta)
+
+
+def _ajustar(estimador, X, y, entrenamiento, prueba, n_jobs):
+    # Una tarea: ajuste en `entrenamiento` y, si hay `prueba`, sus puntajes
+    if 'n_jobs' in estimador.get_params():
+        estimador.set_params(n_jobs=n_jobs)
+    inicio = time.perf_counter()
+    estimador.fit(X[entrenamiento], y[entrenamiento])
+    segundos = time.perf_counter() - inicio
+    if prueba is None:
+        # Modelo final: la latencia se mide con un solo hilo
+        if 'n_jobs' in estimador.get_params():
+            estimador.set_params(n_jobs=1)
+        return estimador, segundos
+    pred = estimador.predict(X[prueba])
+    return {'r2': r2_score(y[prueba], pred),
+            'mse': mean_squared_error(y[prueba], pred),
+            'mae': mean_absolute_error(y[prueba], pred)}, segundos
+
+
+def _latencias(estimador, X):
+    # Mediana de la predicción de una fila y costo por fila de un lote grande
+    veces = []
+    for i in range(REPETICIONES_LATENCIA):
+        fila = X[i % len(X)][None]
+        inicio = time.perf_counter()
+        estimador.predict(fila)
+        veces.append(time.perf_counter() - inicio)
+    lote = np.resize(X, (FILAS_LOTE, X.shape[1]))
+    inicio = time.perf_counter()
+    estimador.predict(lote)
+    return float(np.median(veces)), (time.perf_counter() - inicio) / FILAS_LOTE
+
+
+def comparar_modelos(X, y, huella, modelos=None, cv=None, presupuesto=None,
+                     directorio=DIR_COMPARACION):
+    """
+    Resultados de cada modelo (`modelos`: {nombre: parámetros}, por defecto
+    todos los de MODELOS) con la validación `cv` (por defecto la del modelo
+    del dashboard). Solo se ajustan los que no están en `directorio`.
+    Retorna un DataFrame con una fila por modelo (ver tabla_posiciones).
+    """
+    modelos = {n: {} for n in MODELOS} if modelos is None else modelos
+    cv = cv or _validacion()
+    presupuesto = presupuesto or PresupuestoCPU()
+    X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+    particiones = list(cv.split(X, y))
+    todas = np.arange(len(y))
+
+    resultados, pendientes = {}, {}
+    for nombre, params in modelos.items():
+        ruta = (os.path.join(directorio, f'{clave_resultado(nombre, params, huella, cv)}.json')
+                if directorio else None)
+        guardado = _leer(ruta) if ruta else None
+        if guardado is not None:
+            resultados[nombre] = guardado
+        else:
+            pendientes[nombre] = (params, ruta)
+
+    if pendientes:
+        # Tareas (modelo, fold) más el ajuste final de cada modelo, sin anidar
+        tareas = [(nombre, entrenamiento, prueba)
+                  for nombre in pendientes
+                  for entrenamiento, prueba in particiones + [(todas, None)]]
+        externos, internos = presupuesto.reparto('comparacion', len(tareas))
+        with presupuesto.etapa('comparacion'):
+            salidas = Parallel(n_jobs=externos)(
+                delayed(_ajustar)(construir_modelo(nombre, pendientes[nombre][0]),
+                                  X, y, entrenamiento, prueba, internos)
+                for nombre, entrenamiento, prueba in tareas
+            )
+            por_modelo = {}
+            for (nombre, _, _), salida in zip(tareas, salidas):
+                por_modelo.setdefault(nombre, []).append(salida)
+
+            for nombre, (params, ruta) in pendientes.items():
+                *folds, (final, ajuste_final_s) = por_modelo[nombre]
+                puntajes = pd.DataFrame([p for p, _ in folds])
+                latencia_s, por_fila_s = _latencias(final, X)
+                resultado = {
+                    'modelo': nombre,
+                    'params': {**MODELOS[nombre][1], **params},
+                    'r2_mean': float(puntajes['r2'].mean()),
+                    'r2_std': float(puntajes['r2'].std(ddof=0)),
+                    'rmse_mean': float(np.sqrt(puntajes['mse'].mean())),   # como modelo._metricas
+                    'mae_mean': float(puntajes['mae'].mean()),
+                    'ajuste_fold_s': float(np.mean([s for _, s in folds])),
+                    'ajuste_final_s': float(ajuste_final_s),
+                    'latencia_ms': 1000 * latencia_s,
+                    'lote_us_fila': 1e6 * por_fila_s,
+                    'memoria_kb': len(pickle.dumps(final)) / 1024,
+                }
+                if ruta:
+                    _guardar(resultado, ruta)
+                resultados[nombre] = resultado
+
+    return pd.DataFrame([resultados[n] for n in modelos])
+
+
+def tabla_posiciones(resultados, slo_latencia_ms=None):
+    """
+    Tabla de posiciones: los modelos que cumplen el SLO de latencia de una
+    fila (`slo_latencia_ms`, sin tope si es None) primero, luego por R² de CV.
+    """
+    tabla = resultados.copy()
+    tabla['cumple_slo'] = (True if slo_latencia_ms is None
+                           else tabla['latencia_ms'] <= slo_latencia_ms)
+    tabla = tabla.sort_values(['cumple_slo', 'r2_mean'], ascending=False).reset_index(drop=True)
+    tabla.index = tabla.index + 1
+    return tabla
@@ -0,0 +1,99 @@
+"""
+Bosque de regresión por cuantiles (Meinshausen, 2006) sobre el bosque ya ajustado.
+
+El "IC 95 %" como media ± 1.96·std de las predicciones de los árboles mide
+la dispersión de las medias de las hojas, no la de la respuesta: no es un
+intervalo de predicción. Un bosque de cuantiles usa los mismos árboles pero
+conserva, en cada hoja, las observaciones de entrenamiento que caen en ella.
+Para una entrada x, la observación i recibe el peso
+
+    w_i(x) = (1/T) Σ_t 1{i está en la hoja de x en el árbol t} / |hoja_t(x)|
+
+y los cuantiles condicionales son los de la distribución empírica de y
+ponderada por w(x).
+
+`BosqueCuantil` calcula una sola vez la hoja de cada observación de
+entrenamiento en cada árbol y arma un índice hoja → observaciones (formato
+CSR: inicio y tamaño por hoja, observaciones ordenadas por y). Consultar un
+lote de entradas es un recorrido de `BosquePlano` más una búsqueda
+vectorizada en el índice, por grupos de árboles cuya expansión hoja →
+observaciones cabe en MAX_ELEMENTOS_LOTE.
+"""
+import numpy as np
+
+# Tope de elementos por bloque: consultas × observaciones de entrenamiento en
+# la matriz de pesos y pares (consulta, observación de su hoja) en la expansión
+MAX_ELEMENTOS_LOTE = 4_000_000
+
+
+class BosqueCuantil:
+    """Índice hoja → observaciones de entrenamiento de un `BosquePlano`."""
+
+    def __init__(self, bosque, X, y):
+        self.bosque = bosque
+        y = np.asarray(y, dtype=float)
+        # Observaciones ordenadas por y: los pesos acumulados dan los cuantiles
+        orden = np.argsort(y, kind='stable')
+        self.y_ordenado = y[orden]
+        rango = np.empty(len(y), dtype=np.intp)
+        rango[orden] = np.arange(len(y))
+
+        # Hoja de cada observación en cada árbol, agrupada por hoja
+        hojas = bosque.hojas(X)                                  # n × n_arboles
+        hoja_plana = hojas.ravel()
+        por_hoja = np.argsort(hoja_plana, kind='stable')
+        self.muestras = np.repeat(rango, bosque.n_arboles)[por_hoja]
+        self.tamano = np.bincount(hoja_plana, minlength=len(bosque.valor))
+        self.inicio = np.concatenate([[0], np.cumsum(self.tamano)[:-1]])
+
+    def pesos(self, X):
+        """Pesos w(x) de cada observación (en el orden de `y_ordenado`): (n_consultas × n)."""
+        hojas = self.bosque.hojas(X)                             # m × n_arboles
+        m, n = len(hojas), len(self.y_ordenado)
+        tamano = self.tamano[hojas]
+        # Cada (consulta, árbol) se expande a las observaciones de su hoja: se
+        # acumula por grupos de árboles de a lo sumo MAX_ELEMENTOS_LOTE elementos
+        expandidos = np.cumsum(tamano.sum(axis=0))
+        W = np.zeros(m * n)
+        inicio = 0
+        while inicio < self.bosque.n_arboles:
+            previos = expandidos[inicio - 1] if inicio else 0
+            fin = max(inicio + 1, int(np.searchsorted(expandidos, previos + MAX_ELEMENTOS_LOTE,
+                                                      side='right')))
+            W += self._expandir(hojas[:, inicio:fin], tamano[:, inicio:fin], m * n)
+            inicio = fin
+        W = W.reshape(m, n)
+        # Árboles cuya hoja no tiene observaciones no aportan: renormalizar
+        return W / W.sum(axis=1, keepdims=True)
+
+    def _expandir(self, hojas, tamano, minlength):
+        # Suma de 1/|hoja| sobre las observaciones de cada hoja, por consulta
+        m, arboles = hojas.shape
+        n = len(self.y_ordenado)
+        tamano = tamano.ravel()
+        fin = np.cumsum(tamano)
+        desplazamiento = np.arange(fin[-1]) - np.repeat(fin - tamano, tamano)
+        muestra = self.muestras[np.repeat(self.inicio[hojas].ravel(), tamano) + desplazamiento]
+        consulta = np.repeat(np.repeat(np.arange(m), arboles), tamano)
+        peso = np.repeat(1.0 / np.maximum(tamano, 1), tamano)
+        return np.bincount(consulta * n + muestra, weights=peso, minlength=minlength)
+
+    def cuantiles(self, X, cuantiles=(0.025, 0.5, 0.975)):
+        """Cuantiles condicionales de y para un lote de entradas: (n_consultas × len(cuantiles))."""
+        X = np.atleast_2d(X)
+        cuantiles = np.asarray(cuantiles, dtype=float)
+        por_bloque = max(1, MAX_ELEMENTOS_LOTE // len(self.y_ordenado))
+        resultado = np.empty((len(X), len(cuantiles)))
+        for inicio in range(0, len(X), por_bloque):
+            acumulado = np.cumsum(self.pesos(X[inicio:inicio + por_bloque]), axis=1)
+            # Primer y cuyo peso acumulado alcanza cada cuantil
+            indices = (acumulado[:, :, None] < cuantiles - 1e-12).sum(axis=1)
+            resultado[inicio:inicio + por_bloque] = self.y_ordenado[
+                np.minimum(indices, len(self.y_ordenado) - 1)]
+        return resultado
+
+    def intervalo(self, X, nivel=0.95):
+        """Límites (bajo, alto) del intervalo de predicción central de `nivel`."""
+        alfa = (1 - nivel) / 2
+        limites = self.cuantiles(X, (alfa, 1 - alfa))
+        return limites[:, 0], limites[:, 1]
@@ -0,0 +1,347 @@
+"""
+Fuentes de datos del dashboard.
+
+Las tablas de clorofila y nutrientes pueden venir de archivos Parquet,
+Arrow/Feather (IPC) o CSV en disco; si no se configura ninguna ruta se usan
+los datos publicados por Aguilar-Luna et al. (2024), embebidos más abajo.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+COLUMNAS_CLOROFILA = ['Tratamiento', 'Clorofila_a', 'Clorofila_b', 'Clorofila_total']
+COLUMNAS_NUTRIENTES = ['Tratamiento', 'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']
+FACTORES = ['Variedad', 'Bioestimulante', 'Radiacion']
+
+# Código de tratamiento: Variedad.Bioestimulante.Radiación (p. ej. 'Co.A.278')
+_PATRON_TRATAMIENTO = r'^([A-Za-z]+)\.([A-Za-z]+)\.(\d+)$'
+
+# Variables de entorno con la ruta de cada tabla (vacías → datos embebidos)
+ENV_CLOROFILA = 'DASHBOARD_CLOROFILA'
+ENV_NUTRIENTES = 'DASHBOARD_NUTRIENTES'
+# Directorio de artefactos persistentes (uniones, modelos…)
+ENV_CACHE = 'DASHBOARD_CACHE'
+DIR_CACHE = os.environ.get(ENV_CACHE) or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+_EXT_PARQUET = {'.parquet', '.pq'}
+_EXT_ARROW = {'.arrow', '.feather', '.ipc'}
+_EXT_CSV = {'.csv'}
+
+DATOS_CLOROFILA = {
+    'Tratamiento': [
+        'Co.T.278', 'Co.T.440', 'Co.M.278', 'Co.M.440', 'Co.A.168', 'Co.A.278', 'Co.A.440', 'Co.P.278', 'Co.P.440',
+        'Ma.T.278', 'Ma.T.440', 'Ma.M.168', 'Ma.M.440', 'Ma.A.168', 'Ma.A.440', 'Ma.P.440',
+        'Ca.T.278', 'Ca.M.440', 'Ca.A.278', 'Ca.A.440', 'Ca.P.278', 'Ca.P.440',
+        'Ga.T.278', 'Ga.T.440', 'Ga.M.278', 'Ga.M.440', 'Ga.A.278', 'Ga.P.168', 'Ga.P.278', 'Ga.P.440'
+    ],
+    'Clorofila_a': [
+        1.72, 1.83, 1.72, 1.90, 1.63, 1.80, 1.90, 1.81, 2.00,
+        1.71, 1.83, 1.60, 1.92, 1.68, 1.94, 2.05,
+        1.73, 1.92, 1.80, 1.92, 1.81, 2.01,
+        1.71, 1.83, 1.75, 1.92, 1.80, 1.71, 1.83, 2.02
+    ],
+    'Clorofila_b': [
+        0.83, 0.97, 0.83, 0.95, 0.83, 0.98, 0.95, 0.91, 1.08,
+        0.88, 0.90, 0.84, 0.91, 0.83, 0.85, 1.05,
+        0.84, 0.96, 0.83, 0.90, 0.89, 1.02,
+        0.84, 0.91, 0.89, 0.77, 0.88, 0.82, 0.91, 1.01
+    ],
+    'Clorofila_total': [
+        2.55, 2.80, 2.55, 2.85, 2.46, 2.78, 2.85, 2.71, 3.08,
+        2.59, 2.73, 2.44, 2.83, 2.51, 2.79, 3.08,
+        2.57, 2.88, 2.63, 2.82, 2.70, 3.03,
+        2.55, 2.74, 2.74, 2.69, 2.68, 2.53, 2.74, 3.03
+    ]
+}
+
+DATOS_NUTRIENTES = {
+    'Tratamiento': [
+        'Co.M.168', 'Co.A.168', 'Co.A.278', 'Co.P.168', 'Co.P.278',
+        'Ma.M.168', 'Ma.M.278', 'Ma.A.168', 'Ma.A.278', 'Ma.P.168', 'Ma.P.278',
+        'Ca.M.168', 'Ca.M.278', 'Ca.A.168', 'Ca.A.278', 'Ca.P.168', 'Ca.P.278',
+        'Ga.M.168', 'Ga.A.168', 'Ga.A.278', 'Ga.P.168', 'Ga.P.278'
+    ],
+    'Nitrogeno': [
+        25.13, 25.87, 25.58, 26.53, 26.22,
+        25.35, 25.07, 26.12, 25.77, 26.85, 26.41,
+        25.34, 24.90, 26.19, 25.77, 26.57, 26.44,
+        25.28, 25.55, 26.51, 26.51, 26.28
+    ],
+    'Fosforo': [
+        14.35, 15.62, 15.11, 16.25, 16.08,
+        14.51, 14.23, 15.91, 15.60, 16.74, 16.21,
+        14.55, 14.98, 15.80, 15.33, 16.62, 16.14,
+        14.33, 15.20, 16.55, 16.55, 16.48
+    ],
+    'Potasio': [
+        16.53, 18.31, 17.77, 19.33, 18.64,
+        17.43, 16.40, 18.55, 17.92, 19.19, 19.11,
+        17.38, 18.44, 18.55, 17.90, 19.55, 19.09,
+        16.66, 17.79, 19.52, 18.74, 18.74
+    ],
+    'Calcio': [
+        13.05, 13.56, 13.53, 13.81, 13.70,
+        13.55, 13.75, 13.53, 13.60, 13.96, 13.96,
+        13.69, 12.81, 13.75, 13.67, 13.94, 13.91,
+        13.20, 13.45, 13.83, 13.78, 13.78
+    ],
+    'Magnesio': [
+        4.03, 4.30, 4.13, 4.45, 4.29,
+        4.10, 3.94, 4.28, 4.19, 4.66, 4.40,
+        4.09, 3.90, 4.17, 4.17, 4.54, 4.37,
+        4.07, 4.30, 4.50, 4.31, 4.31
+    ]
+}
+
+
+def huella_archivo(ruta):
+    """
+    Huella barata de un archivo: (ruta absoluta, mtime en ns, tamaño en bytes).
+    Sirve como clave de caché sin leer ni hashear el contenido.
+    """
+    ruta = os.path.abspath(ruta)
+    info = os.stat(ruta)
+    return (ruta, info.st_mtime_ns, info.st_size)
+
+
+def huella_fuente(variable_entorno):
+    """Huella de la tabla configurada en `variable_entorno`, o None si no hay ruta."""
+    ruta = os.environ.get(variable_entorno)
+    return huella_archivo(ruta) if ruta else None
+
+
+def leer_tabla(ruta, columnas):
+    """
+    Lee solo `columnas` de una tabla Parquet, Arrow/Feather o CSV.
+
+    Parquet y Arrow se abren con memory-map, de modo que las columnas que no se
+    piden nunca se cargan en memoria. Las columnas de texto se devuelven como
+    `Categorical` (un diccionario por columna en lugar de un objeto por fila).
+    """
+    ext = os.path.splitext(ruta)[1].lower()
+
+    if ext in _EXT_PARQUET:
+        tabla = pq.read_table(ruta, columns=columnas, memory_map=True)
+    elif ext in _EXT_ARROW:
+        with pa.memory_map(ruta, 'r') as fuente:
+            tabla = pa.ipc.open_file(fuente).read_all()
+        _validar_columnas(tabla.column_names, columnas, ruta)
+        tabla = tabla.select(columnas)
+    elif ext in _EXT_CSV:
+        try:
+            tabla = pacsv.read_csv(
+                ruta, convert_options=pacsv.ConvertOptions(include_columns=columnas)
+            )
+        except pa.ArrowKeyError:
+            # Falta alguna columna: mismo error que en los demás formatos
+            with pacsv.open_csv(ruta) as lector:
+                _validar_columnas(lector.schema.names, columnas, ruta)
+            raise
+    else:
+        raise ValueError(
+            f"Formato no soportado para '{ruta}'. "
+            f"Use Parquet ({', '.join(sorted(_EXT_PARQUET))}), "
+            f"Arrow ({', '.join(sorted(_EXT_ARROW))}) o CSV."
+        )
+
+    _validar_columnas(tabla.column_names, columnas, ruta)
+    return tabla.to_pandas(strings_to_categorical=True)
+
+
+def _validar_columnas(disponibles, requeridas, ruta):
+    faltantes = [c for c in requeridas if c not in disponibles]
+    if faltantes:
+        raise ValueError(f"'{ruta}' no contiene las columnas requeridas: {faltantes}")
+
+
+def cargar_tabla(huella, columnas, datos_embebidos):
+    """Carga la tabla identificada por `huella` o, si es None, los datos embebidos."""
+    if huella is None:
+        return pd.DataFrame(datos_embebidos)[columnas]
+    return leer_tabla(huella[0], columnas)
+
+
+# ── Decodificación de tratamientos ────────────────────────────────────────────
+def decodificar_tratamientos(df):
+    """
+    Decodifica la columna `Tratamiento` ('Va.B.RRR') en `Variedad` y
+    `Bioestimulante` (Categorical con niveles ordenados) y `Radiacion` (int16).
+
+    El parseo se hace una sola vez sobre los códigos distintos y se propaga a
+    las filas con los códigos enteros, de modo que el costo no depende del
+    número de filas sino del número de tratamientos. Los niveles de cada
+    factor quedan en `df.attrs['niveles']`.
+    """
+    trat = pd.Categorical(df['Tratamiento'])
+    if (trat.codes < 0).any():
+        raise ValueError("La columna 'Tratamiento' contiene valores vacíos.")
+
+    partes = pd.Series(trat.categories.astype(str)).str.extract(_PATRON_TRATAMIENTO)
+    invalidos = trat.categories[partes.isna().any(axis=1).to_numpy()]
+    if len(invalidos):
+        raise ValueError(
+            f"Códigos de tratamiento inválidos (se espera 'Va.B.RRR'): {list(invalidos[:10])}"
+        )
+
+    df = df.copy()
+    df['Tratamiento'] = trat
+    for col, factor in zip(partes.columns, ['Variedad', 'Bioestimulante']):
+        codigos, niveles = pd.factorize(partes[col], sort=True)
+        df[factor] = pd.Categorical.from_codes(codigos[trat.codes], categories=niveles)
+    df['Radiacion'] = partes[2].astype(np.int16).to_numpy()[trat.codes]
+
+    df.attrs['niveles'] = niveles_factores(df)
+    return df
+
+
+def niveles_factores(df):
+    """Niveles ordenados de cada factor experimental presente en `df`."""
+    return {
+        'Variedad': list(df['Variedad'].cat.categories),
+        'Bioestimulante': list(df['Bioestimulante'].cat.categories),
+        'Radiacion': sorted(int(r) for r in pd.unique(df['Radiacion'])),
+    }
+
+
+def armonizar_niveles(*tablas):
+    """
+    Iguala las categorías de Variedad y Bioestimulante entre tablas, para que
+    uniones y comparaciones sigan operando sobre códigos enteros.
+    """
+    tablas = [t.copy() for t in tablas]
+    for factor in ['Variedad', 'Bioestimulante']:
+        niveles = sorted(set().union(*(t[factor].cat.categories for t in tablas)))
+        for t in tablas:
+            t[factor] = t[factor].cat.set_categories(niveles)
+    return tablas
+
+
+# ── Unión clorofila × nutrientes ──────────────────────────────────────────────
+# Subir la versión invalida las uniones guardadas si cambia su construcción.
+VERSION_UNION = 1
+
+
+def _huella_embebida(datos):
+    return ('embebido', hashlib.sha1(repr(datos).encode()).hexdigest())
+
+
+def huella_union(huella_chl, huella_nut):
+    """Clave de la unión: huellas de ambas entradas (o de los datos embebidos)."""
+    partes = (
+        VERSION_UNION,
+        huella_chl or _huella_embebida(DATOS_CLOROFILA),
+        huella_nut or _huella_embebida(DATOS_NUTRIENTES),
+    )
+    return hashlib.sha1(repr(partes).encode()).hexdigest()
+
+
+def clave_tratamiento(df, niveles_rad):
+    """
+    Clave entera compuesta variedad × bioestimulante × radiación. Requiere
+    categorías armonizadas entre las tablas que se van a comparar.
+    """
+    n_bio = len(df['Bioestimulante'].cat.categories)
+    n_rad = len(niveles_rad)
+    cod_rad = np.searchsorted(niveles_rad, df['Radiacion'].to_numpy())
+    return (
+        df['Variedad'].cat.codes.to_numpy(np.int64) * (n_bio * n_rad)
+        + df['Bioestimulante'].cat.codes.to_numpy(np.int64) * n_rad
+        + cod_rad
+    )
+
+
+def unir_tablas(df, df_nut, huella=None):
+    """
+    Intersección de clorofila y nutrientes por tratamiento.
+
+    La unión se hace sobre la clave entera compuesta en lugar de las tres
+    columnas de texto. Si se da `huella` (ver `huella_union`), el resultado se
+    guarda en DIR_CACHE como Parquet y en los arranques siguientes se lee de
+    allí sin repetir la unión. En `df_full.attrs['sin_pareja']` quedan los
+    tratamientos de cada tabla que no encontraron pareja.
+    """
+    df, df_nut = armonizar_niveles(df, df_nut)
+    niveles_rad = np.union1d(df['Radiacion'].unique(), df_nut['Radiacion'].unique())
+    clave_chl = clave_tratamiento(df, niveles_rad)
+    clave_nut = clave_tratamiento(df_nut, niveles_rad)
+
+    ruta = os.path.join(DIR_CACHE, f'union_{huella}.parquet') if huella else None
+    if ruta and os.path.exists(ruta):
+        df_full = pd.read_parquet(ruta)
+    else:
+        izq = df.assign(_clave=clave_chl)
+        der = df_nut.drop(columns=FACTORES).assign(_clave=clave_nut)
+        df_full = (
+            izq.merge(der, on='_clave', how='inner', suffixes=('_chl', '_nut'))
+            .drop(columns='_clave')
+        )
+        for factor in ['Variedad', 'Bioestimulante']:
+            df_full[factor] = df_full[factor].cat.remove_unused_categories()
+        df_full = df_full[_orden_columnas(df, df_nut)]
+        if ruta:
+            _guardar_parquet(df_full, ruta)
+
+    df_full.attrs = {
+        'niveles': niveles_factores(df_full),
+        'sin_pareja': {
+            'clorofila': _tratamientos_sin_pareja(df, clave_chl, clave_nut),
+            'nutrientes': _tratamientos_sin_pareja(df_nut, clave_nut, clave_chl),
+        },
+    }
+    return df_full
+
+
+def _orden_columnas(df, df_nut):
+    # Mismo orden de columnas que pd.merge(df, df_nut, on=FACTORES)
+    sufijo = lambda c, s: c + s if c in df.columns and c in df_nut.columns and c not in FACTORES else c
+    return ([sufijo(c, '_chl') for c in df.columns]
+            + [sufijo(c, '_nut') for c in df_nut.columns if c not in FACTORES])
+
+
+def _tratamientos_sin_pareja(tabla, clave, clave_otra):
+    sin_pareja = ~np.isin(clave, np.unique(clave_otra))
+    factores = tabla.loc[sin_pareja, FACTORES].drop_duplicates()
+    return [f"{v}.{b}.{r}" for v, b, r in factores.itertuples(index=False)]
+
+
+def _guardar_parquet(df, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f'{ruta}.{os.getpid()}.tmp'
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, ruta)
+
+
+def _huella_tabla(nombre, huella, datos_embebidos):
+    partes = (VERSION_UNION, nombre, huella or _huella_embebida(datos_embebidos))
+    return hashlib.sha1(repr(partes).encode()).hexdigest()
+
+
+def cargar_fuentes(huella_chl, huella_nut):
+    """
+    Pipeline completo de carga: (df, df_nut, df_full) para las huellas dadas.
+
+    La huella de cada tabla queda en `attrs['huella']` y se deriva de las
+    huellas de las fuentes (la de df_full es la de la unión), sin hashear el
+    contenido de cada DataFrame en cada carga: mientras los archivos no cambien
+    (ruta, mtime, tamaño), tampoco cambian las huellas.
+    """
+    df = decodificar_tratamientos(cargar_tabla(huella_chl, COLUMNAS_CLOROFILA, DATOS_CLOROFILA))
+    df_nut = decodificar_tratamientos(cargar_tabla(huella_nut, COLUMNAS_NUTRIENTES, DATOS_NUTRIENTES))
+    clave = huella_union(huella_chl, huella_nut)
+    df_full = unir_tablas(df, df_nut, huella=clave)
+    df.attrs['huella'] = _huella_tabla('clorofila', huella_chl, DATOS_CLOROFILA)
+    df_nut.attrs['huella'] = _huella_tabla('nutrientes', huella_nut, DATOS_NUTRIENTES)
+    df_full.attrs['huella'] = clave
+    return df, df_nut, df_full
+
+
+def huella_df(df):
+    """Huella del contenido de un DataFrame (valores y columnas, sin el índice)."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode())
+    return h.hexdigest()
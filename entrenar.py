@@ -0,0 +1,84 @@
+"""
+Entrenamiento fuera de línea del Random Forest.
+
+    python entrenar.py [--clorofila RUTA] [--nutrientes RUTA] [--registro DIR]
+                       [--busqueda {grid,halving-grid,halving-random,smbo}] [--cpus N]
+                       [--incremental]
+
+Carga los datos igual que el dashboard, corre el pipeline completo de
+`modelo.entrenar_modelo_rf` y registra el resultado en el registro de modelos;
+el dashboard lo toma en su próximo arranque sin volver a entrenar. Con
+`--incremental`, si los datos solo agregan filas al último modelo registrado,
+se actualiza ese modelo (ver `modelo.actualizar_modelo_rf`).
+"""
+import argparse
+import os
+import time
+import warnings
+
+import registro
+from busqueda import MOTORES_BUSQUEDA
+from datos import ENV_CLOROFILA, ENV_NUTRIENTES, cargar_fuentes, huella_archivo
+from modelo import actualizar_modelo_rf, entrenar_modelo_rf
+from recursos import ENV_CPUS, PresupuestoCPU
+
+
+def entrenar_y_registrar(df_full, huella, motor='warm-start', directorio=registro.DIR_MODELOS,
+                         presupuesto=None, incremental=False):
+    """
+    Entrena con `modelo.entrenar_modelo_rf` (o, con `incremental`, actualiza
+    el último modelo registrado con `modelo.actualizar_modelo_rf`) y registra
+    el artefacto. Retorna el manifiesto (liviano, apto para devolverlo desde
+    otro proceso).
+    """
+    previo = registro.ultimo_manifiesto(None, directorio) if incremental else None
+    inicio = time.perf_counter()
+    if previo is None:
+        artefacto, extra = entrenar_modelo_rf(df_full, motor=motor, presupuesto=presupuesto), {}
+    else:
+        artefacto, info = actualizar_modelo_rf(df_full, registro.cargar(previo), motor=motor,
+                                               presupuesto=presupuesto)
+        extra = {'actualizacion': {**info, 'base': previo['nombre']}}
+    duracion = time.perf_counter() - inicio
+    return registro.guardar(artefacto, huella, directorio=directorio,
+                            segundos_entrenamiento=round(duracion, 2), **extra)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clorofila', default=os.environ.get(ENV_CLOROFILA),
+                        help=f'Tabla de clorofila (por defecto ${ENV_CLOROFILA} o datos embebidos)')
+    parser.add_argument('--nutrientes', default=os.environ.get(ENV_NUTRIENTES),
+                        help=f'Tabla de nutrientes (por defecto ${ENV_NUTRIENTES} o datos embebidos)')
+    parser.add_argument('--registro', default=registro.DIR_MODELOS,
+                        help='Directorio del registro de modelos')
+    parser.add_argument('--busqueda', choices=MOTORES_BUSQUEDA, default='warm-start',
+                        help='Motor de búsqueda de hiperparámetros (por defecto: warm-start)')
+    parser.add_argument('--cpus', type=int, default=None,
+                        help=f'CPUs del entrenamiento (por defecto ${ENV_CPUS} o todos los núcleos)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Actualizar el último modelo registrado si los datos solo agregan filas')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+
+    _, _, df_full = cargar_fuentes(
+        huella_archivo(args.clorofila) if args.clorofila else None,
+        huella_archivo(args.nutrientes) if args.nutrientes else None,
+    )
+    huella = df_full.attrs['huella']
+
+    manifiesto = entrenar_y_registrar(df_full, huella, motor=args.busqueda, directorio=args.registro,
+                                      presupuesto=PresupuestoCPU(args.cpus),
+                                      incremental=args.incremental)
+    metricas = manifiesto['metricas']
+    print(f"Modelo {manifiesto['nombre']} registrado en {manifiesto['ruta']} "
+          f"({manifiesto['segundos_entrenamiento']:.1f} s, n={manifiesto['n_obs']}, "
+          f"búsqueda={args.busqueda}, R² CV={metricas['r2_mean']:.3f}, "
+          f"best_params={metricas['best_params']})")
+    if 'actualizacion' in manifiesto:
+        print(f"Actualización: {manifiesto['actualizacion']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Explicaciones SHAP exactas del Random Forest (TreeSHAP dependiente del camino).
+
+TreeSHAP (Lundberg et al., 2020) reparte la predicción de cada árbol entre
+las variables de los caminos raíz → hoja. Para una hoja con variables
+distintas U en su camino, la variable i recibe
+
+    v · (o_i − z_i) · Σ_S  |S|! (|U|−|S|−1)! / |U|!  · Π_{j∈S} o_j · Π_{j∈U∖S∖{i}} z_j
+
+donde z_j es la fracción de cobertura (muestras de entrenamiento) que sigue
+el camino en los cortes por j y o_j vale 1 si la entrada los cumple todos.
+La suma sobre subconjuntos es la suma de los coeficientes del polinomio
+Π_{j≠i} (z_j + o_j·t) ponderada por grado. Como en EXTEND/UNWIND, el producto
+completo Π_j se arma una vez por hoja y cada Π_{j≠i} sale de dividirlo por
+(z_i + o_i·t): O(D²) por hoja (D = profundidad) para todas las variables.
+
+`ExplicadorSHAP` extrae una sola vez los caminos de todas las hojas de
+`BosquePlano` (variables fusionadas si se repiten en el camino, coberturas
+y pesos) y evalúa todas las hojas de todos los árboles para un lote de
+entradas con operaciones de NumPy, sin dependencias nuevas.
+
+Los valores cumplen la exactitud local: `base + φ.sum(axis=1)` es la
+predicción del bosque.
+"""
+from math import factorial
+
+import numpy as np
+import pandas as pd
+
+# Tope de elementos (muestras × hojas × profundidad²) de cada bloque
+MAX_ELEMENTOS_LOTE = 8_000_000
+
+
+class ExplicadorSHAP:
+    """Caminos de las hojas de un `BosquePlano`, listos para TreeSHAP en lote."""
+
+    def __init__(self, bosque):
+        self.n_arboles = bosque.n_arboles
+        self.n_features = bosque.n_features
+        D = max(1, bosque.profundidad)
+
+        # ── Caminos raíz → hoja, un nivel por iteración ─────────────────────
+        nodos = bosque.raices
+        feat = np.zeros((len(nodos), 0), dtype=np.intp)
+        umbral = np.zeros((len(nodos), 0))
+        izquierda = np.zeros((len(nodos), 0), dtype=bool)
+        z = np.zeros((len(nodos), 0))
+        hojas = []
+        for _ in range(D + 1):
+            hoja = bosque.es_hoja[nodos]
+            if hoja.any():
+                relleno = D - feat.shape[1]
+                hojas.append((nodos[hoja],
+                              np.pad(feat[hoja], ((0, 0), (0, relleno)), constant_values=-1),
+                              np.pad(umbral[hoja], ((0, 0), (0, relleno)), constant_values=np.inf),
+                              np.pad(izquierda[hoja], ((0, 0), (0, relleno)), constant_values=True),
+                              np.pad(z[hoja], ((0, 0), (0, relleno)), constant_values=1.0)))
+            internos = nodos[~hoja]
+            if len(internos) == 0:
+                break
+            hijos = np.concatenate([bosque.izq[internos], bosque.der[internos]])
+            feat = np.column_stack([np.tile(feat[~hoja], (2, 1)),
+                                    np.tile(bosque.feature[internos], 2)])
+            umbral = np.column_stack([np.tile(umbral[~hoja], (2, 1)),
+                                      np.tile(bosque.threshold[internos], 2)])
+            izquierda = np.column_stack([np.tile(izquierda[~hoja], (2, 1)),
+                                         np.repeat([True, False], len(internos))])
+            z = np.column_stack([np.tile(z[~hoja], (2, 1)),
+                                 bosque.cobertura[hijos] / np.tile(bosque.cobertura[internos], 2)])
+            nodos = hijos
+
+        nodo_hoja, feat, umbral, izquierda, z = (np.concatenate(c) for c in zip(*hojas))
+        self.valor = bosque.valor[nodo_hoja]
+        self.feat_arista = np.where(feat < 0, 0, feat)
+        self.umbral = umbral
+        self.izquierda = izquierda
+        valida = feat >= 0
+
+        # ── Variables repetidas en un camino → un solo "slot" por variable ──
+        igual = (feat[:, :, None] == feat[:, None, :]) & valida[:, :, None] & valida[:, None, :]
+        primera = np.argmax(igual, axis=2)                    # primera arista con esa variable
+        es_primera = (primera == np.arange(D)) & valida
+        slot_primera = np.cumsum(es_primera, axis=1) - 1
+        slot = np.take_along_axis(slot_primera, primera, axis=1)
+        self.asignacion = (slot[:, :, None] == np.arange(D)) & valida[:, :, None]   # hoja × arista × slot
+        self.z_slot = np.where(self.asignacion, z[:, :, None], 1.0).prod(axis=1)
+        self.slot_valido = self.asignacion.any(axis=1)
+        feat_slot = np.zeros((len(feat), D), dtype=np.intp)
+        filas, aristas = np.nonzero(es_primera)
+        feat_slot[filas, slot[filas, aristas]] = feat[filas, aristas]
+        self.feat_slot = feat_slot
+
+        # Pesos de Shapley k!(d−k−1)!/d! por hoja (d = variables distintas del camino)
+        d = self.slot_valido.sum(axis=1)
+        self.pesos = np.zeros((len(d), D))
+        for k in range(D):
+            for dd in range(k + 1, D + 1):
+                self.pesos[d == dd, k] = factorial(k) * factorial(dd - k - 1) / factorial(dd)
+
+        # Valor esperado: media de las hojas ponderada por cobertura
+        self.base = float((self.valor * np.where(valida, z, 1.0).prod(axis=1)).sum() / self.n_arboles)
+
+    def _bloque(self, X):
+        # sklearn compara en float32, igual que BosquePlano.hojas
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        D = self.z_slot.shape[1]
+        cumple = (X[:, self.feat_arista] <= self.umbral) == self.izquierda            # n × hoja × arista
+        falla = (~cumple)[:, :, :, None] & self.asignacion
+        o = ~falla.any(axis=2) & self.slot_valido                                    # n × hoja × slot
+        o = o.astype(float)
+        z = np.broadcast_to(self.z_slot, o.shape)
+
+        # Producto completo Π_j (z_j + o_j·t), grado ≤ D (los slots vacíos aportan 1)
+        producto = np.zeros(o.shape[:2] + (D + 1,))
+        producto[..., 0] = 1.0
+        for j in range(D):
+            zj, oj = z[..., j:j + 1], o[..., j:j + 1]
+            producto[..., 1:] = producto[..., 1:] * zj + producto[..., :-1] * oj
+            producto[..., 0] *= zj[..., 0]
+
+        # UNWIND: Π_{j≠i} = producto / (z_i + o_i·t) para todos los i a la vez.
+        # Con o_i = 1, división sintética desde el coeficiente mayor (|z_i| ≤ 1,
+        # no amplifica errores); con o_i = 0 basta dividir por z_i
+        coef = np.empty(o.shape + (D,))                                              # n × hoja × i × grado
+        coef[..., D - 1] = producto[..., None, D]
+        for k in range(D - 2, -1, -1):
+            coef[..., k] = producto[..., None, k + 1] - z * coef[..., k + 1]
+        coef = np.where(o[..., None] > 0, coef, producto[..., None, :D] / z[..., None])
+        contribucion = (o - z) * (coef * self.pesos[:, None, :]).sum(axis=3)
+        contribucion *= (self.valor[:, None] * self.slot_valido)[None] / self.n_arboles
+
+        phi = np.zeros((len(X), self.n_features))
+        np.add.at(phi.T, self.feat_slot.ravel(), contribucion.reshape(len(X), -1).T)
+        return phi
+
+    def valores(self, X):
+        """Valores SHAP (n_muestras × n_features); `base + suma` = predicción."""
+        X = np.atleast_2d(X)
+        por_bloque = max(1, MAX_ELEMENTOS_LOTE // (len(self.valor) * self.z_slot.shape[1] ** 2))
+        return np.vstack([self._bloque(X[i:i + por_bloque]) for i in range(0, len(X), por_bloque)])
+
+
+def resumen_global(explicador, X, feature_names):
+    """
+    Valores SHAP de todas las filas de X y su resumen por variable:
+    (DataFrame largo Feature/Fila/SHAP/Valor, DataFrame con |SHAP| medio).
+    """
+    phi = explicador.valores(X)
+    largo = pd.DataFrame({
+        'Feature': np.tile(feature_names, len(X)),
+        'Fila': np.repeat(np.arange(len(X)), len(feature_names)),
+        'SHAP': phi.ravel(),
+        'Valor': np.asarray(X, dtype=float).ravel(),
+    })
+    resumen = pd.DataFrame({
+        'Feature': feature_names,
+        'SHAP_abs_medio': np.abs(phi).mean(axis=0),
+        'SHAP_medio': phi.mean(axis=0),
+    }).sort_values('SHAP_abs_medio', ascending=False).reset_index(drop=True)
+    return largo, resumen
@@ -0,0 +1,226 @@
+"""
+Grafo de dependencias de los artefactos derivados.
+
+Los objetos derivados del dashboard dependen unos de otros (datos → supuestos
+→ tablas de Shapiro/Levene → KPIs; datos → modelo → importancia, curva,
+barrido) y antes se recalculaban implícitamente en el orden del script, cada
+uno con su propia caché.
+
+`GrafoCalculo` declara cada artefacto como un nodo con nombre, sus
+dependencias y sus parámetros:
+
+- Caché por contenido: la clave de un nodo es un hash de su nombre, versión,
+  parámetros y las claves de sus dependencias; la de una fuente (los datos) es
+  su huella (`attrs['huella']` o `datos.huella_df`). Si cambia una entrada,
+  cambian solo las claves de los nodos aguas abajo y solo esos se recalculan;
+  el resto sigue saliendo de la caché.
+- Un nodo que devuelve None (p. ej. el modelo mientras se entrena) queda
+  pendiente: no se guarda, y los nodos que dependen de él también dan None.
+- Una fuente puede declararse con `obtener(entradas)`: si no se pasa, se
+  lee en cada llamada (p. ej. la versión vigente del registro de modelos), y
+  un cambio invalida los nodos aguas abajo como cualquier otra entrada.
+- Cálculos en curso: dos hilos (sesiones) que piden la misma clave fría no
+  la calculan dos veces; el segundo espera al primero y toma su valor.
+- `invalidar(nombre)` descarta un nodo y todo lo que depende de él.
+- `tiempos()` reporta por nodo cálculos, aciertos y segundos.
+
+Los valores se comparten entre llamadas (y sesiones): no deben modificarse en
+el lugar.
+"""
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from datos import huella_df
+
+
+class Nodo:
+    """Artefacto derivado: `funcion(*valores_dependencias, **parametros)`."""
+
+    def __init__(self, nombre, funcion, dependencias=(), parametros=(), version=1):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.dependencias = tuple(dependencias)
+        self.parametros = tuple(parametros)
+        self.version = version
+        firma = inspect.signature(funcion).parameters
+        self.por_defecto = {p: firma[p].default for p in self.parametros
+                            if p in firma and firma[p].default is not inspect.Parameter.empty}
+
+    def argumentos(self, parametros):
+        """Parámetros que recibe el nodo, con sus valores por defecto."""
+        return {**self.por_defecto, **{p: parametros[p] for p in self.parametros if p in parametros}}
+
+    def __repr__(self):
+        return f"Nodo({self.nombre!r}, dependencias={self.dependencias})"
+
+
+def huella_valor(valor):
+    """Huella del contenido de una entrada del grafo."""
+    if isinstance(valor, pd.DataFrame):
+        return valor.attrs.get('huella') or huella_df(valor)
+    return hashlib.sha1(repr(valor).encode()).hexdigest()
+
+
+class GrafoCalculo:
+    """
+    Nodos con caché por contenido (LRU de `max_entradas` valores), seguro entre
+    hilos. Las fuentes se pasan en cada llamada por nombre:
+    `grafo.valor('kpis', df=df, df_full=df_full)`.
+    """
+
+    def __init__(self, max_entradas=64):
+        self.max_entradas = max_entradas
+        self._fuentes = set()
+        self._obtener = {}                      # fuente -> obtener(entradas)
+        self._nodos = {}
+        self._valores = OrderedDict()           # (nombre, clave) -> valor
+        self._tiempos = {}
+        self._en_curso = {}                     # (nombre, clave) -> lock del cálculo
+        self._lock = threading.Lock()
+
+    # ── Declaración ──────────────────────────────────────────────────────────
+
+    def fuente(self, nombre, obtener=None):
+        """
+        Entrada del grafo: su valor se pasa en cada llamada o, si no se pasa y
+        hay `obtener`, es `obtener(entradas)` (una vez por llamada a `valor`).
+        """
+        self._fuentes.add(nombre)
+        if obtener is not None:
+            self._obtener[nombre] = obtener
+
+    def nodo(self, dependencias=(), parametros=(), nombre=None, version=1):
+        """
+        Decorador que registra la función como nodo (por defecto con su nombre).
+        Subir `version` invalida los valores guardados si cambia el cálculo.
+        """
+        def registrar(funcion):
+            n = nombre or funcion.__name__
+            desconocidas = [d for d in dependencias if d not in self._nodos and d not in self._fuentes]
+            if desconocidas:
+                raise ValueError(f"{n}: dependencias no declaradas {desconocidas}")
+            self._nodos[n] = Nodo(n, funcion, dependencias, parametros, version)
+            self._tiempos[n] = {'calculos': 0, 'aciertos': 0, 'pendientes': 0,
+                                'ultimo_s': float('nan'), 'total_s': 0.0}
+            return funcion
+        return registrar
+
+    def dependientes(self, nombre):
+        """Nodos aguas abajo de `nombre` (sin incluirlo)."""
+        abajo, frontera = set(), {nombre}
+        while frontera:
+            frontera = {n for n, nodo in self._nodos.items()
+                        if set(nodo.dependencias) & frontera and n not in abajo}
+            abajo |= frontera
+        return abajo
+
+    # ── Evaluación ───────────────────────────────────────────────────────────
+
+    def clave(self, nombre, entradas, **parametros):
+        """Clave de contenido del nodo para estas entradas y parámetros."""
+        if nombre in self._fuentes:
+            return huella_valor(self._entrada(nombre, entradas))
+        nodo = self._nodos[nombre]
+        h = hashlib.sha1(repr((nombre, nodo.version)).encode())
+        h.update(repr(sorted(nodo.argumentos(parametros).items())).encode())
+        for d in nodo.dependencias:
+            h.update(self.clave(d, entradas, **parametros).encode())
+        return h.hexdigest()
+
+    def valor(self, nombre, **entradas_y_parametros):
+        """
+        Valor del nodo `nombre`. Los argumentos con nombre de una fuente son
+        entradas; el resto, parámetros (cada nodo recibe los que declara).
+        """
+        entradas = {k: v for k, v in entradas_y_parametros.items() if k in self._fuentes}
+        parametros = {k: v for k, v in entradas_y_parametros.items() if k not in self._fuentes}
+        return self._evaluar(nombre, entradas, parametros)
+
+    def _entrada(self, nombre, entradas):
+        if nombre not in entradas:
+            if nombre not in self._obtener:
+                raise KeyError(f"falta la entrada {nombre!r}")
+            entradas[nombre] = self._obtener[nombre](entradas)
+        return entradas[nombre]
+
+    def _guardado(self, clave, tiempos):
+        # Con el lock tomado: (True, valor) si la clave está en caché
+        if clave in self._valores:
+            self._valores.move_to_end(clave)
+            tiempos['aciertos'] += 1
+            return True, self._valores[clave]
+        return False, None
+
+    def _evaluar(self, nombre, entradas, parametros):
+        if nombre in self._fuentes:
+            return self._entrada(nombre, entradas)
+        nodo = self._nodos[nombre]
+        clave = (nombre, self.clave(nombre, entradas, **parametros))
+        tiempos = self._tiempos[nombre]
+        with self._lock:
+            hay, valor = self._guardado(clave, tiempos)
+            if hay:
+                return valor
+            en_curso = self._en_curso.setdefault(clave, threading.Lock())
+
+        # Un solo cálculo por clave: quien llega después espera y toma el valor
+        with en_curso:
+            try:
+                with self._lock:
+                    hay, valor = self._guardado(clave, tiempos)
+                if hay:
+                    return valor
+                return self._calcular(nodo, clave, entradas, parametros, tiempos)
+            finally:
+                with self._lock:
+                    if self._en_curso.get(clave) is en_curso:
+                        del self._en_curso[clave]
+
+    def _calcular(self, nodo, clave, entradas, parametros, tiempos):
+        valores = [self._evaluar(d, entradas, parametros) for d in nodo.dependencias]
+        if any(v is None for v in valores):
+            with self._lock:
+                tiempos['pendientes'] += 1
+            return None
+        inicio = time.perf_counter()
+        valor = nodo.funcion(*valores, **nodo.argumentos(parametros))
+        segundos = time.perf_counter() - inicio
+
+        with self._lock:
+            if valor is None:
+                tiempos['pendientes'] += 1
+                return None
+            tiempos['calculos'] += 1
+            tiempos['ultimo_s'] = segundos
+            tiempos['total_s'] += segundos
+            self._valores[clave] = valor
+            while len(self._valores) > self.max_entradas:
+                self._valores.popitem(last=False)
+        return valor
+
+    # ── Invalidación y diagnóstico ───────────────────────────────────────────
+
+    def invalidar(self, nombre):
+        """Descarta los valores guardados de `nombre` y de todo lo que depende de él."""
+        nombres = self.dependientes(nombre) | {nombre}
+        with self._lock:
+            for clave in [c for c in self._valores if c[0] in nombres]:
+                del self._valores[clave]
+
+    def tiempos(self):
+        """DataFrame por nodo: dependencias, cálculos, aciertos, pendientes y segundos."""
+        with self._lock:
+            filas = {n: {'dependencias': ', '.join(self._nodos[n].dependencias), **t}
+                     for n, t in self._tiempos.items()}
+        return pd.DataFrame.from_dict(filas, orient='index')
+
+    def info(self):
+        """Nodos y valores en caché, al estilo de `ServicioANOVA.info`."""
+        with self._lock:
+            return {'nodos': len(self._nodos), 'fuentes': len(self._fuentes),
+                    'valores': len(self._valores)}
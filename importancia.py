@@ -0,0 +1,145 @@
+"""
+Importancia por permutación en un solo lote.
+
+`sklearn.inspection.permutation_importance` llama a `predict` una vez por
+variable y repetición (10 × 30 = 300 llamadas, repartidas con joblib), cada
+una con su validación y su paso por los 300 árboles. Aquí:
+
+- Las copias permutadas de X (grupos × repeticiones) se apilan en un lote y
+  se predicen con una sola pasada vectorizada de `BosquePlano`, por bloques
+  acotados de memoria.
+- La predicción y el puntaje de referencia (R², el `score` del bosque) se
+  calculan una sola vez y se comparten; las caídas de puntaje salen de
+  NumPy sobre el lote completo.
+- Las permutaciones son las mismas que sortea `permutation_importance` con
+  `random_state` (una sucesión de barajados compartida por todas las
+  variables), así que la importancia individual coincide con la de sklearn.
+
+Opciones:
+
+- `grupos`: variables que se permutan juntas con la misma permutación de
+  filas (p. ej. el bloque colineal de nutrientes N/P/K/Ca/Mg); cada grupo da
+  una sola fila de importancia.
+- `condicionar`: permutación condicional (Strobl et al., 2008): cada variable
+  se baraja solo dentro de los estratos que definen las columnas indicadas
+  (las continuas, agrupadas en `n_bins` cuantiles), así la importancia no
+  premia romper la correlación con esas columnas.
+
+El resultado conserva el esquema de `modelo.calcular_importancia`:
+Feature, Importancia_media, Importancia_std.
+"""
+import numpy as np
+import pandas as pd
+
+# Nutrientes foliares (columnas de `modelo.preparar_features`), muy
+# correlacionados entre sí
+GRUPO_NUTRIENTES = ('Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio')
+
+# Tope de elementos (filas × árboles) de cada pasada por el bosque
+MAX_ELEMENTOS_LOTE = 4_000_000
+
+
+def permutaciones_sklearn(n, n_repeticiones, semilla):
+    """
+    Índices (n_repeticiones × n) que usa `permutation_importance` con
+    `random_state=semilla`: cada repetición vuelve a barajar los índices y
+    los aplica sobre la columna ya permutada en la anterior.
+    """
+    rng = np.random.RandomState(np.random.RandomState(semilla).randint(np.iinfo(np.int32).max + 1))
+    barajado = np.arange(n)
+    acumulado = np.arange(n)
+    permutaciones = np.empty((n_repeticiones, n), dtype=np.intp)
+    for r in range(n_repeticiones):
+        rng.shuffle(barajado)
+        acumulado = acumulado[barajado]
+        permutaciones[r] = acumulado
+    return permutaciones
+
+
+def estratos(X, columnas, n_bins=3):
+    """Código del estrato de cada fila según `columnas` (continuas en cuantiles)."""
+    codigos = np.zeros(len(X), dtype=np.int64)
+    for c in columnas:
+        valores = X[:, c]
+        niveles = np.unique(valores)
+        if len(niveles) > n_bins:
+            cortes = np.quantile(valores, np.linspace(0, 1, n_bins + 1)[1:-1])
+            codigo = np.searchsorted(cortes, valores, side='right')
+        else:
+            codigo = np.searchsorted(niveles, valores)
+        codigos = codigos * (n_bins + len(niveles)) + codigo
+    return np.unique(codigos, return_inverse=True)[1]
+
+
+def permutaciones_condicionales(estrato, n_repeticiones, semilla):
+    """Índices (n_repeticiones × n) que solo intercambian filas del mismo estrato."""
+    rng = np.random.default_rng(semilla)
+    orden = np.argsort(estrato, kind='stable')
+    # Ordenar por (estrato, número aleatorio) baraja dentro de cada estrato
+    permutaciones = np.empty((n_repeticiones, len(estrato)), dtype=np.intp)
+    for r in range(n_repeticiones):
+        barajado = np.lexsort((rng.random(len(estrato)), estrato))
+        permutaciones[r, orden] = barajado
+    return permutaciones
+
+
+def _r2(y, pred):
+    # R² de cada fila de `pred` (… × n) contra y
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    return 1 - ((pred - y) ** 2).sum(axis=-1) / ss_tot
+
+
+def importancia_permutacion(bosque, X, y, feature_names, n_repeticiones=30, semilla=42,
+                            grupos=None, condicionar=None, n_bins=3):
+    """
+    Importancia por permutación de `bosque` (BosquePlano) sobre (X, y).
+
+    `grupos` ({nombre: [índices de columna]}) permuta esas columnas juntas y
+    reemplaza sus filas individuales por una del grupo. `condicionar`
+    (índices de columna) baraja cada variable solo dentro de los estratos de
+    esas columnas (sin contarse a sí misma). Retorna el DataFrame ordenado de
+    mayor a menor importancia.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, p = X.shape
+
+    # Conjuntos de columnas que se permutan a la vez
+    agrupadas = {c for cols in (grupos or {}).values() for c in cols}
+    conjuntos = [(feature_names[j], [j]) for j in range(p) if j not in agrupadas]
+    conjuntos += [(nombre, list(cols)) for nombre, cols in (grupos or {}).items()]
+
+    if condicionar is None:
+        comunes = permutaciones_sklearn(n, n_repeticiones, semilla)
+        permutaciones = [comunes] * len(conjuntos)
+    else:
+        permutaciones = [
+            permutaciones_condicionales(
+                estratos(X, [c for c in condicionar if c not in cols], n_bins),
+                n_repeticiones, semilla + k)
+            for k, (_, cols) in enumerate(conjuntos)
+        ]
+
+    referencia = _r2(y, bosque.predecir(X))
+
+    # Lote (conjunto, repetición) → copias de X; se predicen por bloques de
+    # `por_bloque` copias para acotar la memoria del recorrido del bosque
+    tareas = [(k, r) for k in range(len(conjuntos)) for r in range(n_repeticiones)]
+    por_bloque = max(1, MAX_ELEMENTOS_LOTE // (n * bosque.n_arboles))
+    puntajes = np.empty((len(conjuntos), n_repeticiones))
+    for inicio in range(0, len(tareas), por_bloque):
+        bloque = tareas[inicio:inicio + por_bloque]
+        lote = np.broadcast_to(X, (len(bloque), n, p)).copy()
+        for i, (k, r) in enumerate(bloque):
+            cols = conjuntos[k][1]
+            lote[i][:, cols] = X[permutaciones[k][r]][:, cols]
+        pred = bosque.predecir(lote.reshape(-1, p)).reshape(len(bloque), n)
+        k_idx, r_idx = np.array(bloque).T
+        puntajes[k_idx, r_idx] = _r2(y, pred)
+
+    caidas = referencia - puntajes
+    return pd.DataFrame({
+        'Feature': [nombre for nombre, _ in conjuntos],
+        'Importancia_media': caidas.mean(axis=1),
+        'Importancia_std':   caidas.std(axis=1),
+    }).sort_values('Importancia_media', ascending=False).reset_index(drop=True)
@@ -0,0 +1,371 @@
+"""
+Pipeline de entrenamiento del Random Forest, independiente de Streamlit.
+
+El dashboard no entrena en su proceso salvo que el registro de modelos no
+tenga un artefacto compatible (ver `registro.py` y `entrenar.py`). Cuando los
+datos solo agregan filas, `actualizar_modelo_rf` parte del último modelo
+registrado en lugar de repetir la búsqueda.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import (
+    cross_val_predict, cross_validate, KFold, learning_curve, ParameterGrid
+)
+from sklearn.preprocessing import LabelEncoder
+from sklearn.inspection import permutation_importance
+
+from bosque import BosquePlano
+from busqueda import crear_busqueda
+from importancia import importancia_permutacion
+from recursos import PresupuestoCPU
+
+# Orden de los objetos que devuelve `entrenar_modelo_rf` (y guarda el registro)
+CAMPOS_ARTEFACTO = ('best_model', 'X', 'y', 'y_pred_train', 'y_pred_oof',
+                    'metricas', 'imp_df', 'lc_df', 'meta')
+
+# Espacio de búsqueda reducido para ~22 obs — evitar sobreajuste
+PARAM_GRID = {
+    'n_estimators':  [100, 200, 300],
+    'max_depth':     [2, 3, 4],      # profundidad baja = regularización
+    'min_samples_leaf': [2, 3],      # hoja mínima = 2 obs → no sobre-ajusta
+    'max_features':  ['sqrt', 0.7],
+}
+
+# Métricas de CV reportadas en el tab 6 (nombre → scorer de sklearn)
+METRICAS_CV = {
+    'r2':  'r2',
+    'mse': 'neg_mean_squared_error',
+    'mae': 'neg_mean_absolute_error',
+}
+
+
+def _folds_busqueda(busqueda):
+    """
+    Puntajes por fold del mejor candidato tal como los registró la búsqueda,
+    o None si no evaluó todas las METRICAS_CV.
+    """
+    if busqueda is None:
+        return None
+    res, i = busqueda.cv_results_, busqueda.best_index_
+    n_splits = busqueda.n_splits_
+    folds = {}
+    for nombre in METRICAS_CV:
+        claves = [f'split{k}_test_{nombre}' for k in range(n_splits)]
+        if any(c not in res for c in claves):
+            return None
+        folds[nombre] = np.array([res[c][i] for c in claves])
+    return _sin_signo(folds)
+
+
+def _sin_signo(folds):
+    # Los scorers de error son negativos (mayor = mejor); se reportan positivos
+    return {n: (v if METRICAS_CV[n] == 'r2' else -v) for n, v in folds.items()}
+
+
+def evaluar_cv(estimador, X, y, cv, busqueda=None, n_jobs=-1):
+    """
+    Métricas por fold (r2, mse, mae) y predicciones out-of-fold de `estimador`.
+
+    Si `busqueda` ya evaluó las tres métricas, se reutilizan sus cv_results_ y
+    sus predicciones OOF (`predicciones_oof_`, ver busqueda.BusquedaWarmStart)
+    o, si no las guardó, basta una pasada de `cross_val_predict`; si no, una
+    única pasada multi-métrica de `cross_validate` entrega ambas cosas.
+    `n_jobs` es el paralelismo entre folds.
+    """
+    folds = _folds_busqueda(busqueda)
+    if folds is not None:
+        oof = getattr(busqueda, 'predicciones_oof_', None)
+        if oof is None:
+            oof = cross_val_predict(estimador, X, y, cv=cv, n_jobs=n_jobs)
+        return folds, oof
+
+    res = cross_validate(estimador, X, y, cv=cv, scoring=METRICAS_CV, n_jobs=n_jobs,
+                         return_estimator=True, return_indices=True)
+    y_oof = np.empty(len(y), dtype=float)
+    for est, idx in zip(res['estimator'], res['indices']['test']):
+        y_oof[idx] = est.predict(X[idx])
+    return _sin_signo({n: res[f'test_{n}'] for n in METRICAS_CV}), y_oof
+
+
+def predicciones_oob(modelo, X, bosque=None):
+    """
+    Predicciones out-of-bag del bosque ajustado sobre X: para cada fila, la
+    media de los árboles cuya muestra bootstrap no la incluyó (lo mismo que
+    `oob_prediction_` con `oob_score=True`), sin reajustar. `bosque` es el
+    BosquePlano del modelo, si ya existe. NaN en las filas que ningún árbol
+    dejó afuera.
+    """
+    if not modelo.bootstrap:
+        raise ValueError("Sin bootstrap no hay muestras out-of-bag")
+    bosque = bosque or BosquePlano(modelo)
+    fuera = np.ones((len(X), bosque.n_arboles), dtype=bool)
+    for t, muestras in enumerate(modelo.estimators_samples_):
+        fuera[muestras, t] = False
+    n = fuera.sum(axis=1)
+    suma = np.where(fuera, bosque.predecir_arboles(X), 0.0).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n > 0, suma / n, np.nan)
+
+
+def preparar_features(df_full):
+    """
+    Matriz de diseño del modelo: factores codificados ordinalmente, radiación
+    normalizada y variables fisiológicas/nutricionales.
+    Retorna: X, y, nombres de columnas, nombres legibles y codificadores.
+    """
+    X_raw = df_full[['Variedad', 'Bioestimulante', 'Radiacion',
+                      'Clorofila_a', 'Clorofila_b',
+                      'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']].copy()
+    y = df_full['Clorofila_total'].values
+
+    # Codificación ordinal de categóricas (suficiente para árboles)
+    le_var  = LabelEncoder()
+    le_bio  = LabelEncoder()
+    X_raw['Variedad_enc']       = le_var.fit_transform(X_raw['Variedad'])
+    X_raw['Bioestimulante_enc'] = le_bio.fit_transform(X_raw['Bioestimulante'])
+    X_raw['Radiacion_norm']     = X_raw['Radiacion'] / 440.0
+
+    feature_cols = ['Variedad_enc', 'Bioestimulante_enc', 'Radiacion_norm',
+                    'Clorofila_a', 'Clorofila_b',
+                    'Nitrogeno', 'Fosforo', 'Potasio', 'Calcio', 'Magnesio']
+    feature_names = ['Variedad', 'Bioestimulante', 'Radiación (norm)',
+                     'Clorofila a', 'Clorofila b',
+                     'Nitrógeno', 'Fósforo', 'Potasio', 'Calcio', 'Magnesio']
+    X = X_raw[feature_cols].values
+
+    return X, y, feature_cols, feature_names, le_var, le_bio
+
+
+def _validacion():
+    return KFold(n_splits=5, shuffle=True, random_state=42)
+
+
+def calcular_importancia(modelo, X, y, feature_names, presupuesto=None, motor='lote', **opciones):
+    """
+    Importancia por permutación (30 repeticiones) de cada variable, ordenada.
+    motor='lote' predice todas las copias permutadas en una pasada de
+    `BosquePlano` y admite `grupos` y `condicionar` (ver importancia.py);
+    motor='sklearn' usa `permutation_importance`.
+    """
+    presupuesto = presupuesto or PresupuestoCPU()
+    if motor == 'lote':
+        with presupuesto.etapa('importancia'):
+            return importancia_permutacion(BosquePlano(modelo), X, y, feature_names,
+                                           n_repeticiones=30, semilla=42, **opciones)
+    if motor != 'sklearn':
+        raise ValueError(f"Motor de importancia desconocido: {motor!r}. Opciones: ('lote', 'sklearn')")
+
+    externos, internos = presupuesto.reparto('importancia', X.shape[1])
+    with presupuesto.etapa('importancia'):
+        perm_imp = permutation_importance(
+            modelo.set_params(n_jobs=internos), X, y, n_repeats=30, random_state=42,
+            n_jobs=externos
+        )
+    modelo.set_params(n_jobs=-1)
+    return pd.DataFrame({
+        'Feature': feature_names,
+        'Importancia_media': perm_imp.importances_mean,
+        'Importancia_std':   perm_imp.importances_std
+    }).sort_values('Importancia_media', ascending=False).reset_index(drop=True)
+
+
+def calcular_curva(modelo, X, y, presupuesto=None):
+    """Curva de aprendizaje (R² de entrenamiento y de CV por tamaño de muestra)."""
+    presupuesto = presupuesto or PresupuestoCPU()
+    kf = _validacion()
+    tamanos = np.linspace(0.4, 1.0, 6)
+    externos, internos = presupuesto.reparto('curva', len(tamanos) * kf.get_n_splits())
+    with presupuesto.etapa('curva'):
+        train_sizes, train_scores, val_scores = learning_curve(
+            modelo.set_params(n_jobs=internos), X, y, cv=kf, n_jobs=externos,
+            train_sizes=tamanos,
+            scoring='r2'
+        )
+    modelo.set_params(n_jobs=-1)
+    return pd.DataFrame({
+        'train_size':   train_sizes,
+        'train_mean':   train_scores.mean(axis=1),
+        'train_std':    train_scores.std(axis=1),
+        'val_mean':     val_scores.mean(axis=1),
+        'val_std':      val_scores.std(axis=1),
+    })
+
+
+def _metricas(folds, best_params, motor):
+    return {
+        'r2_mean':  folds['r2'].mean(),
+        'r2_std':   folds['r2'].std(),
+        'mse_mean': folds['mse'].mean(),
+        'mae_mean': folds['mae'].mean(),
+        'best_params': best_params,
+        'motor': motor,
+    }
+
+
+def entrenar_modelo_rf(df_full, motor='warm-start', presupuesto=None):
+    """
+    Pipeline ML completo:
+    1. Feature engineering con codificación ordinal/one-hot.
+    2. Búsqueda de hiperparámetros (5-fold) con el `motor` elegido
+       (ver busqueda.MOTORES_BUSQUEDA; por defecto la rejilla exhaustiva con
+       bosques que crecen con warm start, equivalente a GridSearchCV).
+    3. Métricas CV del modelo óptimo (reutilizando la búsqueda) y predicciones OOF.
+    Cada etapa reparte las CPUs de `presupuesto` (recursos.PresupuestoCPU;
+    por defecto $DASHBOARD_CPUS o todos los núcleos) entre sus tareas y los
+    árboles de cada bosque, sin paralelismo anidado.
+    Retorna: modelo final, X, y, predicciones train y OOF, métricas,
+    importancias, curva de aprendizaje y codificadores.
+    """
+    presupuesto = presupuesto or PresupuestoCPU()
+    X, y, feature_cols, feature_names, le_var, le_bio = preparar_features(df_full)
+
+    # ── Búsqueda de hiperparámetros con KFold ─────────────────────────────────
+    param_grid = PARAM_GRID
+
+    kf = _validacion()
+    n_folds = kf.get_n_splits()
+    candidatos = 1 if motor == 'smbo' else len(ParameterGrid(param_grid))   # smbo: un candidato a la vez
+    externos, internos = presupuesto.reparto('busqueda', candidatos * n_folds)
+    rf_base = RandomForestRegressor(random_state=42, n_jobs=internos)
+
+    # Se registran las tres métricas en cada fold (si el motor lo permite);
+    # la selección usa el MSE
+    with presupuesto.etapa('busqueda'):
+        grid_search = crear_busqueda(
+            motor, rf_base, param_grid, cv=kf,
+            scoring=METRICAS_CV, refit='mse', n_muestras=len(y), n_jobs=externos
+        )
+        grid_search.fit(X, y)
+    best_model = grid_search.best_estimator_     # ya reajustado sobre X, y
+
+    # ── Métricas no sesgadas con CV en modelo óptimo ──────────────────────────
+    externos, internos = presupuesto.reparto('cv', n_folds)
+    with presupuesto.etapa('cv'):
+        folds, y_pred_oof = evaluar_cv(best_model.set_params(n_jobs=internos), X, y, kf,
+                                       busqueda=grid_search, n_jobs=externos)
+
+    # ── Predicciones train (para comparar observed vs fitted) ─────────────────
+    y_pred_train = best_model.predict(X)
+
+    # ── Importancia de variables por permutación (más robusta que Gini) ───────
+    imp_df = calcular_importancia(best_model, X, y, feature_names, presupuesto)
+
+    # ── Curva de aprendizaje ───────────────────────────────────────────────────
+    lc_df = calcular_curva(best_model, X, y, presupuesto)   # deja n_jobs=-1, como antes
+
+    metricas = _metricas(folds, grid_search.best_params_, motor)
+
+    meta = {
+        'le_var': le_var,
+        'le_bio': le_bio,
+        'feature_cols': feature_cols,
+    }
+
+    return best_model, X, y, y_pred_train, y_pred_oof, metricas, imp_df, lc_df, meta
+
+
+# ── Reentrenamiento incremental ───────────────────────────────────────────────
+
+# Deriva tolerada: MSE del modelo anterior sobre las filas nuevas (que nunca
+# vio) dividido por su MSE de CV. Por encima, se repite la búsqueda completa.
+UMBRAL_DERIVA = 2.0
+
+
+def _huellas_filas(X, y):
+    return pd.util.hash_pandas_object(pd.DataFrame(np.column_stack([X, y])), index=False).to_numpy()
+
+
+def filas_agregadas(X_previo, y_previo, X, y):
+    """
+    Máscara de las filas de (X, y) que no estaban en (X_previo, y_previo),
+    comparando la huella de cada fila. None si alguna fila anterior ya no
+    está (datos editados o borrados, no solo agregados).
+    """
+    previas = pd.Series(_huellas_filas(X_previo, y_previo)).value_counts()
+    actuales = _huellas_filas(X, y)
+    disponibles = previas.to_dict()
+    nuevas = np.ones(len(actuales), dtype=bool)
+    for i, h in enumerate(actuales):
+        if disponibles.get(h, 0) > 0:
+            disponibles[h] -= 1
+            nuevas[i] = False
+    if any(disponibles.values()):
+        return None
+    return nuevas
+
+
+def actualizar_modelo_rf(df_full, previo, motor='warm-start', umbral_deriva=UMBRAL_DERIVA,
+                         presupuesto=None):
+    """
+    Artefacto para `df_full` a partir del artefacto `previo` (tupla de
+    `entrenar_modelo_rf`) cuando los datos nuevos solo agregan filas:
+
+    - con los mismos hiperparámetros, el bosque anterior crece con
+      `warm_start` y los árboles nuevos se ajustan sobre los datos completos
+      (en proporción a las filas agregadas);
+    - las métricas y predicciones OOF se recalculan con una sola CV;
+    - la importancia y la curva de aprendizaje se conservan del modelo
+      anterior y quedan marcadas en `meta['pendientes']`, para recalcularlas
+      (`calcular_importancia`, `calcular_curva`) solo si se consultan.
+
+    Si cambiaron filas anteriores o los niveles de los factores, o la deriva
+    (ver UMBRAL_DERIVA) supera `umbral_deriva`, entrena desde cero.
+    Retorna (artefacto, info) con el modo usado y el diagnóstico.
+    """
+    presupuesto = presupuesto or PresupuestoCPU()
+    modelo_prev, X_prev, y_prev, _, _, metricas_prev, imp_prev, lc_prev, meta_prev = previo
+    X, y, feature_cols, feature_names, le_var, le_bio = preparar_features(df_full)
+
+    nuevas = None
+    if (list(le_var.classes_) == list(meta_prev['le_var'].classes_)
+            and list(le_bio.classes_) == list(meta_prev['le_bio'].classes_)
+            and list(feature_cols) == list(meta_prev['feature_cols'])):
+        nuevas = filas_agregadas(X_prev, y_prev, X, y)
+    if nuevas is None:
+        return entrenar_modelo_rf(df_full, motor, presupuesto), {'modo': 'completo',
+                                                                 'motivo': 'filas o niveles modificados'}
+    n_nuevas = int(nuevas.sum())
+    if n_nuevas == 0:
+        return previo, {'modo': 'sin cambios', 'filas_nuevas': 0}
+
+    # Deriva: error del modelo anterior sobre las filas que nunca vio
+    mse_nuevas = float(np.mean((modelo_prev.predict(X[nuevas]) - y[nuevas]) ** 2))
+    deriva = float(mse_nuevas / metricas_prev['mse_mean'])
+    info = {'filas_nuevas': n_nuevas, 'deriva': round(deriva, 3)}
+    if deriva > umbral_deriva:
+        return entrenar_modelo_rf(df_full, motor, presupuesto), {**info, 'modo': 'completo',
+                                                                 'motivo': 'deriva sobre el umbral'}
+
+    # ── Bosque anterior + árboles nuevos sobre los datos completos ───────────
+    best_params = metricas_prev['best_params']
+    extra = max(1, int(np.ceil(modelo_prev.n_estimators * n_nuevas / len(y_prev))))
+    best_model = copy.deepcopy(modelo_prev)      # el previo puede venir del registro (memory-map)
+    with presupuesto.etapa('busqueda'):
+        best_model.set_params(warm_start=True, n_estimators=modelo_prev.n_estimators + extra,
+                              n_jobs=presupuesto.cpus_etapa('busqueda'))
+        best_model.fit(X, y)
+    best_model.set_params(warm_start=False, n_jobs=-1)
+
+    # ── Métricas CV con los hiperparámetros vigentes ──────────────────────────
+    kf = _validacion()
+    externos, internos = presupuesto.reparto('cv', kf.get_n_splits())
+    estimador_cv = RandomForestRegressor(random_state=42, n_jobs=internos,
+                                         **{**best_params, 'n_estimators': best_model.n_estimators})
+    with presupuesto.etapa('cv'):
+        folds, y_pred_oof = evaluar_cv(estimador_cv, X, y, kf, n_jobs=externos)
+
+    y_pred_train = best_model.predict(X)
+    metricas = {**_metricas(folds, best_params, metricas_prev.get('motor', motor)), 'incremental': True}
+    meta = {
+        'le_var': le_var,
+        'le_bio': le_bio,
+        'feature_cols': feature_cols,
+        'pendientes': ('importancia', 'curva'),
+        # Filas con las que se calcularon la importancia y la curva conservadas
+        'filas_importancia': meta_prev.get('filas_importancia', len(y_prev)),
+    }
+    artefacto = (best_model, X, y, y_pred_train, y_pred_oof, metricas, imp_prev, lc_prev, meta)
+    return artefacto, {**info, 'modo': 'incremental', 'arboles_nuevos': extra}
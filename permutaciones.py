@@ -0,0 +1,135 @@
+"""
+ANOVA por permutaciones (Freedman–Lane).
+
+Para cada término se ajusta el modelo reducido que corresponde al tipo de
+suma de cuadrados y se permutan sus residuos. Los valores ajustados del modelo
+reducido quedan dentro del espacio del modelo completo, así que la F permutada
+solo depende de los residuos permutados E (B × n) y de dos bases ortonormales
+precalculadas, la del aporte del término (Q_t) y la del modelo completo (Q):
+
+    SS_t* = ‖E Q_t‖²,    RSS* = ‖E‖² − ‖E Q‖²
+
+Cada bloque de permutaciones se reduce a un par de productos matriciales, sin
+reajustar statsmodels. Los bloques se reparten en un pool de procesos; cada uno
+recibe su propia semilla derivada con SeedSequence, de modo que el resultado
+no depende del número de procesos.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from anova import anova_multirespuesta, bases_ortonormales, disenar_factorial, terminos_reducidos
+
+# Permutaciones por bloque: hasta TAMANO_BLOQUE, y con n grande las que caben
+# en MAX_ELEMENTOS_BLOQUE (permutaciones × n) para acotar la memoria de cada
+# proceso (índices y residuos permutados son arreglos bloque × n)
+TAMANO_BLOQUE = 2_000
+MAX_ELEMENTOS_BLOQUE = 4_000_000
+
+# Por debajo de este trabajo (n × permutaciones) el arranque del pool cuesta
+# más que las permutaciones mismas y se corre en el proceso actual
+MIN_TRABAJO_POOL = 5_000_000
+
+
+def preparar_permutaciones(df, respuesta, factores, orden=1, typ=2):
+    """
+    Proyecciones precalculadas de la prueba de cada término: residuos del
+    modelo reducido, base del término, base del modelo completo, grados de
+    libertad y F observada.
+    """
+    datos = df[df[respuesta].notna()]
+    y = datos[respuesta].to_numpy(dtype=float)
+    bloques = disenar_factorial(datos, factores, orden=orden, suma=(typ == 3))
+    base_completa = np.hstack(bases_ortonormales(bloques, list(bloques)))
+    gl_resid = len(y) - base_completa.shape[1]
+
+    problema = {'terminos': [], 'residuos': [], 'bases': [], 'gl': [],
+                'base_completa': base_completa, 'gl_resid': gl_resid}
+    for t, base in terminos_reducidos(bloques, typ):
+        if t == 'Intercept':
+            continue                                  # sin sentido al permutar residuos
+        bases = bases_ortonormales(bloques, base + [t])
+        q_t = bases[-1]
+        q_base = np.hstack(bases[:-1]) if len(bases) > 1 else np.empty((len(y), 0))
+        if q_t.shape[1] == 0 or gl_resid <= 0:
+            continue                                  # término no estimable
+        problema['terminos'].append(t)
+        problema['residuos'].append(y - q_base @ (q_base.T @ y))
+        problema['bases'].append(q_t)
+        problema['gl'].append(q_t.shape[1])
+
+    problema['F'] = _estadisticos(problema, np.arange(len(y))[None, :])[:, 0]
+    return problema
+
+
+def _estadisticos(problema, permutaciones):
+    """F de cada término (filas) para cada permutación (columnas)."""
+    Q = problema['base_completa']
+    F = np.empty((len(problema['terminos']), len(permutaciones)))
+    for i, (e, q_t, gl) in enumerate(zip(problema['residuos'], problema['bases'], problema['gl'])):
+        E = e[permutaciones]
+        ss_t = ((E @ q_t) ** 2).sum(axis=1)
+        rss = (E ** 2).sum(axis=1) - ((E @ Q) ** 2).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F[i] = (ss_t / gl) / (rss / problema['gl_resid'])
+    return F
+
+
+def tamano_bloque(n):
+    """Permutaciones por bloque para n observaciones."""
+    return max(1, min(TAMANO_BLOQUE, MAX_ELEMENTOS_BLOQUE // n))
+
+
+def _contar_bloque(problema, semilla, n_permutaciones):
+    # Permutaciones del bloque con su propia semilla → conteo de F* ≥ F observada
+    rng = np.random.default_rng(semilla)
+    n = len(problema['residuos'][0])
+    permutaciones = rng.permuted(np.broadcast_to(np.arange(n), (n_permutaciones, n)), axis=1)
+    F = _estadisticos(problema, permutaciones)
+    return (F >= problema['F'][:, None] * (1 - 1e-10)).sum(axis=1)
+
+
+def anova_permutaciones(df, respuesta, factores, orden=1, typ=2, n_permutaciones=10_000,
+                        semilla=0, n_procesos=None, progreso=None):
+    """
+    Tabla ANOVA de `respuesta` (formato de `anova_lm`, ver
+    anova.anova_multirespuesta) con la columna adicional 'PR(perm)': el p-valor
+    por permutaciones, (1 + #{F* ≥ F}) / (B + 1). `progreso(hechas, total)` se
+    llama cada vez que termina un bloque. Mismo resultado para la misma
+    `semilla`, sin importar `n_procesos`.
+    """
+    tabla = anova_multirespuesta(df, [respuesta], factores, orden=orden, typ=typ)[respuesta].copy()
+    problema = preparar_permutaciones(df, respuesta, factores, orden=orden, typ=typ)
+    tabla['PR(perm)'] = np.nan
+    if not problema['terminos']:
+        return tabla
+
+    n = len(problema['residuos'][0])
+    por_bloque = tamano_bloque(n)
+    tamanos = [min(por_bloque, n_permutaciones - i)
+               for i in range(0, n_permutaciones, por_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    if n_procesos is None:
+        n_procesos = 1 if n * n_permutaciones < MIN_TRABAJO_POOL else min(os.cpu_count() or 1, len(tamanos))
+
+    conteo = np.zeros(len(problema['terminos']), dtype=np.int64)
+    hechas = 0
+    if n_procesos <= 1:
+        for s, b in zip(semillas, tamanos):
+            conteo += _contar_bloque(problema, s, b)
+            hechas += b
+            if progreso:
+                progreso(hechas, n_permutaciones)
+    else:
+        with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+            futuros = {pool.submit(_contar_bloque, problema, s, b): b
+                       for s, b in zip(semillas, tamanos)}
+            for futuro in as_completed(futuros):
+                conteo += futuro.result()
+                hechas += futuros[futuro]
+                if progreso:
+                    progreso(hechas, n_permutaciones)
+
+    tabla.loc[problema['terminos'], 'PR(perm)'] = (1 + conteo) / (1 + n_permutaciones)
+    return tabla
@@ -0,0 +1,78 @@
+"""
+Presupuesto de CPU del entrenamiento.
+
+`entrenar_modelo_rf` usaba `n_jobs=-1` en el bosque y también en la búsqueda,
+la CV, la importancia por permutación y la curva de aprendizaje: cada proceso
+de joblib abría a su vez un bosque con todos los núcleos, y los hilos BLAS de
+NumPy/statsmodels se sumaban encima. En máquinas de muchos núcleos eso deja
+núcleos² hilos compitiendo.
+
+`PresupuestoCPU` reparte un número fijo de CPUs entre los dos niveles de cada
+etapa: primero el paralelismo externo (tareas independientes: candidatos ×
+folds, folds, columnas permutadas, tamaños × folds) y lo que sobra para los
+árboles de cada bosque, de modo que externos × internos ≤ cpus. Mientras corre
+una etapa, los hilos BLAS quedan fijados con threadpoolctl.
+
+El presupuesto se configura con $DASHBOARD_CPUS (por defecto, los núcleos que
+ve joblib: afinidad, cuotas de cgroups y el tope de un proceso del
+planificador incluidos) y opcionalmente con un tope por etapa.
+"""
+import os
+from contextlib import contextmanager
+
+from joblib import cpu_count
+from threadpoolctl import threadpool_limits
+
+ENV_CPUS = 'DASHBOARD_CPUS'
+
+# Etapas del pipeline de modelo.entrenar_modelo_rf, de la comparación de
+# modelos (comparacion.py) y del bootstrap del bosque (bootstrap.py)
+ETAPAS = ('busqueda', 'cv', 'importancia', 'curva', 'comparacion', 'bootstrap')
+
+
+def cpus_disponibles():
+    """
+    Núcleos utilizables por este proceso según joblib, acotados por
+    $DASHBOARD_CPUS si está definida.
+    """
+    cpus = max(1, cpu_count())
+    valor = os.environ.get(ENV_CPUS)
+    if valor:
+        cpus = min(cpus, max(1, int(valor)))
+    return cpus
+
+
+class PresupuestoCPU:
+    """
+    `cpus` en total para cada etapa; `hilos_blas` por proceso mientras corre;
+    `limites` ({etapa: cpus}) baja el presupuesto de etapas puntuales.
+    """
+
+    def __init__(self, cpus=None, hilos_blas=1, limites=None):
+        self.cpus = cpus or cpus_disponibles()
+        self.hilos_blas = hilos_blas
+        self.limites = dict(limites or {})
+        desconocidas = set(self.limites) - set(ETAPAS)
+        if desconocidas:
+            raise ValueError(f"Etapas desconocidas: {sorted(desconocidas)}. Opciones: {ETAPAS}")
+
+    def cpus_etapa(self, etapa):
+        return max(1, min(self.cpus, self.limites.get(etapa, self.cpus)))
+
+    def reparto(self, etapa, n_tareas):
+        """
+        (n_jobs externo, n_jobs de cada bosque) para `n_tareas` tareas
+        independientes en `etapa`: externos × internos ≤ cpus de la etapa.
+        """
+        cpus = self.cpus_etapa(etapa)
+        externos = max(1, min(cpus, n_tareas))
+        return externos, max(1, cpus // externos)
+
+    @contextmanager
+    def etapa(self, etapa):
+        """Fija los hilos BLAS durante la etapa; entrega las cpus de la etapa."""
+        with threadpool_limits(limits=self.hilos_blas, user_api='blas'):
+            yield self.cpus_etapa(etapa)
+
+    def __repr__(self):
+        return f"PresupuestoCPU(cpus={self.cpus}, hilos_blas={self.hilos_blas}, limites={self.limites})"
@@ -0,0 +1,124 @@
+"""
+Registro versionado de modelos entrenados.
+
+Cada entrenamiento se guarda en su propio directorio dentro de
+DIR_CACHE/modelos/ con dos archivos:
+
+- `artefacto.joblib`: modelo, X, y, métricas, importancias, curva de
+  aprendizaje y codificadores, sin compresión para que los arreglos NumPy se
+  puedan abrir con memory-map.
+- `manifiesto.json`: esquema, versiones, huella de los datos y métricas.
+
+El dashboard solo carga el artefacto compatible más reciente.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+import joblib
+import sklearn
+
+from datos import DIR_CACHE
+from modelo import CAMPOS_ARTEFACTO
+
+# Subir cuando cambie el contenido de CAMPOS_ARTEFACTO o su significado
+VERSION_ESQUEMA = 2
+
+DIR_MODELOS = os.path.join(DIR_CACHE, 'modelos')
+
+
+def _es_compatible(manifiesto, huella):
+    return (
+        manifiesto.get('esquema') == VERSION_ESQUEMA
+        and manifiesto.get('sklearn') == sklearn.__version__
+        and (huella is None or manifiesto.get('huella_datos') == huella)
+    )
+
+
+def listar(directorio=DIR_MODELOS):
+    """Manifiestos de todos los modelos registrados, del más reciente al más antiguo."""
+    if not os.path.isdir(directorio):
+        return []
+    manifiestos = []
+    for nombre in os.listdir(directorio):
+        if nombre.startswith('.') or nombre.endswith('.tmp'):
+            continue                      # `guardar` aún no lo publica
+        ruta = os.path.join(directorio, nombre, 'manifiesto.json')
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                manifiesto = json.load(f)
+        except (OSError, ValueError):
+            continue                      # directorio incompleto o ajeno
+        manifiesto['ruta'] = os.path.join(directorio, nombre)
+        manifiestos.append(manifiesto)
+    return sorted(manifiestos, key=lambda m: m['creado'], reverse=True)
+
+
+def ultimo_manifiesto(huella=None, directorio=DIR_MODELOS):
+    """Manifiesto compatible más reciente (para `huella`, si se indica) o None."""
+    for manifiesto in listar(directorio):
+        if _es_compatible(manifiesto, huella):
+            return manifiesto
+    return None
+
+
+def cargar(manifiesto):
+    """Tupla del artefacto descrito por `manifiesto`, en el orden de CAMPOS_ARTEFACTO."""
+    contenido = joblib.load(os.path.join(manifiesto['ruta'], 'artefacto.joblib'), mmap_mode='r')
+    return tuple(contenido[campo] for campo in CAMPOS_ARTEFACTO)
+
+
+def cargar_ultimo(huella=None, directorio=DIR_MODELOS):
+    """Artefacto compatible más reciente (para `huella`, si se indica) o None."""
+    manifiesto = ultimo_manifiesto(huella, directorio)
+    return cargar(manifiesto) if manifiesto else None
+
+
+def guardar(artefacto, huella, directorio=DIR_MODELOS, **extra):
+    """
+    Registra `artefacto` (tupla de `entrenar_modelo_rf`) como una nueva versión
+    y devuelve su manifiesto. Se escribe en un directorio temporal y se renombra
+    al final, así que un lector nunca ve una versión a medio escribir.
+    """
+    contenido = dict(zip(CAMPOS_ARTEFACTO, artefacto))
+    creado = time.time()
+    nombre = f"rf-{time.strftime('%Y%m%dT%H%M%S', time.gmtime(creado))}-{uuid.uuid4().hex[:6]}"
+
+    os.makedirs(directorio, exist_ok=True)
+    tmp = os.path.join(directorio, f'.{nombre}.tmp')
+    os.makedirs(tmp)
+    try:
+        joblib.dump(contenido, os.path.join(tmp, 'artefacto.joblib'))
+        manifiesto = {
+            'nombre': nombre,
+            'creado': creado,
+            'esquema': VERSION_ESQUEMA,
+            'sklearn': sklearn.__version__,
+            'huella_datos': huella,
+            'n_obs': int(len(contenido['y'])),
+            'feature_cols': list(contenido['meta']['feature_cols']),
+            'metricas': _a_json(contenido['metricas']),
+            **extra,
+        }
+        with open(os.path.join(tmp, 'manifiesto.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, os.path.join(directorio, nombre))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    manifiesto['ruta'] = os.path.join(directorio, nombre)
+    return manifiesto
+
+
+def _a_json(valor):
+    # Métricas con tipos NumPy → tipos nativos de JSON
+    if isinstance(valor, dict):
+        return {str(k): _a_json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_a_json(v) for v in valor]
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
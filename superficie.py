@@ -0,0 +1,134 @@
+"""
+Superficie de respuesta continua del Random Forest.
+
+Evalúa el modelo sobre dos variables continuas (radiación y/o nutrientes)
+con el resto de variables fijas en el perfil de un tratamiento. En lugar de
+predecir la rejilla densa completa (p. ej. 200×200 puntos), parte de una
+rejilla gruesa y subdivide en cuatro solo las teselas con mayor variación
+local, hasta alcanzar la resolución final en las zonas de alto gradiente.
+La variación de una tesela nueva compara su valor con el de sus hermanas y
+con el de sus vecinas de afuera a su misma resolución, así que un salto del
+bosque (constante a trozos) se sigue hasta la resolución final aunque caiga
+en el borde entre dos teselas. Cada nivel se predice en un solo lote y se
+entrega en cuanto está listo.
+"""
+import numpy as np
+import pandas as pd
+
+from barrido import disenar_barrido
+
+# Variables que pueden ir en los ejes (nombre en df_full → columna del modelo)
+VARIABLES_SUPERFICIE = {
+    'Radiacion': 'Radiacion_norm',
+    'Clorofila_a': 'Clorofila_a',
+    'Clorofila_b': 'Clorofila_b',
+    'Nitrogeno': 'Nitrogeno',
+    'Fosforo': 'Fosforo',
+    'Potasio': 'Potasio',
+    'Calcio': 'Calcio',
+    'Magnesio': 'Magnesio',
+}
+
+
+def _columna_modelo(variable, meta):
+    return meta['feature_cols'].index(VARIABLES_SUPERFICIE[variable])
+
+
+def _escala(variable):
+    # La radiación entra al modelo normalizada (Radiacion_norm = PAR / 440)
+    return 1 / 440.0 if variable == 'Radiacion' else 1.0
+
+
+def refinar_superficie(predecir, df_full, meta, variedad, bioestimulante,
+                       eje_x, eje_y, limites_x, limites_y,
+                       resolucion=200, inicial=25, fraccion=0.25):
+    """
+    Generador de teselados cada vez más finos de la superficie predicha.
+
+    `predecir` recibe una matriz de diseño y devuelve las predicciones (p. ej.
+    `BosquePlano.predecir`). Cada valor entregado es un DataFrame con
+    x0, x1, y0, y1, Clorofila_predicha y nivel por tesela. En cada nivel se
+    subdivide la `fraccion` de teselas recién creadas con mayor variación,
+    hasta que su lado es 1/`resolucion` del rango.
+    """
+    _, base = disenar_barrido(df_full, meta, [0.0],
+                              variedades=[variedad], bioestimulantes=[bioestimulante])
+    col_x, col_y = _columna_modelo(eje_x, meta), _columna_modelo(eje_y, meta)
+    esc_x, esc_y = _escala(eje_x), _escala(eje_y)
+
+    def evaluar(cx, cy):
+        X = np.repeat(base, len(cx), axis=0)
+        X[:, col_x] = cx * esc_x
+        X[:, col_y] = cy * esc_y
+        return predecir(X)
+
+    # Nivel 0: rejilla uniforme inicial × inicial, valor en el centro de cada tesela
+    bordes_x = np.linspace(*limites_x, inicial + 1)
+    bordes_y = np.linspace(*limites_y, inicial + 1)
+    ix, iy = np.meshgrid(np.arange(inicial), np.arange(inicial), indexing='ij')
+    x0, x1 = bordes_x[ix.ravel()], bordes_x[ix.ravel() + 1]
+    y0, y1 = bordes_y[iy.ravel()], bordes_y[iy.ravel() + 1]
+    valor = evaluar((x0 + x1) / 2, (y0 + y1) / 2)
+    nivel = np.zeros(len(valor), dtype=int)
+
+    # Variación inicial: mayor diferencia con los vecinos de la rejilla
+    v = valor.reshape(inicial, inicial)
+    var = np.zeros_like(v)
+    dx, dy = np.abs(np.diff(v, axis=0)), np.abs(np.diff(v, axis=1))
+    var[:-1] = np.maximum(var[:-1], dx)
+    var[1:] = np.maximum(var[1:], dx)
+    var[:, :-1] = np.maximum(var[:, :-1], dy)
+    var[:, 1:] = np.maximum(var[:, 1:], dy)
+    variacion = var.ravel()
+    candidatas = np.ones(len(valor), dtype=bool)
+
+    yield _teselas(x0, x1, y0, y1, valor, nivel)
+
+    lado_min = (limites_x[1] - limites_x[0]) / resolucion
+    while (x1 - x0)[candidatas].max(initial=0) > lado_min * 1.000001:
+        umbral = np.quantile(variacion[candidatas], 1 - fraccion)
+        dividir = candidatas & (variacion >= umbral) & (variacion > 0)
+        if not dividir.any():
+            break
+
+        # Cuatro hijas por tesela dividida y, fuera de la madre, el vecino de
+        # cada hija por los dos lados que dan afuera: todo en un solo lote
+        px0, px1, py0, py1 = x0[dividir], x1[dividir], y0[dividir], y1[dividir]
+        mx, my = (px0 + px1) / 2, (py0 + py1) / 2
+        hx0 = np.concatenate([px0, mx, px0, mx])
+        hx1 = np.concatenate([mx, px1, mx, px1])
+        hy0 = np.concatenate([py0, py0, my, my])
+        hy1 = np.concatenate([my, my, py1, py1])
+        cx, cy = (hx0 + hx1) / 2, (hy0 + hy1) / 2
+        ancho, alto = hx1 - hx0, hy1 - hy0
+        lado = np.repeat([-1, 1, -1, 1], len(px0))          # izquierda / derecha
+        altura = np.repeat([-1, -1, 1, 1], len(px0))        # abajo / arriba
+        vx, vy = cx + lado * ancho, cy + altura * alto
+        todos = evaluar(np.concatenate([cx, vx, cx]), np.concatenate([cy, cy, vy]))
+        hvalor, vecino_x, vecino_y = todos.reshape(3, -1)
+
+        # Variación de cada hija: rango de sus hermanas y salto hasta sus
+        # vecinos de afuera (un borde con la tesela de al lado no se pierde
+        # aunque las hermanas coincidan); vecinos fuera del dominio no cuentan
+        hermanas = hvalor.reshape(4, -1)
+        hvariacion = np.tile(hermanas.max(axis=0) - hermanas.min(axis=0), 4)
+        dentro_x = (vx > limites_x[0]) & (vx < limites_x[1])
+        dentro_y = (vy > limites_y[0]) & (vy < limites_y[1])
+        hvariacion = np.maximum(hvariacion, np.where(dentro_x, np.abs(hvalor - vecino_x), 0.0))
+        hvariacion = np.maximum(hvariacion, np.where(dentro_y, np.abs(hvalor - vecino_y), 0.0))
+
+        quedan = ~dividir
+        x0, x1 = np.concatenate([x0[quedan], hx0]), np.concatenate([x1[quedan], hx1])
+        y0, y1 = np.concatenate([y0[quedan], hy0]), np.concatenate([y1[quedan], hy1])
+        valor = np.concatenate([valor[quedan], hvalor])
+        nivel = np.concatenate([nivel[quedan], np.repeat(nivel[dividir] + 1, 4)])
+        variacion = np.concatenate([np.zeros(quedan.sum()), hvariacion])
+        candidatas = np.concatenate([np.zeros(quedan.sum(), dtype=bool),
+                                     np.ones(len(hvalor), dtype=bool)])
+
+        yield _teselas(x0, x1, y0, y1, valor, nivel)
+
+
+def _teselas(x0, x1, y0, y1, valor, nivel):
+    return pd.DataFrame({'x0': x0, 'x1': x1, 'y0': y0, 'y1': y1,
+                         'Clorofila_predicha': valor, 'nivel': nivel})
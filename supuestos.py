@@ -0,0 +1,240 @@
+"""
+Pruebas de supuestos del ANOVA en lote: Shapiro–Wilk, Levene, Brown–Forsythe
+y Bartlett para todas las variables × factores de agrupación × subconjuntos.
+
+Por cada factor de agrupación los datos se ordenan una sola vez por
+(grupo, valor) en todas las columnas a la vez. Sobre esa disposición las
+medianas, medias y sumas por grupo salen de índices y sumas acumuladas, y el
+Shapiro–Wilk se resuelve con un producto matricial para todas las celdas del
+mismo tamaño (coeficientes y p-valores del algoritmo AS R94 de Royston, el
+mismo que usa scipy). El resultado es un único DataFrame en formato largo.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, f as dist_f, norm
+
+PRUEBAS = ('shapiro', 'levene', 'brown-forsythe', 'bartlett')
+
+COLUMNAS_RESULTADO = ['Subconjunto', 'Agrupacion', 'Grupo', 'Variable', 'Prueba',
+                      'n', 'Estadistico', 'p_valor']
+
+# Polinomios de Royston (1995), AS R94
+_C1 = [0.0, 0.221157, -0.147981, -2.071190, 4.434685, -2.706056]
+_C2 = [0.0, 0.042981, -0.293762, -1.752461, 5.682633, -3.582633]
+_C3 = [0.5440, -0.39978, 0.025054, -6.714e-4]
+_C4 = [1.3822, -0.77857, 0.062767, -0.0020322]
+_C5 = [-1.5861, -0.31082, -0.083751, 0.0038915]
+_C6 = [-0.4803, -0.082676, 0.0030302]
+_G = [-2.273, 0.459]
+
+
+def _poly(coeficientes, x):
+    return np.polynomial.polynomial.polyval(x, coeficientes)
+
+
+@lru_cache(maxsize=None)
+def coeficientes_shapiro(n):
+    """Coeficientes a_1…a_{n//2} de Shapiro–Wilk para muestras de tamaño n (n ≥ 3)."""
+    if n == 3:
+        return np.array([np.sqrt(0.5)])
+    m = -norm.ppf((np.arange(1, n // 2 + 1) - 0.375) / (n + 0.25))
+    summ2 = 2 * np.sum(m ** 2)
+    ssumm2 = np.sqrt(summ2)
+    rsn = 1 / np.sqrt(n)
+    a = m / ssumm2
+    a[0] = m[0] / ssumm2 + _poly(_C1, rsn)
+    if n > 5:
+        a[1] = m[1] / ssumm2 + _poly(_C2, rsn)
+        fac = np.sqrt((summ2 - 2 * m[0] ** 2 - 2 * m[1] ** 2)
+                      / (1 - 2 * a[0] ** 2 - 2 * a[1] ** 2))
+        a[2:] = m[2:] / fac
+    else:
+        fac = np.sqrt((summ2 - 2 * m[0] ** 2) / (1 - 2 * a[0] ** 2))
+        a[1:] = m[1:] / fac
+    return a
+
+
+def _p_shapiro(W, n):
+    # Transformación normalizante de Royston para W (vectorizada sobre W)
+    if n == 3:
+        return np.clip(6 / np.pi * (np.arcsin(np.sqrt(W)) - np.pi / 3), 0, 1)
+    w1 = np.log1p(-W)
+    if n <= 11:
+        gamma = _poly(_G, n)
+        with np.errstate(invalid='ignore'):
+            y = -np.log(gamma - w1)
+        p = norm.sf(y, loc=_poly(_C3, n), scale=np.exp(_poly(_C4, n)))
+        return np.where(w1 >= gamma, 1e-99, p)
+    ln = np.log(n)
+    return norm.sf(w1, loc=_poly(_C5, ln), scale=np.exp(_poly(_C6, ln)))
+
+
+def shapiro_lote(ordenados):
+    """
+    W y p-valor de Shapiro–Wilk para cada columna de `ordenados` (n × m),
+    cuyas columnas ya están ordenadas de menor a mayor y sin faltantes.
+    """
+    n = ordenados.shape[0]
+    if n < 3:
+        vacio = np.full(ordenados.shape[1], np.nan)
+        return vacio, vacio.copy()
+    a = coeficientes_shapiro(n)
+    mitad = len(a)
+    numerador = (a @ (ordenados[::-1][:mitad] - ordenados[:mitad])) ** 2
+    ssq = ((ordenados - ordenados.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        W = np.minimum(numerador / ssq, 1.0)
+    return W, _p_shapiro(W, n)
+
+
+def _disposicion(valores, codigos, n_grupos):
+    """
+    Ordena cada columna por (grupo, valor), con los faltantes al final de su
+    grupo. Retorna (ordenados, grupo de cada fila, inicio de cada grupo,
+    n válidos por grupo × columna).
+    """
+    orden = np.argsort(valores, axis=0, kind='stable')
+    orden = np.take_along_axis(orden, np.argsort(codigos[orden], axis=0, kind='stable'), axis=0)
+    ordenados = np.take_along_axis(valores, orden, axis=0)
+
+    tamanos = np.bincount(codigos, minlength=n_grupos)
+    inicios = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+    grupo_fila = np.repeat(np.arange(n_grupos), tamanos)
+    faltantes = _sumar_grupos(np.isnan(ordenados).astype(float), inicios, tamanos)
+    return ordenados, grupo_fila, inicios, tamanos[:, None] - faltantes.astype(int)
+
+
+def _sumar_grupos(filas, inicios, tamanos):
+    # Suma por grupo con sumas acumuladas (admite grupos vacíos, ignora NaN)
+    acumulado = np.vstack([np.zeros((1, filas.shape[1])),
+                           np.cumsum(np.nan_to_num(filas), axis=0)])
+    return acumulado[inicios + tamanos] - acumulado[inicios]
+
+
+def _medianas(ordenados, inicios, validos):
+    columnas = np.arange(ordenados.shape[1])
+    bajo = np.clip(inicios[:, None] + (validos - 1) // 2, 0, len(ordenados) - 1)
+    alto = np.clip(inicios[:, None] + validos // 2, 0, len(ordenados) - 1)
+    mediana = (ordenados[bajo, columnas] + ordenados[alto, columnas]) / 2
+    return np.where(validos > 0, mediana, np.nan)
+
+
+def _levene(ordenados, grupo_fila, inicios, tamanos, validos, centro, indicador):
+    """Levene sobre |x − centro del grupo|, por subconjunto × columna."""
+    z = np.abs(ordenados - centro[grupo_fila])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_grupo = _sumar_grupos(z, inicios, tamanos) / validos
+        dentro = _sumar_grupos((z - z_grupo[grupo_fila]) ** 2, inicios, tamanos)
+        n = indicador @ validos
+        k = indicador @ (validos > 0)
+        z_total = (indicador @ np.nan_to_num(z_grupo * validos)) / n
+        entre = indicador @ np.nan_to_num(validos * (z_grupo - z_total[indicador.argmax(axis=0)]) ** 2)
+        estadistico = (n - k) / (k - 1) * entre / (indicador @ dentro)
+    estadistico = np.where(k > 1, estadistico, np.nan)
+    return n, estadistico, dist_f.sf(estadistico, k - 1, n - k)
+
+
+def _bartlett(ordenados, grupo_fila, inicios, tamanos, validos, medias, indicador):
+    """Bartlett por subconjunto × columna; los grupos con menos de 2 datos no cuentan."""
+    usados = validos > 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ssq = _sumar_grupos((ordenados - medias[grupo_fila]) ** 2, inicios, tamanos)
+        gl = np.where(usados, validos - 1, 0)
+        varianzas = np.where(usados, ssq / gl, 1.0)
+        n_gl = indicador @ gl
+        k = indicador @ usados
+        combinada = (indicador @ np.where(usados, ssq, 0)) / n_gl
+        numerador = n_gl * np.log(combinada) - indicador @ (gl * np.log(varianzas))
+        correccion = 1 + (indicador @ np.where(usados, 1 / np.maximum(gl, 1), 0) - 1 / n_gl) / (3 * (k - 1))
+        estadistico = numerador / correccion
+    estadistico = np.where(k > 1, estadistico, np.nan)
+    return n_gl + k, estadistico, chi2.sf(estadistico, k - 1)
+
+
+def _codificar(serie):
+    if serie is None:
+        return None, np.array(['Todos'], dtype=object)
+    codigos, niveles = pd.factorize(serie, sort=True)
+    return codigos, np.asarray(niveles.astype(str), dtype=object)
+
+
+def pruebas_supuestos(df, variables, agrupaciones=(None,), subconjunto=None, pruebas=PRUEBAS):
+    """
+    Supuestos del ANOVA para cada variable × agrupación × subconjunto.
+
+    `agrupaciones` son columnas de factores (None = la muestra completa);
+    `subconjunto` es una columna opcional cuyos niveles se analizan por
+    separado. Shapiro–Wilk se reporta por grupo; Levene (centro en la media),
+    Brown–Forsythe (Levene con centro en la mediana, el de scipy/pingouin por
+    defecto) y Bartlett comparan los grupos de cada agrupación. Los faltantes se
+    descartan por variable. Retorna un DataFrame con COLUMNAS_RESULTADO.
+    """
+    variables = list(variables)
+    valores = df[variables].to_numpy(dtype=float)
+    cod_sub, niveles_sub = _codificar(df[subconjunto] if subconjunto else None)
+    if cod_sub is None:
+        cod_sub = np.zeros(len(df), dtype=int)
+    n_sub = len(niveles_sub)
+
+    bloques = []
+    for agrupacion in agrupaciones:
+        cod_grp, niveles_grp = _codificar(df[agrupacion] if agrupacion else None)
+        if cod_grp is None:
+            cod_grp = np.zeros(len(df), dtype=int)
+        n_grp = len(niveles_grp)
+
+        # Grupo compuesto subconjunto × nivel; filas con factor faltante fuera
+        presentes = (cod_sub >= 0) & (cod_grp >= 0)
+        codigos = cod_sub[presentes] * n_grp + cod_grp[presentes]
+        n_grupos = n_sub * n_grp
+        ordenados, grupo_fila, inicios, validos = _disposicion(valores[presentes], codigos, n_grupos)
+        tamanos = np.bincount(codigos, minlength=n_grupos)
+        sub_de_grupo = np.arange(n_grupos) // n_grp
+        grp_de_grupo = np.arange(n_grupos) % n_grp
+        etiqueta = agrupacion or 'Todos'
+
+        if 'shapiro' in pruebas:
+            for n in np.unique(validos[validos >= 3]):
+                grupos, columnas = np.nonzero(validos == n)
+                filas = inicios[grupos][None, :] + np.arange(n)[:, None]
+                W, p = shapiro_lote(ordenados[filas, columnas[None, :]])
+                bloques.append(pd.DataFrame({
+                    'Subconjunto': niveles_sub[sub_de_grupo[grupos]],
+                    'Agrupacion': etiqueta,
+                    'Grupo': niveles_grp[grp_de_grupo[grupos]],
+                    'Variable': np.array(variables, dtype=object)[columnas],
+                    'Prueba': 'shapiro',
+                    'n': n, 'Estadistico': W, 'p_valor': p,
+                }))
+
+        if agrupacion is None:
+            continue
+
+        indicador = (sub_de_grupo[None, :] == np.arange(n_sub)[:, None]).astype(float)
+        medias = _sumar_grupos(ordenados, inicios, tamanos) / np.where(validos > 0, validos, np.nan)
+        centros = {'levene': medias, 'brown-forsythe': _medianas(ordenados, inicios, validos)}
+        for prueba in ('levene', 'brown-forsythe', 'bartlett'):
+            if prueba not in pruebas:
+                continue
+            if prueba == 'bartlett':
+                n, estadistico, p = _bartlett(ordenados, grupo_fila, inicios, tamanos,
+                                              validos, medias, indicador)
+            else:
+                n, estadistico, p = _levene(ordenados, grupo_fila, inicios, tamanos,
+                                            validos, centros[prueba], indicador)
+            bloques.append(pd.DataFrame({
+                'Subconjunto': np.repeat(niveles_sub, len(variables)),
+                'Agrupacion': etiqueta,
+                'Grupo': 'Todos',
+                'Variable': np.tile(np.array(variables, dtype=object), n_sub),
+                'Prueba': prueba,
+                'n': n.ravel().astype(int), 'Estadistico': estadistico.ravel(), 'p_valor': p.ravel(),
+            }))
+
+    if not bloques:
+        return pd.DataFrame(columns=COLUMNAS_RESULTADO)
+    resultado = pd.concat(bloques, ignore_index=True)[COLUMNAS_RESULTADO]
+    return resultado.sort_values(['Subconjunto', 'Agrupacion', 'Prueba', 'Variable', 'Grupo'],
+                                 kind='stable', ignore_index=True)
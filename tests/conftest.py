@@ -0,0 +1,5 @@
+"""Los módulos del dashboard viven en la raíz del repositorio (como en benchmarks/)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,119 @@
+"""anova.anova_multirespuesta frente a statsmodels `anova_lm` (tipos I, II y III) y caché de ServicioANOVA."""
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.formula.api as smf
+from statsmodels.stats.anova import anova_lm
+
+from anova import ServicioANOVA, anova_multirespuesta
+
+FACTORES = ['Var', 'Bio', 'Rad']
+
+
+@pytest.fixture(scope='module')
+def datos():
+    # Diseño desbalanceado con una respuesta que tiene faltantes
+    rng = np.random.default_rng(3)
+    n = 80
+    df = pd.DataFrame({
+        'Var': rng.choice(['a1', 'a2', 'a3'], n),
+        'Bio': rng.choice(['b1', 'b2'], n, p=[0.7, 0.3]),
+        'Rad': rng.choice(['c1', 'c2'], n),
+    })
+    df['Y1'] = (df['Var'] == 'a2') * 1.5 + (df['Bio'] == 'b2') * 0.7 + rng.normal(size=n)
+    df['Y2'] = (df['Var'] == 'a3') * (df['Rad'] == 'c2') * 2.0 + rng.normal(size=n)
+    df.loc[[5, 40], 'Y2'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('typ', [1, 2, 3])
+@pytest.mark.parametrize('orden', [1, 2])
+def test_coincide_con_anova_lm(datos, typ, orden):
+    tablas = anova_multirespuesta(datos, ['Y1', 'Y2'], FACTORES, orden=orden, typ=typ)
+    completos = datos.dropna(subset=['Y1', 'Y2'])
+    codificacion = ', Sum' if typ == 3 else ''
+    terminos = ' + '.join(f'C({f}{codificacion})' for f in FACTORES)
+    formula_derecha = f'({terminos}) ** {orden}'
+    for respuesta, tabla in tablas.items():
+        ajuste = smf.ols(f'{respuesta} ~ {formula_derecha}', data=completos).fit()
+        referencia = anova_lm(ajuste, typ=typ)
+        assert list(tabla.index) == [t.replace(', Sum', '') for t in referencia.index]
+        columnas = ['sum_sq', 'df', 'F', 'PR(>F)']
+        np.testing.assert_allclose(tabla[columnas].to_numpy(dtype=float),
+                                   referencia[columnas].to_numpy(dtype=float),
+                                   rtol=1e-8, atol=1e-10)
+
+
+# ── ServicioANOVA ─────────────────────────────────────────────────────────────
+
+FORMULA = 'Y1 ~ C(Var) + C(Bio) + C(Rad)'
+
+
+@pytest.fixture
+def ajustes_ols(monkeypatch):
+    # Cuenta los ajustes OLS que hace el servicio
+    llamadas = []
+    ols = smf.ols
+
+    def contar(formula, data):
+        llamadas.append(formula)
+        return ols(formula, data=data)
+
+    monkeypatch.setattr(smf, 'ols', contar)
+    return llamadas
+
+
+def test_servicio_acierto_en_cache(datos, ajustes_ols):
+    servicio = ServicioANOVA()
+    primero = servicio.ajustar(FORMULA, datos, huella='h')
+    assert servicio.ajustar(FORMULA, datos, huella='h') is primero
+    # Otro typ reutiliza el modelo ajustado: solo cambia la tabla
+    servicio.ajustar(FORMULA, datos, typ=1, huella='h')
+    assert ajustes_ols == [FORMULA]
+    assert servicio.info() == {'aciertos': 1, 'fallos': 2, 'modelos': 1, 'tablas': 2}
+    # Otra huella (datos distintos) es otra entrada
+    servicio.ajustar(FORMULA, datos.iloc[:60], huella='h2')
+    assert len(ajustes_ols) == 2
+
+
+def test_servicio_desaloja_el_menos_usado(datos, ajustes_ols):
+    servicio = ServicioANOVA(max_entradas=2)
+    formulas = [f'Y1 ~ C({f})' for f in FACTORES]
+    servicio.ajustar(formulas[0], datos, huella='h')
+    servicio.ajustar(formulas[1], datos, huella='h')
+    servicio.ajustar(formulas[0], datos, huella='h')      # el más reciente pasa a ser 0
+    servicio.ajustar(formulas[2], datos, huella='h')      # desaloja 1
+    assert servicio.info()['tablas'] == servicio.info()['modelos'] == 2
+    servicio.ajustar(formulas[0], datos, huella='h')
+    assert len(ajustes_ols) == 3
+    servicio.ajustar(formulas[1], datos, huella='h')
+    assert ajustes_ols == formulas + [formulas[1]]
+
+
+def test_servicio_lote_igual_a_ajustes_separados(datos):
+    completos = datos.dropna(subset=['Y1', 'Y2'])
+    servicio = ServicioANOVA()
+    lote = servicio.ajustar_lote(completos, ['Y1', 'Y2'], FACTORES, huella='h')
+    assert servicio.ajustar_lote(completos, ['Y1', 'Y2'], FACTORES, huella='h') is lote
+    for respuesta in ('Y1', 'Y2'):
+        separado = servicio.ajustar(f'{respuesta} ~ ' + ' + '.join(f'C({f})' for f in FACTORES),
+                                    completos, huella='h').tabla
+        pd.testing.assert_frame_equal(lote[respuesta], separado, check_exact=False, rtol=1e-8,
+                                      check_dtype=False)
+
+
+def test_servicio_entre_hilos(datos):
+    servicio = ServicioANOVA()
+    tablas = []
+    hilos = [threading.Thread(target=lambda: tablas.append(
+        servicio.ajustar(FORMULA, datos, huella='h').tabla)) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    info = servicio.info()
+    assert len(tablas) == 8 and info['aciertos'] + info['fallos'] == 8 and info['tablas'] == 1
+    for tabla in tablas[1:]:
+        pd.testing.assert_frame_equal(tabla, tablas[0])
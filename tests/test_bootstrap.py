@@ -0,0 +1,99 @@
+"""
+Bootstrap: remuestreo estratificado, KPIs del ANOVA frente a statsmodels y
+métricas del bosque por bloques (planificador).
+"""
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from statsmodels.stats.anova import anova_lm
+
+from bootstrap import (
+    bootstrap_rf, codigos_estrato, indices_bootstrap, kpis_anova, metricas_rf, preparar_anova,
+)
+from recursos import PresupuestoCPU
+
+
+FACTORES = ['Var', 'Bio', 'Rad']
+
+
+def _datos_anova():
+    rng = np.random.default_rng(5)
+    n = 48
+    df = pd.DataFrame({
+        'Var': rng.choice(['a1', 'a2', 'a3'], n),
+        'Bio': rng.choice(['b1', 'b2'], n),
+        'Rad': rng.choice(['c1', 'c2', 'c3'], n),
+    })
+    df['Y'] = (df['Var'] == 'a2') * 1.2 + (df['Rad'] == 'c3') * 0.4 + rng.normal(size=n)
+    return df
+
+
+def _kpis_statsmodels(df):
+    tabla = anova_lm(smf.ols('Y ~ ' + ' + '.join(f'C({f})' for f in FACTORES), data=df).fit(), typ=2)
+    ss_error = tabla.loc['Residual', 'sum_sq']
+    error_pct = 100 * ss_error / tabla['sum_sq'].sum()
+    return 100 - error_pct, error_pct, int((tabla['PR(>F)'].drop('Residual') < 0.05).sum())
+
+
+def test_kpis_anova_pesos_unitarios_igual_a_anova_lm():
+    df = _datos_anova()
+    kpis = kpis_anova(preparar_anova(df, 'Y', FACTORES), np.arange(len(df))[None])
+    factores_pct, error_pct, significativos = _kpis_statsmodels(df)
+    np.testing.assert_allclose(kpis['factores_pct'], [factores_pct], rtol=1e-9)
+    np.testing.assert_allclose(kpis['error_pct'], [error_pct], rtol=1e-9)
+    assert kpis['significativos'].tolist() == [significativos]
+
+
+def test_kpis_anova_replica_igual_a_filas_repetidas():
+    # Pesos de frecuencia = ajustar sobre las filas de la réplica
+    df = _datos_anova()
+    indices = indices_bootstrap(codigos_estrato(df, ['Rad']), 3, semilla=2)
+    kpis = kpis_anova(preparar_anova(df, 'Y', FACTORES), indices)
+    for r, idx in enumerate(indices):
+        factores_pct, error_pct, significativos = _kpis_statsmodels(df.iloc[idx])
+        np.testing.assert_allclose(kpis['factores_pct'][r], factores_pct, rtol=1e-9)
+        np.testing.assert_allclose(kpis['error_pct'][r], error_pct, rtol=1e-9)
+        assert kpis['significativos'][r] == significativos
+
+
+def test_indices_respetan_los_estratos():
+    estratos = np.array([0, 0, 0, 1, 1, 2, 2, 2, 2, 2])
+    indices = indices_bootstrap(estratos, 50, semilla=3)
+    assert indices.shape == (50, len(estratos))
+    # Cada posición se llena con filas de su propio estrato: tamaños conservados
+    np.testing.assert_array_equal(estratos[indices], np.broadcast_to(estratos, indices.shape))
+    assert all(np.bincount(estratos[fila], minlength=3).tolist() == [3, 2, 5] for fila in indices)
+    # Con reemplazo y reproducible
+    assert any(len(np.unique(fila)) < len(fila) for fila in indices)
+    np.testing.assert_array_equal(indices_bootstrap(estratos, 50, semilla=3), indices)
+
+
+PARAMS = {'max_depth': 3, 'min_samples_leaf': 2}
+
+
+def _datos_rf():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(30, 4))
+    y = X[:, 0] + 0.1 * rng.normal(size=30)
+    estratos = codigos_estrato(pd.DataFrame({'e': np.arange(30) % 3}), ['e'])
+    return X, y, indices_bootstrap(estratos, 7, semilla=1)
+
+
+def test_bloques_igual_que_una_llamada():
+    X, y, indices = _datos_rf()
+    avances = []
+    por_bloques = bootstrap_rf(X, y, indices, PARAMS, n_arboles=5, tamano_bloque=3,
+                               progreso=lambda hechas, total: avances.append((hechas, total)))
+    completo = metricas_rf(X, y, indices, PARAMS, n_arboles=5, presupuesto=PresupuestoCPU(cpus=1))
+    assert avances == [(3, 7), (6, 7), (7, 7)]
+    for kpi, valores in completo.items():
+        np.testing.assert_array_equal(por_bloques[kpi], valores)
+
+
+def test_cancelado_entre_bloques():
+    X, y, indices = _datos_rf()
+    hechas = []
+    parcial = bootstrap_rf(X, y, indices, PARAMS, n_arboles=5, tamano_bloque=3,
+                           progreso=lambda h, t: hechas.append(h), cancelado=lambda: len(hechas) >= 1)
+    assert hechas == [3] and len(parcial['r2_mean']) == 3
+    assert bootstrap_rf(X, y, indices, PARAMS, cancelado=lambda: True) is None
@@ -0,0 +1,87 @@
+"""Motores de búsqueda: halving, SMBO y rangos como GridSearchCV."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, KFold, ParameterGrid
+
+from busqueda import MIN_MUESTRAS_HALVING, MOTORES_BUSQUEDA, BusquedaSMBO, _rango, crear_busqueda
+from modelo import METRICAS_CV
+
+REJILLA = {'n_estimators': [5, 10, 15], 'max_depth': [2, 3], 'min_samples_leaf': [2, 4]}
+CV = KFold(n_splits=3, shuffle=True, random_state=0)
+
+
+@pytest.fixture(scope='module')
+def datos():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(45, 4))
+    return X, X[:, 0] - X[:, 1] + 0.2 * rng.normal(size=45)
+
+
+def _busqueda(motor, n_muestras=45):
+    return crear_busqueda(motor, RandomForestRegressor(random_state=0, n_jobs=1), REJILLA, cv=CV,
+                          scoring=METRICAS_CV, refit='mse', n_muestras=n_muestras, n_jobs=1)
+
+
+def test_rango_como_gridsearch():
+    assert _rango(np.array([0.5, 0.7, 0.7, 0.1])).tolist() == [3, 1, 1, 4]
+    assert _rango(np.array([0.5, 0.7, 0.7, 0.1])).dtype == np.int32
+
+
+@pytest.mark.parametrize('motor', ['halving-grid', 'halving-random'])
+def test_halving_reparte_arboles_con_pocos_datos(datos, motor):
+    busqueda = _busqueda(motor)
+    assert busqueda.resource == 'n_estimators'
+    assert (busqueda.min_resources, busqueda.max_resources) == (5, 15)
+    # n_estimators es el recurso, no un parámetro de la rejilla
+    rejilla = busqueda.param_grid if motor == 'halving-grid' else busqueda.param_distributions
+    assert 'n_estimators' not in rejilla
+    busqueda.fit(*datos)
+    # Una sola métrica (la de `refit`) y un ganador de la rejilla
+    assert busqueda.scoring == METRICAS_CV['mse']
+    ganador = {k: v for k, v in busqueda.best_params_.items() if k != 'n_estimators'}
+    assert ganador in list(ParameterGrid({k: v for k, v in REJILLA.items() if k != 'n_estimators'}))
+    assert busqueda.best_estimator_.n_estimators in REJILLA['n_estimators']
+
+
+def test_halving_reparte_muestras_con_muchos_datos():
+    busqueda = _busqueda('halving-grid', n_muestras=MIN_MUESTRAS_HALVING)
+    assert isinstance(busqueda, HalvingGridSearchCV)
+    assert busqueda.resource == 'n_samples' and 'n_estimators' in busqueda.param_grid
+
+
+def test_smbo_evalua_el_presupuesto_sin_repetir(datos):
+    busqueda = _busqueda('smbo')
+    assert isinstance(busqueda, BusquedaSMBO)
+    busqueda.n_iter, busqueda.n_iniciales = 7, 3
+    busqueda.fit(*datos)
+    params = busqueda.cv_results_['params']
+    assert len(params) == 7 and len({tuple(sorted(p.items())) for p in params}) == 7
+    medias = busqueda.cv_results_['mean_test_mse']
+    assert busqueda.best_index_ == int(np.argmax(medias))
+    assert busqueda.best_params_ == params[busqueda.best_index_]
+    assert busqueda.best_estimator_.get_params()['max_depth'] == busqueda.best_params_['max_depth']
+    for m in METRICAS_CV:
+        folds = np.column_stack([busqueda.cv_results_[f'split{k}_test_{m}'] for k in range(3)])
+        np.testing.assert_allclose(folds.mean(axis=1), busqueda.cv_results_[f'mean_test_{m}'])
+        assert busqueda.cv_results_[f'rank_test_{m}'].tolist() == _rango(folds.mean(axis=1)).tolist()
+
+
+def test_smbo_reproducible_y_con_toda_la_rejilla(datos):
+    n = len(ParameterGrid(REJILLA))
+    a = BusquedaSMBO(RandomForestRegressor(random_state=0, n_jobs=1), REJILLA, n_iter=50,
+                     n_iniciales=3, cv=CV, n_jobs=1, random_state=4).fit(*datos)
+    b = BusquedaSMBO(RandomForestRegressor(random_state=0, n_jobs=1), REJILLA, n_iter=50,
+                     n_iniciales=3, cv=CV, n_jobs=1, random_state=4).fit(*datos)
+    assert a.cv_results_['params'] == b.cv_results_['params']
+    # Con presupuesto de sobra evalúa toda la rejilla: mismo ganador que GridSearchCV
+    assert len(a.cv_results_['params']) == n
+    grid = GridSearchCV(RandomForestRegressor(random_state=0, n_jobs=1), REJILLA, cv=CV).fit(*datos)
+    assert a.best_params_ == grid.best_params_
+
+
+def test_motor_desconocido():
+    with pytest.raises(ValueError, match='Opciones'):
+        crear_busqueda('bayes', None, REJILLA, cv=CV, scoring='r2', refit=True, n_muestras=10)
+    assert set(MOTORES_BUSQUEDA) == {'grid', 'warm-start', 'halving-grid', 'halving-random', 'smbo'}
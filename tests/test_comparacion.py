@@ -0,0 +1,81 @@
+"""Comparación de modelos: caché de resultados por modelo y tabla de posiciones."""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import KFold
+
+import comparacion
+from comparacion import comparar_modelos, tabla_posiciones
+from recursos import PresupuestoCPU
+
+MODELOS = {'Ridge': {}, 'Lineal ANOVA': {}, 'kNN': {}}
+CV = KFold(n_splits=3, shuffle=True, random_state=0)
+
+
+@pytest.fixture
+def datos():
+    # Tres factores codificados y siete continuas, como modelo.preparar_features
+    rng = np.random.default_rng(0)
+    n = 30
+    X = np.column_stack([rng.integers(0, 3, (n, 3)), rng.normal(size=(n, 7))]).astype(float)
+    y = X[:, 0] + X[:, 3] + 0.1 * rng.normal(size=n)
+    return X, y
+
+
+@pytest.fixture
+def ajustes(monkeypatch):
+    # (modelo, ¿final?) de cada ajuste que se hace de verdad
+    hechos = []
+    ajustar = comparacion._ajustar
+
+    def contar(estimador, X, y, entrenamiento, prueba, n_jobs):
+        hechos.append((type(estimador[-1] if hasattr(estimador, 'steps') else estimador).__name__,
+                       prueba is None))
+        return ajustar(estimador, X, y, entrenamiento, prueba, n_jobs)
+
+    monkeypatch.setattr(comparacion, '_ajustar', contar)
+    return hechos
+
+
+def _comparar(datos, directorio, modelos=MODELOS, huella='h1'):
+    X, y = datos
+    return comparar_modelos(X, y, huella, modelos=modelos, cv=CV, directorio=str(directorio),
+                            presupuesto=PresupuestoCPU(cpus=1))
+
+
+def test_segunda_llamada_no_ajusta(datos, ajustes, tmp_path):
+    primera = _comparar(datos, tmp_path)
+    assert len(ajustes) == len(MODELOS) * (CV.get_n_splits() + 1)
+    ajustes.clear()
+    segunda = _comparar(datos, tmp_path)
+    assert ajustes == []
+    pd.testing.assert_frame_equal(primera, segunda)
+    assert list(segunda['modelo']) == list(MODELOS)
+
+
+def test_cambiar_parametros_reevalua_solo_ese_modelo(datos, ajustes, tmp_path):
+    _comparar(datos, tmp_path)
+    ajustes.clear()
+    resultados = _comparar(datos, tmp_path, modelos={**MODELOS, 'kNN': {'n_neighbors': 3}})
+    assert {nombre for nombre, _ in ajustes} == {'KNeighborsRegressor'}
+    assert len(ajustes) == CV.get_n_splits() + 1
+    assert resultados.set_index('modelo').loc['kNN', 'params']['n_neighbors'] == 3
+
+
+def test_otra_huella_no_usa_la_cache(datos, ajustes, tmp_path):
+    _comparar(datos, tmp_path)
+    ajustes.clear()
+    _comparar(datos, tmp_path, huella='h2')
+    assert len(ajustes) == len(MODELOS) * (CV.get_n_splits() + 1)
+
+
+def test_tabla_posiciones_primero_los_que_cumplen_el_slo():
+    resultados = pd.DataFrame({'modelo': ['a', 'b', 'c', 'd'],
+                               'r2_mean': [0.9, 0.8, 0.7, 0.6],
+                               'latencia_ms': [50.0, 5.0, 1.0, 20.0]})
+    tabla = tabla_posiciones(resultados, slo_latencia_ms=10)
+    assert list(tabla['modelo']) == ['b', 'c', 'a', 'd']
+    assert tabla['cumple_slo'].tolist() == [True, True, False, False]
+    assert list(tabla.index) == [1, 2, 3, 4]
+    # Sin SLO, solo por R²
+    assert list(tabla_posiciones(resultados)['modelo']) == ['a', 'b', 'c', 'd']
@@ -0,0 +1,56 @@
+"""BosqueCuantil frente a los pesos de Meinshausen calculados árbol por árbol."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from bosque import BosquePlano
+from cuantiles import BosqueCuantil
+
+
+@pytest.fixture(scope='module')
+def ajuste():
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(120, 3))
+    y = X[:, 0] + rng.exponential(size=120)
+    modelo = RandomForestRegressor(n_estimators=15, max_depth=4, min_samples_leaf=3,
+                                   random_state=0, n_jobs=1).fit(X, y)
+    consultas = rng.normal(size=(25, 3))
+    return modelo, X, y, consultas
+
+
+def _pesos_referencia(modelo, X, consultas):
+    # w_i(x) = (1/T) Σ_t 1{i en la hoja de x} / |hoja_t(x)|
+    W = np.zeros((len(consultas), len(X)))
+    for est in modelo.estimators_:
+        hoja_train, hoja = est.apply(X.astype(np.float32)), est.apply(consultas.astype(np.float32))
+        misma = hoja[:, None] == hoja_train[None, :]
+        W += misma / misma.sum(axis=1, keepdims=True)
+    return W / len(modelo.estimators_)
+
+
+def test_pesos(ajuste):
+    modelo, X, y, consultas = ajuste
+    cuantil = BosqueCuantil(BosquePlano(modelo), X, y)
+    orden = np.argsort(y, kind='stable')
+    np.testing.assert_allclose(cuantil.pesos(consultas),
+                               _pesos_referencia(modelo, X, consultas)[:, orden], atol=1e-12)
+
+
+@pytest.mark.parametrize('tope', [None, 1, 200])
+def test_cuantiles_por_bloques(ajuste, monkeypatch, tope):
+    modelo, X, y, consultas = ajuste
+    if tope is not None:
+        # Bloques de una consulta y grupos de uno o pocos árboles
+        monkeypatch.setattr('cuantiles.MAX_ELEMENTOS_LOTE', tope)
+    cuantil = BosqueCuantil(BosquePlano(modelo), X, y)
+    niveles = (0.025, 0.5, 0.975)
+    W = _pesos_referencia(modelo, X, consultas)
+    orden = np.argsort(y, kind='stable')
+    acumulado = np.cumsum(W[:, orden], axis=1)
+    esperado = np.column_stack([
+        y[orden][np.minimum(np.array([np.searchsorted(a, q - 1e-12) for a in acumulado]), len(y) - 1)]
+        for q in niveles])
+    np.testing.assert_array_equal(cuantil.cuantiles(consultas, niveles), esperado)
+    bajo, alto = cuantil.intervalo(consultas)
+    np.testing.assert_array_equal(bajo, esperado[:, 0])
+    np.testing.assert_array_equal(alto, esperado[:, 2])
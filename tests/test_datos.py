@@ -0,0 +1,159 @@
+"""Carga de datos: lectura por formato, decodificación de tratamientos, unión por clave entera y huellas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import datos
+from datos import (
+    COLUMNAS_CLOROFILA, COLUMNAS_NUTRIENTES, DATOS_CLOROFILA, DATOS_NUTRIENTES, FACTORES,
+    armonizar_niveles, cargar_fuentes, clave_tratamiento, decodificar_tratamientos,
+    huella_archivo, huella_union, leer_tabla, unir_tablas,
+)
+
+
+@pytest.fixture
+def tablas():
+    df = decodificar_tratamientos(pd.DataFrame(DATOS_CLOROFILA)[COLUMNAS_CLOROFILA])
+    df_nut = decodificar_tratamientos(pd.DataFrame(DATOS_NUTRIENTES)[COLUMNAS_NUTRIENTES])
+    return df, df_nut
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(datos, 'DIR_CACHE', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+# ── Decodificación ────────────────────────────────────────────────────────────
+def test_decodificar_tratamientos():
+    crudo = pd.DataFrame({'Tratamiento': ['Co.T.278', 'Ma.A.440', 'Co.T.278', 'Ca.P.168'],
+                          'Clorofila_a': [1.0, 2.0, 3.0, 4.0]})
+    df = decodificar_tratamientos(crudo)
+    assert list(df['Variedad']) == ['Co', 'Ma', 'Co', 'Ca']
+    assert list(df['Bioestimulante']) == ['T', 'A', 'T', 'P']
+    assert list(df['Radiacion']) == [278, 440, 278, 168]
+    assert df['Radiacion'].dtype == np.int16
+    assert isinstance(df['Variedad'].dtype, pd.CategoricalDtype)
+    assert df.attrs['niveles'] == {'Variedad': ['Ca', 'Co', 'Ma'],
+                                   'Bioestimulante': ['A', 'P', 'T'],
+                                   'Radiacion': [168, 278, 440]}
+    # No modifica la tabla de entrada
+    assert list(crudo.columns) == ['Tratamiento', 'Clorofila_a']
+
+
+@pytest.mark.parametrize('codigos, mensaje', [
+    (['Co.T.278', 'Co-T-278'], 'inválidos'),
+    (['Co.T.278', None], 'vacíos'),
+])
+def test_decodificar_rechaza_codigos(codigos, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        decodificar_tratamientos(pd.DataFrame({'Tratamiento': codigos}))
+
+
+# ── Clave entera y unión ──────────────────────────────────────────────────────
+def test_clave_tratamiento_identifica_la_combinacion(tablas):
+    df, df_nut = armonizar_niveles(*tablas)
+    niveles_rad = np.union1d(df['Radiacion'].unique(), df_nut['Radiacion'].unique())
+    clave_chl = clave_tratamiento(df, niveles_rad)
+    clave_nut = clave_tratamiento(df_nut, niveles_rad)
+    # Un tratamiento ↔ una clave, y la misma en las dos tablas
+    assert len(np.unique(clave_chl)) == df['Tratamiento'].nunique()
+    chl = dict(zip(df['Tratamiento'].astype(str), clave_chl))
+    nut = dict(zip(df_nut['Tratamiento'].astype(str), clave_nut))
+    comunes = set(chl) & set(nut)
+    assert comunes and all(chl[t] == nut[t] for t in comunes)
+    assert len(set(chl[t] for t in set(chl) - comunes) & set(nut.values())) == 0
+
+
+def test_unir_tablas_igual_a_merge(tablas, cache):
+    df, df_nut = tablas
+    df_full = unir_tablas(df, df_nut)
+
+    # Referencia: merge de pandas sobre las tres columnas de factores
+    texto = {f: str for f in ['Variedad', 'Bioestimulante']}
+    esperado = pd.merge(df.astype(texto), df_nut.astype(texto), on=FACTORES,
+                        suffixes=('_chl', '_nut'))
+    assert list(df_full.columns) == list(esperado.columns)
+    orden = ['Tratamiento_chl']
+    obtenido = df_full.astype(texto | {'Tratamiento_chl': str, 'Tratamiento_nut': str})
+    esperado = esperado.astype({'Tratamiento_chl': str, 'Tratamiento_nut': str})
+    pd.testing.assert_frame_equal(obtenido.sort_values(orden).reset_index(drop=True),
+                                  esperado.sort_values(orden).reset_index(drop=True),
+                                  check_dtype=False)
+    # Sin huella no se guarda nada
+    assert not cache.exists()
+
+
+def test_unir_tablas_sin_pareja(tablas, cache):
+    df, df_nut = tablas
+    df_full = unir_tablas(df, df_nut)
+    chl, nut = set(df['Tratamiento'].astype(str)), set(df_nut['Tratamiento'].astype(str))
+    sin_pareja = df_full.attrs['sin_pareja']
+    assert sorted(sin_pareja['clorofila']) == sorted(chl - nut)
+    assert sorted(sin_pareja['nutrientes']) == sorted(nut - chl)
+    assert len(df_full) == len(chl & nut)
+
+
+def test_unir_tablas_reutiliza_la_cache(tablas, cache, monkeypatch):
+    df, df_nut = tablas
+    huella = huella_union(None, None)
+    primera = unir_tablas(df, df_nut, huella=huella)
+    assert (cache / f'union_{huella}.parquet').exists()
+
+    # La segunda vez se lee el Parquet: no se vuelve a unir
+    def sin_merge(*args, **kwargs):
+        raise AssertionError("unir_tablas repitió la unión")
+    monkeypatch.setattr(pd.DataFrame, 'merge', sin_merge)
+    segunda = unir_tablas(df, df_nut, huella=huella)
+    pd.testing.assert_frame_equal(primera, segunda)
+    assert segunda.attrs['sin_pareja'] == primera.attrs['sin_pareja']
+
+
+# ── Lectura por formato ───────────────────────────────────────────────────────
+@pytest.mark.parametrize('ext', ['.parquet', '.feather', '.csv'])
+def test_leer_tabla_por_formato(tmp_path, ext):
+    tabla = pd.DataFrame(DATOS_NUTRIENTES)
+    ruta = str(tmp_path / f'nutrientes{ext}')
+    if ext == '.parquet':
+        tabla.to_parquet(ruta, index=False)
+    elif ext == '.feather':
+        tabla.to_feather(ruta)
+    else:
+        tabla.to_csv(ruta, index=False)
+
+    columnas = ['Tratamiento', 'Potasio']
+    leida = leer_tabla(ruta, columnas)
+    assert list(leida.columns) == columnas
+    assert isinstance(leida['Tratamiento'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(leida.astype({'Tratamiento': str}), tabla[columnas])
+
+    with pytest.raises(ValueError, match='Magnesio_x'):
+        leer_tabla(ruta, ['Tratamiento', 'Magnesio_x'])
+
+
+def test_leer_tabla_formato_no_soportado(tmp_path):
+    with pytest.raises(ValueError, match='Formato no soportado'):
+        leer_tabla(str(tmp_path / 'nutrientes.xlsx'), ['Tratamiento'])
+
+
+# ── Huellas ───────────────────────────────────────────────────────────────────
+def test_huellas_derivadas_de_las_fuentes(tmp_path, cache, monkeypatch):
+    ruta = tmp_path / 'clorofila.csv'
+    pd.DataFrame(DATOS_CLOROFILA).to_csv(ruta, index=False)
+
+    # No se hashea el contenido de cada tabla al cargar
+    def sin_hash(df):
+        raise AssertionError("cargar_fuentes hasheó el contenido")
+    monkeypatch.setattr(datos, 'huella_df', sin_hash)
+
+    df, df_nut, df_full = cargar_fuentes(huella_archivo(ruta), None)
+    assert df_full.attrs['huella'] == huella_union(huella_archivo(ruta), None)
+    huellas = [t.attrs['huella'] for t in (df, df_nut, df_full)]
+    assert len(set(huellas)) == 3
+
+    # Mismas fuentes, mismas huellas; otro archivo de clorofila solo cambia
+    # las de clorofila y la unión
+    assert [t.attrs['huella'] for t in cargar_fuentes(huella_archivo(ruta), None)] == huellas
+    embebidas = [t.attrs['huella'] for t in cargar_fuentes(None, None)]
+    assert embebidas[0] != huellas[0] and embebidas[2] != huellas[2]
+    assert embebidas[1] == huellas[1]
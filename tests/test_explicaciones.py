@@ -0,0 +1,69 @@
+"""TreeSHAP en lote frente a los valores de Shapley por fuerza bruta."""
+from itertools import combinations
+from math import factorial
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from bosque import BosquePlano
+from explicaciones import ExplicadorSHAP
+
+
+def _esperado(arbol, x, conocidas, nodo=0):
+    # E[f(x) | x_S] recorriendo el árbol y ponderando por cobertura fuera de S
+    izq, der = arbol.children_left[nodo], arbol.children_right[nodo]
+    if izq < 0:
+        return arbol.value[nodo, 0, 0]
+    if arbol.feature[nodo] in conocidas:
+        hijo = izq if x[arbol.feature[nodo]] <= arbol.threshold[nodo] else der
+        return _esperado(arbol, x, conocidas, hijo)
+    w = arbol.weighted_n_node_samples
+    return (w[izq] * _esperado(arbol, x, conocidas, izq)
+            + w[der] * _esperado(arbol, x, conocidas, der)) / w[nodo]
+
+
+def _shapley(modelo, x):
+    p = len(x)
+    arboles = [est.tree_ for est in modelo.estimators_]
+
+    def v(conocidas):
+        return np.mean([_esperado(a, x, conocidas) for a in arboles])
+
+    phi = np.zeros(p)
+    for i in range(p):
+        resto = [j for j in range(p) if j != i]
+        for k in range(p):
+            for S in combinations(resto, k):
+                peso = factorial(k) * factorial(p - k - 1) / factorial(p)
+                phi[i] += peso * (v(set(S) | {i}) - v(set(S)))
+    return phi, v(set())
+
+
+@pytest.fixture(scope='module')
+def ajuste():
+    rng = np.random.default_rng(3)
+    # Valores representables en float32, como compara sklearn
+    X = rng.normal(size=(80, 4)).astype(np.float32).astype(float)
+    y = X[:, 0] * X[:, 1] + X[:, 2] + 0.1 * rng.normal(size=80)
+    # Profundo para que las variables se repitan en los caminos
+    modelo = RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0, n_jobs=1).fit(X, y)
+    return modelo, X
+
+
+def test_igual_a_fuerza_bruta(ajuste):
+    modelo, X = ajuste
+    explicador = ExplicadorSHAP(BosquePlano(modelo))
+    phi = explicador.valores(X[:6])
+    for fila, x in zip(phi, X[:6]):
+        referencia, base = _shapley(modelo, x)
+        np.testing.assert_allclose(fila, referencia, rtol=1e-9, atol=1e-12)
+        assert explicador.base == pytest.approx(base, rel=1e-12)
+
+
+def test_exactitud_local_por_bloques(ajuste, monkeypatch):
+    modelo, X = ajuste
+    explicador = ExplicadorSHAP(BosquePlano(modelo))
+    monkeypatch.setattr('explicaciones.MAX_ELEMENTOS_LOTE', 1)      # una fila por bloque
+    phi = explicador.valores(X)
+    np.testing.assert_allclose(explicador.base + phi.sum(axis=1), modelo.predict(X), atol=1e-12)
@@ -0,0 +1,144 @@
+"""GrafoCalculo: claves por contenido, invalidación aguas abajo, tiempos y cálculos en curso."""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from grafo import GrafoCalculo
+
+
+@pytest.fixture
+def grafo():
+    # a ← df, b ← a, c ← df (independiente de a); llamadas registradas por nodo
+    g = GrafoCalculo()
+    g.llamadas = []
+    g.fuente('df')
+
+    @g.nodo(dependencias=('df',), parametros=('factor',))
+    def a(df, factor=2):
+        g.llamadas.append('a')
+        return df['x'].sum() * factor
+
+    @g.nodo(dependencias=('a',))
+    def b(valor_a):
+        g.llamadas.append('b')
+        return valor_a + 1
+
+    @g.nodo(dependencias=('df',))
+    def c(df):
+        g.llamadas.append('c')
+        return len(df)
+
+    return g
+
+
+def _df(valores, huella=None):
+    df = pd.DataFrame({'x': valores})
+    if huella:
+        df.attrs['huella'] = huella
+    return df
+
+
+def test_clave_por_contenido(grafo):
+    assert grafo.valor('b', df=_df([1, 2])) == 7
+    # Otro objeto con el mismo contenido: misma clave, sin recalcular
+    assert grafo.clave('b', {'df': _df([1, 2])}) == grafo.clave('b', {'df': _df([1, 2])})
+    assert grafo.valor('b', df=_df([1, 2])) == 7
+    assert grafo.llamadas == ['a', 'b']
+    # Contenido o parámetro distinto: otra clave
+    assert grafo.clave('b', {'df': _df([1, 3])}) != grafo.clave('b', {'df': _df([1, 2])})
+    assert grafo.valor('b', df=_df([1, 2]), factor=3) == 10
+    # La huella en attrs reemplaza al hash del contenido
+    assert grafo.clave('a', {'df': _df([1], 'h1')}) == grafo.clave('a', {'df': _df([5], 'h1')})
+
+
+def test_solo_se_recalcula_aguas_abajo_del_cambio(grafo):
+    df = _df([1, 2])
+    grafo.valor('b', df=df)
+    grafo.valor('c', df=df)
+    grafo.llamadas.clear()
+    # Cambia solo el parámetro de `a`: se recalculan a y b, no c
+    grafo.valor('b', df=df, factor=5)
+    grafo.valor('c', df=df, factor=5)
+    assert grafo.llamadas == ['a', 'b']
+
+    grafo.llamadas.clear()
+    grafo.invalidar('a')
+    assert grafo.dependientes('a') == {'b'}
+    grafo.valor('b', df=df)
+    grafo.valor('c', df=df)
+    assert grafo.llamadas == ['a', 'b']
+
+
+def test_tiempos_por_nodo(grafo):
+    df = _df([1, 2])
+    grafo.valor('b', df=df)
+    grafo.valor('b', df=df)
+    tiempos = grafo.tiempos()
+    assert tiempos.loc['b', ['calculos', 'aciertos']].tolist() == [1, 1]
+    assert tiempos.loc['a', ['calculos', 'aciertos']].tolist() == [1, 0]
+    assert tiempos.loc['c', 'calculos'] == 0
+    assert tiempos.loc['b', 'dependencias'] == 'a'
+    assert tiempos.loc['a', 'total_s'] >= tiempos.loc['a', 'ultimo_s'] >= 0
+
+
+def test_nodo_pendiente_no_se_guarda():
+    g = GrafoCalculo()
+    g.fuente('df')
+    listo = []
+
+    @g.nodo(dependencias=('df',))
+    def modelo(df):
+        return 'artefacto' if listo else None
+
+    @g.nodo(dependencias=('modelo',))
+    def resumen(artefacto):
+        return artefacto.upper()
+
+    assert g.valor('resumen', df=_df([1])) is None
+    listo.append(True)
+    assert g.valor('resumen', df=_df([1])) == 'ARTEFACTO'
+    assert g.tiempos().loc['resumen', 'pendientes'] == 1
+
+
+def test_una_clave_fria_se_calcula_una_vez():
+    g = GrafoCalculo()
+    g.fuente('df')
+    calculos = []
+
+    @g.nodo(dependencias=('df',))
+    def lento(df):
+        calculos.append(threading.get_ident())
+        time.sleep(0.2)
+        return len(df)
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(g.valor('lento', df=_df([1, 2]))))
+             for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert resultados == [2] * 4 and len(calculos) == 1
+    assert g.tiempos().loc['lento', ['calculos', 'aciertos']].tolist() == [1, 3]
+
+
+def test_fuente_obtenida_invalida_aguas_abajo():
+    g = GrafoCalculo()
+    g.fuente('df')
+    registro = {'version': 'v1'}
+    g.fuente('version', obtener=lambda entradas: registro['version'])
+
+    @g.nodo(dependencias=('df', 'version'))
+    def modelo(df, version):
+        return f"{version}:{len(df)}"
+
+    df = _df([1, 2, 3])
+    assert g.valor('modelo', df=df) == 'v1:3'
+    assert g.valor('modelo', df=df) == 'v1:3'
+    registro['version'] = 'v2'            # versión nueva en el registro
+    assert g.valor('modelo', df=df) == 'v2:3'
+    assert g.tiempos().loc['modelo', 'calculos'] == 2
+    with pytest.raises(KeyError):
+        g.valor('modelo')                 # falta df
@@ -0,0 +1,48 @@
+"""importancia_permutacion (y BosquePlano) frente a sklearn."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.inspection import permutation_importance
+
+from bosque import BosquePlano
+from importancia import importancia_permutacion
+
+
+@pytest.fixture(scope='module')
+def ajuste():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, 5))
+    y = 2 * X[:, 0] + X[:, 1] ** 2 + 0.1 * rng.normal(size=40)
+    modelo = RandomForestRegressor(n_estimators=20, max_depth=4, min_samples_leaf=2,
+                                   random_state=42, n_jobs=1).fit(X, y)
+    return modelo, X, y
+
+
+def test_predicciones_iguales_a_sklearn(ajuste):
+    modelo, X, _ = ajuste
+    bosque = BosquePlano(modelo)
+    np.testing.assert_allclose(bosque.predecir(X), modelo.predict(X), rtol=1e-12)
+    arboles = np.column_stack([est.predict(X) for est in modelo.estimators_])
+    np.testing.assert_allclose(bosque.predecir_arboles(X), arboles, rtol=1e-12)
+
+
+def test_importancia_igual_a_permutation_importance(ajuste, monkeypatch):
+    modelo, X, y = ajuste
+    # Bloques pequeños: también se ejercita el reparto del lote
+    monkeypatch.setattr('importancia.MAX_ELEMENTOS_LOTE', 3 * len(y) * modelo.n_estimators)
+    nombres = [f'x{j}' for j in range(X.shape[1])]
+    propia = importancia_permutacion(BosquePlano(modelo), X, y, nombres,
+                                     n_repeticiones=7, semilla=42).set_index('Feature')
+    referencia = permutation_importance(modelo, X, y, n_repeats=7, random_state=42, n_jobs=1)
+    np.testing.assert_allclose(propia.loc[nombres, 'Importancia_media'],
+                               referencia.importances_mean, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(propia.loc[nombres, 'Importancia_std'],
+                               referencia.importances_std, rtol=1e-10, atol=1e-12)
+
+
+def test_grupo_una_sola_fila(ajuste):
+    modelo, X, y = ajuste
+    nombres = [f'x{j}' for j in range(X.shape[1])]
+    imp = importancia_permutacion(BosquePlano(modelo), X, y, nombres, n_repeticiones=3,
+                                  grupos={'x0+x1': [0, 1]})
+    assert sorted(imp['Feature']) == ['x0+x1', 'x2', 'x3', 'x4']
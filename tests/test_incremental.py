@@ -0,0 +1,113 @@
+"""Reentrenamiento incremental: filas agregadas, deriva y vuelta a la búsqueda completa."""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import modelo
+from modelo import UMBRAL_DERIVA, actualizar_modelo_rf, filas_agregadas, preparar_features
+from recursos import PresupuestoCPU
+
+PARAMS = {'n_estimators': 20, 'max_depth': 3, 'min_samples_leaf': 2}
+
+
+def _df_full(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        'Variedad': rng.choice(['Co.P', 'Co.S'], n),
+        'Bioestimulante': rng.choice(['B0', 'B1', 'B2'], n),
+        'Radiacion': rng.choice([168, 278, 440], n),
+    })
+    for columna in ('Clorofila_a', 'Clorofila_b', 'Nitrogeno', 'Fosforo', 'Potasio',
+                    'Calcio', 'Magnesio'):
+        df[columna] = rng.normal(1.0, 0.1, n)
+    df['Clorofila_total'] = df['Clorofila_a'] + df['Clorofila_b']
+    return df
+
+
+def _previo(df, mse_mean=1.0):
+    X, y, feature_cols, _, le_var, le_bio = preparar_features(df)
+    rf = RandomForestRegressor(random_state=42, n_jobs=1, **PARAMS).fit(X, y)
+    metricas = {'mse_mean': mse_mean, 'best_params': PARAMS, 'motor': 'warm-start'}
+    imp_df = pd.DataFrame({'Feature': ['previa']})
+    lc_df = pd.DataFrame({'train_size': [len(y)]})
+    meta = {'le_var': le_var, 'le_bio': le_bio, 'feature_cols': feature_cols}
+    return rf, X, y, rf.predict(X), rf.predict(X), metricas, imp_df, lc_df, meta
+
+
+@pytest.fixture
+def sin_busqueda(monkeypatch):
+    # La búsqueda completa se sustituye por un marcador: solo importa que se elija
+    monkeypatch.setattr(modelo, 'entrenar_modelo_rf', lambda df_full, motor, presupuesto: 'completo')
+
+
+# ── filas_agregadas ───────────────────────────────────────────────────────────
+
+def test_filas_agregadas_detecta_las_nuevas():
+    X, y = preparar_features(_df_full(30))[:2]
+    orden = np.r_[np.arange(30)[::-1], 3, 7]             # reordenadas, con dos filas repetidas
+    nuevas = filas_agregadas(X, y, X[orden], y[orden])
+    assert nuevas.tolist() == [False] * 30 + [True, True]
+
+
+def test_filas_agregadas_con_una_fila_cambiada():
+    X, y = preparar_features(_df_full(30))[:2]
+    y2 = y.copy()
+    y2[4] += 0.5
+    assert filas_agregadas(X, y, X, y2) is None
+    assert filas_agregadas(X, y, X[1:], y[1:]) is None     # fila borrada
+
+
+# ── actualizar_modelo_rf ──────────────────────────────────────────────────────
+
+def test_filas_agregadas_crecen_el_bosque(sin_busqueda):
+    df = _df_full(40)
+    previo = _previo(df.iloc[:30])
+    artefacto, info = actualizar_modelo_rf(df, previo, presupuesto=PresupuestoCPU(cpus=1))
+    extra = int(np.ceil(PARAMS['n_estimators'] * 10 / 30))
+    assert info['modo'] == 'incremental' and info['filas_nuevas'] == 10
+    assert info['arboles_nuevos'] == extra
+    bosque = artefacto[0]
+    assert bosque.n_estimators == len(bosque.estimators_) == PARAMS['n_estimators'] + extra
+    # Los árboles anteriores se conservan y el previo no se modifica
+    for viejo, nuevo in zip(previo[0].estimators_, bosque.estimators_):
+        np.testing.assert_array_equal(viejo.tree_.threshold, nuevo.tree_.threshold)
+    assert len(previo[0].estimators_) == PARAMS['n_estimators']
+    assert artefacto[5]['incremental'] and artefacto[5]['best_params'] == PARAMS
+    assert len(artefacto[4]) == 40 and np.isfinite(artefacto[4]).all()     # OOF de la nueva CV
+    # Importancia y curva conservadas y pendientes
+    meta = artefacto[8]
+    assert meta['pendientes'] == ('importancia', 'curva') and meta['filas_importancia'] == 30
+    assert artefacto[6] is previo[6] and artefacto[7] is previo[7]
+
+
+def test_fila_anterior_cambiada_entrena_desde_cero(sin_busqueda):
+    df = _df_full(40)
+    previo = _previo(df.iloc[:30])
+    df.loc[2, 'Clorofila_a'] += 1.0
+    artefacto, info = actualizar_modelo_rf(df, previo)
+    assert artefacto == 'completo' and info['modo'] == 'completo'
+
+
+def test_nivel_nuevo_entrena_desde_cero(sin_busqueda):
+    df = _df_full(40)
+    previo = _previo(df.iloc[:30])
+    df.loc[35, 'Bioestimulante'] = 'B3'
+    artefacto, info = actualizar_modelo_rf(df, previo)
+    assert artefacto == 'completo' and info['motivo'] == 'filas o niveles modificados'
+
+
+def test_deriva_sobre_el_umbral_repite_la_busqueda(sin_busqueda):
+    df = _df_full(40)
+    # MSE de CV diminuto: el error en las filas nuevas es muchas veces mayor
+    previo = _previo(df.iloc[:30], mse_mean=1e-9)
+    artefacto, info = actualizar_modelo_rf(df, previo)
+    assert info['deriva'] > UMBRAL_DERIVA
+    assert artefacto == 'completo' and info['motivo'] == 'deriva sobre el umbral'
+
+
+def test_sin_cambios_devuelve_el_previo(sin_busqueda):
+    df = _df_full(30)
+    previo = _previo(df)
+    artefacto, info = actualizar_modelo_rf(df.sample(frac=1, random_state=1), previo)
+    assert artefacto is previo and info == {'modo': 'sin cambios', 'filas_nuevas': 0}
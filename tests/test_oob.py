@@ -0,0 +1,49 @@
+"""Predicciones out-of-bag y out-of-fold sin reajustes, frente a sklearn."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import GridSearchCV, KFold, cross_val_predict
+
+from busqueda import BusquedaWarmStart
+from modelo import METRICAS_CV, evaluar_cv, predicciones_oob
+
+
+@pytest.fixture(scope='module')
+def datos():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(36, 4))
+    y = X[:, 0] - X[:, 2] + 0.2 * rng.normal(size=36)
+    return X, y
+
+
+def test_oob_igual_a_oob_prediction(datos):
+    X, y = datos
+    modelo = RandomForestRegressor(n_estimators=40, max_depth=3, random_state=0, n_jobs=1,
+                                   oob_score=True).fit(X, y)
+    np.testing.assert_allclose(predicciones_oob(modelo, X), modelo.oob_prediction_, rtol=1e-12)
+
+
+def test_oob_sin_bootstrap():
+    modelo = RandomForestRegressor(n_estimators=2, bootstrap=False).fit([[0.0], [1.0]], [0.0, 1.0])
+    with pytest.raises(ValueError):
+        predicciones_oob(modelo, np.array([[0.0], [1.0]]))
+
+
+def test_oof_warm_start_igual_a_cross_val_predict(datos):
+    X, y = datos
+    cv = KFold(n_splits=4, shuffle=True, random_state=42)
+    base = RandomForestRegressor(random_state=42, n_jobs=1)
+    rejilla = {'n_estimators': [10, 20], 'max_depth': [2, 3]}
+    busqueda = BusquedaWarmStart(base, rejilla, cv=cv, scoring=METRICAS_CV, refit='mse',
+                                 n_jobs=1).fit(X, y)
+    referencia = GridSearchCV(base, rejilla, cv=cv, scoring=METRICAS_CV, refit='mse').fit(X, y)
+    assert busqueda.best_params_ == referencia.best_params_
+
+    ganador = base.set_params(**busqueda.best_params_)
+    np.testing.assert_allclose(busqueda.predicciones_oof_,
+                               cross_val_predict(ganador, X, y, cv=cv), rtol=1e-12)
+    # evaluar_cv reutiliza la búsqueda sin volver a ajustar
+    folds, oof = evaluar_cv(ganador, X, y, cv, busqueda=busqueda, n_jobs=1)
+    np.testing.assert_array_equal(oof, busqueda.predicciones_oof_)
+    np.testing.assert_allclose(folds['r2'], [referencia.cv_results_[f'split{k}_test_r2'][
+        referencia.best_index_] for k in range(4)], rtol=1e-12)
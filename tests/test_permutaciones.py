@@ -0,0 +1,44 @@
+"""ANOVA por permutaciones: F observada de statsmodels, bloques acotados y reproducibilidad."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import permutaciones
+from anova import anova_multirespuesta
+from permutaciones import _contar_bloque, anova_permutaciones, preparar_permutaciones
+
+
+@pytest.fixture(scope='module')
+def datos():
+    rng = np.random.default_rng(5)
+    n = 40
+    df = pd.DataFrame({'A': rng.choice(['a1', 'a2', 'a3'], n), 'B': rng.choice(['b1', 'b2'], n)})
+    df['Y'] = (df['A'] == 'a2') * 1.0 + rng.normal(size=n)
+    return df
+
+
+def test_f_observada(datos):
+    problema = preparar_permutaciones(datos, 'Y', ['A', 'B'])
+    tabla = anova_multirespuesta(datos, ['Y'], ['A', 'B'])['Y']
+    np.testing.assert_allclose(problema['F'], tabla.loc[problema['terminos'], 'F'], rtol=1e-10)
+
+
+def test_bloque_acotado_por_n():
+    assert permutaciones.tamano_bloque(20) == permutaciones.TAMANO_BLOQUE
+    assert permutaciones.tamano_bloque(100_000) * 100_000 <= permutaciones.MAX_ELEMENTOS_BLOQUE
+    assert permutaciones.tamano_bloque(10 ** 9) == 1
+
+
+def test_conteo_en_rango(datos):
+    # Un bloque de permutaciones válidas: el conteo está en [0, B]
+    problema = preparar_permutaciones(datos, 'Y', ['A', 'B'])
+    conteo = _contar_bloque(problema, np.random.SeedSequence(0), 50)
+    assert ((conteo >= 0) & (conteo <= 50)).all()
+
+
+def test_reproducible_sin_importar_procesos(datos, monkeypatch):
+    monkeypatch.setattr(permutaciones, 'TAMANO_BLOQUE', 100)       # varios bloques
+    uno = anova_permutaciones(datos, 'Y', ['A', 'B'], n_permutaciones=500, semilla=1, n_procesos=1)
+    dos = anova_permutaciones(datos, 'Y', ['A', 'B'], n_permutaciones=500, semilla=1, n_procesos=2)
+    pd.testing.assert_series_equal(uno['PR(perm)'], dos['PR(perm)'])
+    assert uno.loc['C(A)', 'PR(perm)'] == pytest.approx(uno.loc['C(A)', 'PR(>F)'], abs=0.05)
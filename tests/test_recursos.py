@@ -0,0 +1,53 @@
+"""PresupuestoCPU: reparto entre paralelismo externo e interno, topes por etapa y $DASHBOARD_CPUS."""
+import pytest
+
+import recursos
+from recursos import ETAPAS, PresupuestoCPU, cpus_disponibles
+
+
+@pytest.mark.parametrize('cpus', [1, 2, 3, 4, 7, 16, 64])
+def test_reparto_no_sobresuscribe(cpus):
+    presupuesto = PresupuestoCPU(cpus=cpus, limites={'cv': 3, 'curva': 1})
+    for etapa in ETAPAS:
+        tope = presupuesto.cpus_etapa(etapa)
+        for n_tareas in (0, 1, 2, 5, 10, 100):
+            externos, internos = presupuesto.reparto(etapa, n_tareas)
+            assert externos >= 1 and internos >= 1
+            assert externos * internos <= tope
+            # Con tareas de sobra, el paralelismo va entero afuera
+            if n_tareas >= tope:
+                assert (externos, internos) == (tope, 1)
+
+
+def test_reparto_pocas_tareas_deja_nucleos_a_los_bosques():
+    presupuesto = PresupuestoCPU(cpus=16)
+    assert presupuesto.reparto('cv', 5) == (5, 3)
+    assert presupuesto.reparto('busqueda', 1) == (1, 16)
+
+
+def test_limites_bajan_solo_su_etapa():
+    presupuesto = PresupuestoCPU(cpus=16, limites={'importancia': 4, 'bootstrap': 32})
+    assert presupuesto.cpus_etapa('importancia') == 4
+    assert presupuesto.reparto('importancia', 10) == (4, 1)
+    # Un tope mayor que el total no lo supera, y el resto de etapas no cambia
+    assert presupuesto.cpus_etapa('bootstrap') == 16
+    assert presupuesto.cpus_etapa('cv') == 16
+
+
+def test_etapa_desconocida():
+    with pytest.raises(ValueError, match='Etapas desconocidas'):
+        PresupuestoCPU(cpus=4, limites={'entrenamiento': 2})
+
+
+def test_dashboard_cpus_acota(monkeypatch):
+    monkeypatch.setattr(recursos, 'cpu_count', lambda: 8)
+    monkeypatch.delenv(recursos.ENV_CPUS, raising=False)
+    assert cpus_disponibles() == 8
+    monkeypatch.setenv(recursos.ENV_CPUS, '3')
+    assert cpus_disponibles() == 3
+    assert PresupuestoCPU().cpus == 3
+    # No puede pedir más núcleos de los que hay, ni menos de uno
+    monkeypatch.setenv(recursos.ENV_CPUS, '32')
+    assert cpus_disponibles() == 8
+    monkeypatch.setenv(recursos.ENV_CPUS, '0')
+    assert cpus_disponibles() == 1
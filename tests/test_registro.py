@@ -0,0 +1,77 @@
+"""Registro de modelos: escritura atómica, listado y carga con memory-map."""
+import json
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+import registro
+from modelo import CAMPOS_ARTEFACTO
+
+
+def _artefacto(n=50, semilla=0):
+    rng = np.random.default_rng(semilla)
+    contenido = {campo: None for campo in CAMPOS_ARTEFACTO}
+    contenido.update(
+        best_model={'bosque': semilla},
+        X=rng.normal(size=(n, 3)),
+        y=rng.normal(size=n),
+        metricas={'r2_mean': np.float64(0.5), 'best_params': {'max_depth': np.int64(3)}},
+        meta={'feature_cols': ['a', 'b', 'c']},
+    )
+    return tuple(contenido[campo] for campo in CAMPOS_ARTEFACTO)
+
+
+def test_guardar_y_cargar(tmp_path):
+    artefacto = _artefacto()
+    manifiesto = registro.guardar(artefacto, 'h1', directorio=str(tmp_path), origen='test')
+    assert manifiesto['huella_datos'] == 'h1' and manifiesto['n_obs'] == 50
+    assert manifiesto['origen'] == 'test'
+    # Métricas con tipos de NumPy → JSON nativo
+    with open(os.path.join(manifiesto['ruta'], 'manifiesto.json'), encoding='utf-8') as f:
+        assert json.load(f)['metricas'] == {'r2_mean': 0.5, 'best_params': {'max_depth': 3}}
+
+    cargado = registro.cargar_ultimo('h1', directorio=str(tmp_path))
+    X = cargado[CAMPOS_ARTEFACTO.index('X')]
+    assert isinstance(X, np.memmap)                      # sin compresión: memory-map
+    np.testing.assert_array_equal(X, artefacto[CAMPOS_ARTEFACTO.index('X')])
+    assert cargado[0] == {'bosque': 0}
+
+
+def test_ultimo_compatible(tmp_path, monkeypatch):
+    d = str(tmp_path)
+    viejo = registro.guardar(_artefacto(semilla=1), 'h1', directorio=d)
+    otro = registro.guardar(_artefacto(semilla=2), 'h2', directorio=d)
+    assert [m['nombre'] for m in registro.listar(d)] == [otro['nombre'], viejo['nombre']]
+    assert registro.ultimo_manifiesto('h1', d)['nombre'] == viejo['nombre']
+    assert registro.ultimo_manifiesto(None, d)['nombre'] == otro['nombre']
+    assert registro.ultimo_manifiesto('h3', d) is None
+    # Otra versión del esquema: ya no es compatible
+    monkeypatch.setattr(registro, 'VERSION_ESQUEMA', registro.VERSION_ESQUEMA + 1)
+    assert registro.cargar_ultimo(None, d) is None
+
+
+def test_escritura_fallida_no_deja_rastro(tmp_path, monkeypatch):
+    def fallar(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(joblib, 'dump', fallar)
+    with pytest.raises(OSError):
+        registro.guardar(_artefacto(), 'h1', directorio=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_listar_ignora_directorios_en_escritura_y_ajenos(tmp_path):
+    d = str(tmp_path)
+    guardado = registro.guardar(_artefacto(), 'h1', directorio=d)
+    # Un `guardar` a medio camino (con manifiesto ya escrito) y basura ajena
+    for nombre in ('.rf-en-curso.tmp', 'rf-otro.tmp'):
+        os.makedirs(os.path.join(d, nombre))
+        with open(os.path.join(d, nombre, 'manifiesto.json'), 'w') as f:
+            json.dump({'creado': 1e12}, f)
+    os.makedirs(os.path.join(d, 'sin-manifiesto'))
+    with open(os.path.join(d, 'suelto.txt'), 'w') as f:
+        f.write('x')
+    assert [m['nombre'] for m in registro.listar(d)] == [guardado['nombre']]
+    assert registro.listar(os.path.join(d, 'no-existe')) == []
@@ -0,0 +1,75 @@
+"""Superficie de respuesta adaptativa: teselado, resolución y escala de los ejes."""
+import numpy as np
+import pytest
+
+from datos import cargar_fuentes
+from modelo import preparar_features
+from superficie import refinar_superficie
+
+
+@pytest.fixture(scope='module')
+def contexto():
+    df_full = cargar_fuentes(None, None)[2]
+    _, _, feature_cols, _, le_var, le_bio = preparar_features(df_full)
+    meta = {'feature_cols': feature_cols, 'le_var': le_var, 'le_bio': le_bio}
+    niveles = df_full.attrs['niveles']
+    return df_full, meta, niveles['Variedad'][0], niveles['Bioestimulante'][0]
+
+
+def _niveles(contexto, predecir, **kwargs):
+    df_full, meta, variedad, bio = contexto
+    opciones = dict(eje_x='Radiacion', eje_y='Potasio', limites_x=(100.0, 500.0),
+                    limites_y=(0.0, 4.0), resolucion=64, inicial=8)
+    return list(refinar_superficie(predecir, df_full, meta, variedad, bio, **{**opciones, **kwargs}))
+
+
+def _escalon(columnas):
+    # Salto en PAR = 310, fuera de los bordes de la rejilla (la columna es PAR / 440)
+    return lambda X: (X[:, columnas['Radiacion_norm']] > 310 / 440.0).astype(float)
+
+
+def test_teselas_cubren_el_dominio_en_cada_nivel(contexto):
+    columnas = {c: i for i, c in enumerate(contexto[1]['feature_cols'])}
+    niveles = _niveles(contexto, _escalon(columnas))
+    assert len(niveles) > 1
+    for teselas in niveles:
+        area = ((teselas['x1'] - teselas['x0']) * (teselas['y1'] - teselas['y0'])).sum()
+        assert area == pytest.approx(400.0 * 4.0)
+        assert (teselas['x0'] >= 100).all() and (teselas['x1'] <= 500).all()
+
+
+def test_refina_solo_donde_cambia(contexto):
+    columnas = {c: i for i, c in enumerate(contexto[1]['feature_cols'])}
+    final = _niveles(contexto, _escalon(columnas))[-1]
+    finas = final[final['nivel'] == final['nivel'].max()]
+    # Resolución final alcanzada junto al salto, y solo ahí
+    assert np.allclose(finas['x1'] - finas['x0'], 400.0 / 64)
+    assert ((finas['x0'] <= 310 + 400 / 8) & (finas['x1'] >= 310 - 400 / 8)).all()
+    lejanas = final[(final['x1'] < 200) | (final['x0'] > 400)]
+    assert (lejanas['nivel'] == 0).all()
+    # El valor de cada tesela es la predicción en su centro
+    centro = (final['x0'] + final['x1']) / 2
+    np.testing.assert_array_equal(final['Clorofila_predicha'], (centro > 310).astype(float))
+
+
+def test_superficie_plana_no_se_subdivide(contexto):
+    niveles = _niveles(contexto, lambda X: np.ones(len(X)))
+    assert len(niveles) == 1 and len(niveles[0]) == 8 * 8
+
+
+def test_ejes_en_las_columnas_del_modelo(contexto):
+    columnas = {c: i for i, c in enumerate(contexto[1]['feature_cols'])}
+    vistos = []
+
+    def predecir(X):
+        vistos.append(X.copy())
+        return np.zeros(len(X))
+
+    teselas = _niveles(contexto, predecir)[0]
+    X = vistos[0]
+    np.testing.assert_allclose(X[:, columnas['Radiacion_norm']] * 440,
+                               (teselas['x0'] + teselas['x1']) / 2)
+    np.testing.assert_allclose(X[:, columnas['Potasio']], (teselas['y0'] + teselas['y1']) / 2)
+    # El resto de columnas es el perfil fijo del tratamiento
+    otras = [i for c, i in columnas.items() if c not in ('Radiacion_norm', 'Potasio')]
+    assert (X[:, otras] == X[0, otras]).all()
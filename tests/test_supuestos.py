@@ -0,0 +1,56 @@
+"""supuestos.pruebas_supuestos frente a scipy.stats, prueba por prueba."""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from supuestos import pruebas_supuestos
+
+
+@pytest.fixture(scope='module')
+def datos():
+    rng = np.random.default_rng(0)
+    n = 60
+    df = pd.DataFrame({
+        'Factor': rng.choice(['a', 'b', 'c'], n),
+        'Bloque': rng.choice(['x', 'y'], n),
+        'V1': rng.normal(size=n),
+        'V2': rng.exponential(size=n),
+    })
+    df.loc[[3, 17], 'V2'] = np.nan            # faltantes por variable
+    return df
+
+
+def _valores(df, variable, **filtros):
+    for columna, nivel in filtros.items():
+        df = df[df[columna] == nivel]
+    return df[variable].dropna().to_numpy()
+
+
+def test_shapiro_por_grupo(datos):
+    res = pruebas_supuestos(datos, ['V1', 'V2'], agrupaciones=(None, 'Factor'), pruebas=('shapiro',))
+    assert len(res) == 2 * (1 + 3)
+    for fila in res.itertuples():
+        filtro = {} if fila.Agrupacion == 'Todos' else {'Factor': fila.Grupo}
+        W, p = stats.shapiro(_valores(datos, fila.Variable, **filtro))
+        # swilk de scipy usa algunas constantes en precisión simple
+        assert fila.Estadistico == pytest.approx(W, abs=1e-8)
+        assert fila.p_valor == pytest.approx(p, abs=1e-7)
+
+
+@pytest.mark.parametrize('prueba, referencia', [
+    ('levene', lambda *g: stats.levene(*g, center='mean')),
+    ('brown-forsythe', lambda *g: stats.levene(*g, center='median')),
+    ('bartlett', stats.bartlett),
+])
+def test_homogeneidad_por_subconjunto(datos, prueba, referencia):
+    res = pruebas_supuestos(datos, ['V1', 'V2'], agrupaciones=('Factor',), subconjunto='Bloque',
+                            pruebas=(prueba,))
+    assert len(res) == 2 * 2
+    for fila in res.itertuples():
+        grupos = [_valores(datos, fila.Variable, Bloque=fila.Subconjunto, Factor=nivel)
+                  for nivel in ('a', 'b', 'c')]
+        estadistico, p = referencia(*grupos)
+        assert fila.n == sum(len(g) for g in grupos)
+        assert fila.Estadistico == pytest.approx(estadistico, rel=1e-10)
+        assert fila.p_valor == pytest.approx(p, rel=1e-9)
@@ -0,0 +1,85 @@
+"""Planificador: avance reportado desde el proceso, cancelación y reintento de trabajos fallidos."""
+import time
+
+import pytest
+
+from trabajos import Planificador
+
+
+def _contar(n, progreso=None):
+    for i in range(n):
+        if progreso:
+            progreso(i + 1, n)
+    return n
+
+
+def _lento(n, progreso=None, cancelado=None):
+    # Un paso de 50 ms por iteración: n=200 tardaría 10 s sin cancelar
+    for i in range(n):
+        if cancelado():
+            return None
+        time.sleep(0.05)
+        progreso(i + 1, n)
+    return n
+
+
+def _fallar():
+    raise RuntimeError("falla a propósito")
+
+
+def _esperar(trabajo, limite=30):
+    inicio = time.time()
+    while not trabajo.terminado and time.time() - inicio < limite:
+        time.sleep(0.05)
+    return trabajo
+
+
+@pytest.fixture
+def planificador():
+    p = Planificador(max_procesos=1, hilos_por_trabajo=1)
+    yield p
+    p.cerrar()
+
+
+def test_avance_desde_el_proceso(planificador):
+    trabajo = _esperar(planificador.enviar('contar', _contar, 7))
+    assert trabajo.estado == 'listo' and trabajo.resultado == 7
+    assert trabajo.avance() == (7, 7)
+    # La ranura se reutiliza y arranca en cero
+    otro = _esperar(planificador.enviar('otro', _contar, 3))
+    assert otro.avance() == (3, 3)
+
+
+def test_sin_parametro_progreso_no_hay_avance(planificador):
+    trabajo = _esperar(planificador.enviar('suma', sum, [1, 2, 3]))
+    assert trabajo.resultado == 6 and trabajo.avance() is None
+
+
+def test_reenvia_trabajo_fallido(planificador):
+    fallido = _esperar(planificador.enviar('f', _fallar))
+    assert fallido.estado == 'error'
+    assert planificador.enviar('f', _fallar) is not fallido
+    listo = _esperar(planificador.enviar('c', _contar, 1))
+    assert planificador.enviar('c', _contar, 1) is listo
+
+
+def test_cancelar_libera_el_proceso(planificador):
+    trabajo = planificador.enviar('lento', _lento, 200)
+    inicio = time.time()
+    while trabajo.avance() is None:
+        time.sleep(0.02)
+    planificador.cancelar('lento')
+    # Sigue ocupando el proceso hasta que la función vuelve: no se duplica
+    assert trabajo.estado == 'cancelando' and not trabajo.terminado
+    assert planificador.enviar('lento', _lento, 200) is trabajo
+
+    _esperar(trabajo)
+    assert trabajo.estado == 'cancelado' and trabajo.resultado is None
+    assert time.time() - inicio < 5
+    assert planificador.info()['procesos_ocupados'] == 0
+    hechas, total = trabajo.avance()
+    assert hechas < total == 200
+    # La ranura queda libre y sin la bandera de cancelación
+    nuevo = planificador.enviar('lento', _lento, 2)
+    assert nuevo is not trabajo
+    assert _esperar(nuevo).resultado == 2
@@ -0,0 +1,277 @@
+"""
+Planificador de trabajos pesados en segundo plano.
+
+Streamlit ejecuta el script completo en cada interacción y en el hilo de la
+sesión: un entrenamiento o una prueba por permutaciones dejaban al visitante
+frente al spinner, y dos sesiones a la vez competían por todos los núcleos.
+
+`Planificador` recibe los trabajos de las pestañas y los corre en un pool de
+procesos:
+
+- Cola acotada: a lo sumo `max_cola` trabajos esperando; si se llena,
+  `enviar` lanza `ColaLlena` en lugar de acumular trabajo sin límite.
+- Deduplicación: los trabajos se identifican por una clave (p. ej. tipo +
+  huella de los datos + parámetros). Pedir una clave que ya está en cola,
+  corriendo o terminada devuelve el mismo `Trabajo`, aunque lo pida otra sesión.
+- Tope de CPU: nunca hay más de `max_procesos` trabajos corriendo, y cada
+  proceso limita sus hilos (joblib/BLAS) a `hilos_por_trabajo` (por defecto
+  el presupuesto de recursos.py repartido entre los procesos).
+- Avance: si la función tiene un parámetro `progreso` y no se le pasa uno,
+  recibe `progreso(hechas, total)`, que escribe en una ranura de memoria
+  compartida con el proceso de la app; `Trabajo.avance()` la lee.
+- Cancelación: si la función tiene un parámetro `cancelado`, recibe
+  `cancelado()`, que pasa a True cuando se cancela el trabajo; la función lo
+  consulta entre bloques y termina antes. El proceso sigue ocupado (y el
+  trabajo en 'cancelando') hasta que la función retorna.
+
+La app envía el trabajo, dibuja un marcador de posición y consulta el estado
+en los reruns siguientes; el resultado queda guardado (LRU) para todas las
+sesiones.
+"""
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from recursos import cpus_disponibles
+
+ENV_MAX_PROCESOS = 'DASHBOARD_MAX_PROCESOS'
+
+
+class ColaLlena(RuntimeError):
+    """La cola del planificador no admite más trabajos por ahora."""
+
+
+class Trabajo:
+    """
+    Estado de un trabajo enviado al planificador: 'en_cola', 'corriendo',
+    'cancelando' (cancelado, pero su proceso aún no termina), 'listo', 'error'
+    o 'cancelado'. `resultado` y `error` se llenan al terminar.
+    """
+
+    def __init__(self, clave, funcion, args, kwargs):
+        self.clave = clave
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.estado = 'en_cola'
+        self.resultado = None
+        self.error = None
+        self.enviado = time.time()
+        self.iniciado = None
+        self.finalizado = None
+        self.ranura = None
+        self._memoria = None            # avance compartido mientras corre
+        self._avance_final = None
+
+    def avance(self):
+        """(hechas, total) que reportó la función, o None si no reporta avance."""
+        memoria = self._memoria
+        if memoria is None:
+            return self._avance_final
+        hechas, total = memoria[2 * self.ranura], memoria[2 * self.ranura + 1]
+        return (int(hechas), int(total)) if total > 0 else None
+
+    @property
+    def terminado(self):
+        return self.estado in ('listo', 'error', 'cancelado')
+
+    def segundos(self):
+        """Tiempo en cola o corriendo hasta ahora (o total, si terminó)."""
+        return (self.finalizado or time.time()) - (self.iniciado or self.enviado)
+
+    def __repr__(self):
+        return f"Trabajo({self.clave!r}, {self.estado})"
+
+
+# Ranuras (hechas, total) de avance y banderas de cancelación, heredadas por
+# los procesos del pool
+_AVANCE = None
+_CANCELAR = None
+
+
+def _inicializar_proceso(hilos, avance, cancelar):
+    # joblib (n_jobs=-1 de sklearn) y las bibliotecas BLAS del proceso quedan
+    # limitadas a `hilos`, así un trabajo no ocupa todos los núcleos
+    global _AVANCE, _CANCELAR
+    _AVANCE, _CANCELAR = avance, cancelar
+    os.environ['LOKY_MAX_CPU_COUNT'] = str(hilos)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(hilos)
+
+
+def _reportar(ranura, hechas, total):
+    _AVANCE[2 * ranura] = hechas
+    _AVANCE[2 * ranura + 1] = total
+
+
+def _cancelado(ranura):
+    return bool(_CANCELAR[ranura])
+
+
+def _ejecutar(funcion, args, kwargs, ranura):
+    parametros = inspect.signature(funcion).parameters
+    if 'progreso' in parametros and 'progreso' not in kwargs:
+        kwargs = {**kwargs, 'progreso': partial(_reportar, ranura)}
+    if 'cancelado' in parametros and 'cancelado' not in kwargs:
+        kwargs = {**kwargs, 'cancelado': partial(_cancelado, ranura)}
+    return funcion(*args, **kwargs)
+
+
+def max_procesos_por_defecto():
+    """$DASHBOARD_MAX_PROCESOS, o la mitad de las CPUs del presupuesto (al menos 1)."""
+    valor = os.environ.get(ENV_MAX_PROCESOS)
+    if valor:
+        return max(1, int(valor))
+    return max(1, cpus_disponibles() // 2)
+
+
+class Planificador:
+    """
+    Pool de procesos con cola acotada, deduplicación por clave y tope de CPU.
+    Seguro entre hilos: una instancia se comparte entre sesiones de Streamlit.
+    """
+
+    def __init__(self, max_procesos=None, max_cola=16, hilos_por_trabajo=None, max_resultados=32):
+        self.max_procesos = max_procesos or max_procesos_por_defecto()
+        self.max_cola = max_cola
+        self.hilos_por_trabajo = hilos_por_trabajo or max(1, cpus_disponibles() // self.max_procesos)
+        self.max_resultados = max_resultados
+        self._pool = None
+        self._lock = threading.RLock()
+        self._cola = deque()
+        self._trabajos = OrderedDict()
+        self._corriendo = 0
+        # Una ranura de avance y una bandera de cancelación por proceso del pool
+        self._avance = multiprocessing.RawArray('d', 2 * self.max_procesos)
+        self._cancelar = multiprocessing.RawArray('b', self.max_procesos)
+        self._ranuras = list(range(self.max_procesos))
+
+    def enviar(self, clave, funcion, *args, **kwargs):
+        """
+        Trabajo `funcion(*args, **kwargs)` identificado por `clave`. Si ya hay
+        uno con esa clave (salvo con error o cancelado) se devuelve ese.
+        `funcion` y sus argumentos deben poder enviarse a otro proceso (pickle).
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(clave)
+            if trabajo is not None and trabajo.estado not in ('error', 'cancelado'):
+                self._trabajos.move_to_end(clave)
+                return trabajo
+            if len(self._cola) >= self.max_cola:
+                raise ColaLlena(f"hay {len(self._cola)} trabajos esperando")
+            trabajo = Trabajo(clave, funcion, args, kwargs)
+            self._trabajos[clave] = trabajo
+            self._cola.append(trabajo)
+            self._despachar()
+            self._podar()
+            return trabajo
+
+    def trabajo(self, clave):
+        """Trabajo con esa clave o None."""
+        with self._lock:
+            return self._trabajos.get(clave)
+
+    def cancelar(self, clave):
+        """
+        Cancela el trabajo: si está en cola no llega a correr; si ya corre,
+        queda en 'cancelando' hasta que su proceso termina (antes, si la
+        función consulta `cancelado`) y el resultado se descarta. Mientras
+        tanto `enviar` con la misma clave devuelve este trabajo.
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(clave)
+            if trabajo is None or trabajo.terminado:
+                return
+            if trabajo.estado == 'en_cola':
+                self._cola.remove(trabajo)
+                self._finalizar(trabajo, 'cancelado')
+            elif trabajo.estado == 'corriendo':
+                trabajo.estado = 'cancelando'
+                self._cancelar[trabajo.ranura] = 1
+
+    def info(self):
+        """Trabajos por estado, al estilo de `ServicioANOVA.info`."""
+        with self._lock:
+            estados = {}
+            for trabajo in self._trabajos.values():
+                estados[trabajo.estado] = estados.get(trabajo.estado, 0) + 1
+            return {'max_procesos': self.max_procesos, 'procesos_ocupados': self._corriendo,
+                    **estados}
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # ── Internos (con el lock tomado) ─────────────────────────────────────────
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_procesos,
+                                             initializer=_inicializar_proceso,
+                                             initargs=(self.hilos_por_trabajo, self._avance,
+                                                       self._cancelar))
+        return self._pool
+
+    def _despachar(self):
+        while self._cola and self._corriendo < self.max_procesos:
+            trabajo = self._cola.popleft()
+            trabajo.estado = 'corriendo'
+            trabajo.iniciado = time.time()
+            self._corriendo += 1
+            trabajo.ranura = self._ranuras.pop()
+            self._avance[2 * trabajo.ranura] = self._avance[2 * trabajo.ranura + 1] = 0.0
+            self._cancelar[trabajo.ranura] = 0
+            trabajo._memoria = self._avance
+            try:
+                futuro = self._obtener_pool().submit(_ejecutar, trabajo.funcion,
+                                                     trabajo.args, trabajo.kwargs, trabajo.ranura)
+            except BrokenProcessPool as e:
+                self._pool = None
+                self._corriendo -= 1
+                self._liberar_ranura(trabajo)
+                trabajo.error = e
+                self._finalizar(trabajo, 'error')
+                continue
+            futuro.add_done_callback(lambda f, t=trabajo: self._al_terminar(t, f))
+
+    def _al_terminar(self, trabajo, futuro):
+        with self._lock:
+            self._corriendo -= 1
+            self._liberar_ranura(trabajo)
+            error = futuro.exception()
+            if trabajo.estado == 'cancelando':
+                self._finalizar(trabajo, 'cancelado')
+            elif error is not None:
+                if isinstance(error, BrokenProcessPool):
+                    self._pool = None             # un proceso murió: se recrea el pool
+                trabajo.error = error
+                self._finalizar(trabajo, 'error')
+            else:
+                trabajo.resultado = futuro.result()
+                self._finalizar(trabajo, 'listo')
+            self._despachar()
+            self._podar()
+
+    def _liberar_ranura(self, trabajo):
+        trabajo._avance_final = trabajo.avance()
+        trabajo._memoria = None
+        self._ranuras.append(trabajo.ranura)
+
+    def _finalizar(self, trabajo, estado):
+        trabajo.estado = estado
+        trabajo.finalizado = time.time()
+        trabajo.funcion = trabajo.args = trabajo.kwargs = None     # libera los datos enviados
+
+    def _podar(self):
+        # Solo se desalojan trabajos terminados, del menos usado al más usado
+        terminados = [c for c, t in self._trabajos.items() if t.terminado]
+        for clave in terminados[:max(0, len(terminados) - self.max_resultados)]:
+            del self._trabajos[clave]